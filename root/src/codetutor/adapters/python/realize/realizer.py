@@ -1,8 +1,9 @@
 from __future__ import annotations
-import json, importlib
+import json, importlib, os
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from codetutor.core.dsl.loader import IR
+from codetutor.utils.logging import traced
 
 FIXTURE_DIR = Path("data/fixtures")  # expects: data/fixtures/<language>/<library>/fixtures.json
 
@@ -15,8 +16,8 @@ def _value_code(v: Any) -> str:
         return "{" + ",".join(f"{_value_code(k)}:{_value_code(val)}" for k, val in v.items()) + "}"
     return repr(v)
 
-def _load_fixture_map(language: str, library: str) -> Dict[str, Dict[str, Any]]:
-    p = FIXTURE_DIR / language / library / "fixtures.json"
+def _load_fixture_map(language: str, library: str, path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    p = path or FIXTURE_DIR / language / library / "fixtures.json"
     if p.exists():
         try:
             return json.loads(p.read_text(encoding="utf-8"))
@@ -43,26 +44,47 @@ def _initial_setup(language: str, library: str, accept_label: str, fixture_map:
     serializer = (info.get("serializer") or "").lower()
     return imports, setup, serializer
 
-def _call_snippet(qual: str, kwargs: Dict[str, Any]) -> str:
+def _call_template(qual: str) -> Tuple[str, str, str]:
     """
-    Generic call:
+    Generic call, as (head, middle, tail) around the two copies of the argument list:
       - Try bound method getattr(curr, name)
       - Else import module and call free function f(curr, **kwargs)
     """
     name = qual.split(".")[-1]
-    args_code = ", ".join(f"{k}={_value_code(v)}" for k, v in kwargs.items())
     mod_path = qual.rsplit(".", 1)[0]
     return (
         f"__m = getattr(curr, {json.dumps(name)}, None)\n"
         f"if callable(__m):\n"
-        f"    __res = __m({args_code})\n"
+        f"    __res = __m(",
+        f")\n"
         f"else:\n"
         f"    __f = __import__({json.dumps(mod_path)}, fromlist=['*']).{name}\n"
-        f"    __res = __f(curr, {args_code})\n"
-        f"curr = curr if __res is None else __res\n"
+        f"    __res = __f(curr, ",
+        f")\n"
+        f"curr = curr if __res is None else __res\n",
     )
 
-def _serialize_snippet(serializer_hint: str) -> str:
+def _args_code(kwargs: Dict[str, Any]) -> str:
+    return ", ".join(f"{k}={_value_code(v)}" for k, v in kwargs.items())
+
+def _call_snippet(qual: str, kwargs: Dict[str, Any]) -> str:
+    head, mid, tail = _call_template(qual)
+    args_code = _args_code(kwargs)
+    return head + args_code + mid + args_code + tail
+
+_CALL_LINES = _call_snippet("m.f", {}).count("\n")
+
+def step_at(prefix: str, n_steps: int, lineno: int) -> Optional[int]:
+    """
+    Plan step whose call produced program line `lineno` (1-based) of a realize_parts()
+    program, or None for the fixture/serializer lines. Each call snippet has the same
+    number of lines and the prefix ends with the first one.
+    """
+    first = prefix.count("\n") - _CALL_LINES + 1
+    k = (lineno - first) // _CALL_LINES if lineno >= first else -1
+    return k if 0 <= k < n_steps else None
+
+def _build_serialize_snippet(serializer_hint: str) -> str:
     """
     Try hint, then fallbacks: to_csv / to_json / to_dict / tolist / numpy / repr
     """
@@ -90,26 +112,96 @@ def _serialize_snippet(serializer_hint: str) -> str:
         ]
     return "\n".join(lines) + "\n"
 
-def realize_program(language: str, library: str, ir: IR, plan: List[int], kwarg_list: List[Dict[str, Any]]) -> str:
+# every hint other than csv/json gets the full fallback chain
+_SERIALIZERS = {h: _build_serialize_snippet(h) for h in ("csv", "json", "")}
+
+def _serialize_snippet(serializer_hint: str) -> str:
+    return _SERIALIZERS.get(serializer_hint) or _SERIALIZERS[""]
+
+class Realizer:
     """
-    Purely generic: relies on cards for qualnames and type labels, and on a data-driven fixture map.
+    Program builder for one library. The fixture map is read once and re-read only when
+    fixtures.json changes (mtime/size); the fixture head per type label and the call
+    template per qualname are built on first use, so realizing a candidate only formats
+    its arguments and joins precomputed strings. Output is identical to the functions above.
     """
-    first = ir.cards[plan[0]]
-    accept_label = str(first.pre.get("accepts") or "")
-    if not accept_label:
-        # last resort: let user supply fixtures for their library; fail loudly if none
-        raise ValueError("First card lacks pre.accepts; cannot choose an initial fixture.")
+    def __init__(self, language: str, library: str, fixture_dir: Optional[Path] = None):
+        self.language, self.library = language, library
+        self.path = (fixture_dir or FIXTURE_DIR) / language / library / "fixtures.json"
+        self._stamp: Optional[Tuple[int, int]] = (-1, -1)  # (mtime_ns, size) of the loaded file; None: absent
+        self._fixtures: Dict[str, Dict[str, Any]] = {}
+        self._heads: Dict[str, Tuple[str, str]] = {}   # accepts label -> (imports + setup, serializer)
+        self._calls: Dict[str, Tuple[str, str, str]] = {}
+
+    def fixtures(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            st = os.stat(self.path)
+            stamp: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            self._fixtures = _load_fixture_map(self.language, self.library, self.path)
+            self._heads.clear()
+            self._stamp = stamp
+        return self._fixtures
+
+    def _head(self, accept_label: str) -> Tuple[str, str]:
+        fixture_map = self.fixtures()
+        head = self._heads.get(accept_label)
+        if head is None:
+            imports, setup, serializer_hint = _initial_setup(self.language, self.library, accept_label, fixture_map)
+            if not setup:
+                # Best-effort generic placeholder (keeps universality; user can add fixtures.json to improve)
+                setup = "curr = None  # TODO: provide a fixture in data/fixtures/{}/{}/fixtures.json\n".format(
+                    self.language, self.library)
+            if not setup.endswith("\n"):
+                setup += "\n"  # otherwise the first call would be glued onto the last setup line
+            head = self._heads[accept_label] = (imports + setup, _serialize_snippet(serializer_hint))
+        return head
 
-    fixture_map = _load_fixture_map(language, library)
-    imports, setup, serializer_hint = _initial_setup(language, library, accept_label, fixture_map)
+    def call(self, qual: str, kwargs: Dict[str, Any]) -> str:
+        t = self._calls.get(qual)
+        if t is None:
+            t = self._calls[qual] = _call_template(qual)
+        args_code = _args_code(kwargs)
+        return t[0] + args_code + t[1] + args_code + t[2]
 
-    if not setup:
-        # Best-effort generic placeholder (keeps universality; user can add fixtures.json to improve)
-        setup = "curr = None  # TODO: provide a fixture in data/fixtures/{}/{}/fixtures.json\n".format(language, library)
+    @traced("realize_program")
+    def parts(self, ir: IR, plan: List[int], kwarg_list: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """(fixture + first call, remaining calls + serializer); see realize_parts."""
+        accept_label = str(ir.cards[plan[0]].pre.get("accepts") or "")
+        if not accept_label:
+            # last resort: let user supply fixtures for their library; fail loudly if none
+            raise ValueError("First card lacks pre.accepts; cannot choose an initial fixture.")
+        head, serializer = self._head(accept_label)
+        body = [self.call(ir.cards[idx].qualname, kwarg_list[k]) for k, idx in enumerate(plan)]
+        return head + body[0], "".join(body[1:]) + serializer
 
-    body = []
-    for step_idx, idx in enumerate(plan):
-        qual = ir.cards[idx].qualname
-        body.append(_call_snippet(qual, kwarg_list[step_idx]))
+    def program(self, ir: IR, plan: List[int], kwarg_list: List[Dict[str, Any]]) -> str:
+        prefix, suffix = self.parts(ir, plan, kwarg_list)
+        return prefix + suffix
 
-    return imports + setup + "".join(body) + _serialize_snippet(serializer_hint)
+_REALIZERS: Dict[Tuple[str, str], Realizer] = {}
+
+def get_realizer(language: str, library: str) -> Realizer:
+    """The process-wide Realizer of a library (fixtures under FIXTURE_DIR)."""
+    r = _REALIZERS.get((language, library))
+    if r is None:
+        r = _REALIZERS[(language, library)] = Realizer(language, library)
+    return r
+
+def realize_program(language: str, library: str, ir: IR, plan: List[int], kwarg_list: List[Dict[str, Any]]) -> str:
+    """
+    Purely generic: relies on cards for qualnames and type labels, and on a data-driven fixture map.
+    """
+    prefix, suffix = realize_parts(language, library, ir, plan, kwarg_list)
+    return prefix + suffix
+
+def realize_parts(language: str, library: str, ir: IR, plan: List[int],
+                  kwarg_list: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    realize_program() split in two: (fixture + first call, remaining calls + serializer).
+    Candidates with the same prefix can run it once and fork for each suffix
+    (SandboxPool.run_shared).
+    """
+    return get_realizer(language, library).parts(ir, plan, kwarg_list)
@@ -1,7 +1,10 @@
 from __future__ import annotations
-import importlib, inspect, json, sqlite3, sys, math
+import importlib, inspect, json, multiprocessing, re, sqlite3, sys, math
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
 from blake3 import blake3
 from griffe import load
 from docstring_parser import parse as parse_doc
@@ -12,15 +15,33 @@ def _connect(db_path: str) -> sqlite3.Connection:
     con.execute("PRAGMA foreign_keys=ON;")
     return con
 
+def _dedupe_legacy(con: sqlite3.Connection) -> None:
+    # One-time migration: scans before ux_signatures/ux_docstrings appended a row per run; keep
+    # the newest one so the unique index can be built. Skipped once the index exists.
+    for table, index in (("signatures", "ux_signatures"), ("docstrings", "ux_docstrings")):
+        if con.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (index,)).fetchone():
+            continue
+        if con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+            con.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY symbol_id)")
+    con.commit()
+
 def _ensure_schema(con: sqlite3.Connection, schema_path: str | None = None) -> None:
     if schema_path is None:
         schema_path = Path(__file__).with_name("schema.sql")
     sql = Path(schema_path).read_text(encoding="utf-8")
+    _dedupe_legacy(con)
     con.executescript(sql)
 
 def _hash(s: str | None) -> str | None:
     return blake3(s.encode("utf-8")).hexdigest() if s else None
 
+_ADDR = re.compile(r" at 0x[0-9a-fA-F]+")
+
+def _stable_repr(x: Any) -> str:
+    # default reprs embed the object address (e.g. <object object at 0x7f..>), which would
+    # make sig_hash differ on every run
+    return _ADDR.sub("", repr(x))
+
 def _get_or_insert_library(con: sqlite3.Connection, name: str, version: str | None) -> int:
     row = con.execute(
         "SELECT id FROM libraries WHERE name=? AND IFNULL(version,'')=IFNULL(?, '')",
@@ -33,11 +54,25 @@ def _get_or_insert_library(con: sqlite3.Connection, name: str, version: str | No
     )
     return cur.lastrowid
 
-def _import_qualname(qn: str) -> Any | None:
+@lru_cache(maxsize=None)
+def _import_module(name: str) -> Any | None:
+    # each module is imported at most once per process; failures are cached too
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
+
+def _import_qualname(qn: str, module: str | None = None) -> Any | None:
     parts = qn.split(".")
+    # the owning module (known from griffe) is the longest importable prefix in the common case
+    stop = len(module.split(".")) if module and qn.startswith(module + ".") else 0
     for i in range(len(parts), 0, -1):
+        if stop and i > stop:
+            continue
+        obj = _import_module(".".join(parts[:i]))
+        if obj is None:
+            continue
         try:
-            obj = importlib.import_module(".".join(parts[:i]))
             for p in parts[i:]:
                 obj = getattr(obj, p)
             return obj
@@ -45,142 +80,347 @@ def _import_qualname(qn: str) -> Any | None:
             continue
     return None
 
-def _insert_symbol(con: sqlite3.Connection, lib_id: int, *, qualname: str,
-                   objtype: str, module: str, owner: str | None,
-                   is_public: int, doc_hash: str | None, sig_hash: str | None) -> int:
-    con.execute(
-        "INSERT OR IGNORE INTO symbols(library_id,qualname,objtype,module,owner,is_public,doc_hash,sig_hash) "
-        "VALUES(?,?,?,?,?,?,?,?)",
-        (lib_id, qualname, objtype, module, owner, is_public, doc_hash, sig_hash),
-    )
-    row = con.execute(
-        "SELECT id FROM symbols WHERE library_id=? AND qualname=?",
-        (lib_id, qualname),
-    ).fetchone()
-    return row[0]
-
-def _insert_signature(con: sqlite3.Connection, symbol_id: int,
-                      signature: str | None, params_json: str | None,
-                      returns_text: str | None) -> None:
-    if not (signature or params_json or returns_text): return
-    con.execute(
-        "INSERT INTO signatures(symbol_id,signature,params_json,returns_text) VALUES(?,?,?,?)",
-        (symbol_id, signature, params_json, returns_text),
-    )
-
-def _insert_docstring(con: sqlite3.Connection, symbol_id: int, *,
-                      summary: str | None, params_json: str | None,
-                      returns_json: str | None, raw: str | None) -> None:
-    if not raw: return
-    con.execute(
-        "INSERT INTO docstrings(symbol_id,summary,params_json,returns_json,raw) VALUES(?,?,?,?,?)",
-        (symbol_id, summary, params_json, returns_json, raw),
-    )
-
-def scan_library(lib_name: str, db_path: str = "data/db/api_index.db",
-                 schema_path: str | None = None, depth: str = "full") -> None:
-    """
-    depth:
-      - 'light' -> only direct children of root module (e.g., pandas.*), no recursion
-      - 'mid'   -> recurse one submodule level (e.g., pandas.core, pandas.tests), not deeper
-      - 'full'  -> no limit
-    """
-    con = _connect(db_path)
-    _ensure_schema(con, schema_path)
+def _library_version(lib_name: str, static: bool) -> str | None:
+    if not static:
+        mod = _import_module(lib_name)  # the scan imports it again through _import_module
+        if mod is None:
+            importlib.import_module(lib_name)  # not importable: raise the real error
+        return getattr(mod, "__version__", None)
+    from importlib import metadata
+    try:
+        return metadata.version(lib_name.split(".")[0])
+    except Exception:
+        return None
 
-    mod = importlib.import_module(lib_name)
-    version = getattr(mod, "__version__", None)
-    lib_id = _get_or_insert_library(con, lib_name, version)
+# one row per symbol, produced by workers and consumed by the single writer
+# (qualname, objtype, module, owner, is_public, doc_hash, sig_hash,
+#  signature, params_json, returns_text, summary, params_doc_json, returns_doc_json, raw_doc)
+SymbolRow = Tuple[Any, ...]
 
-    model = load(lib_name)
+def _max_mod_depth(lib_name: str, depth: str) -> float:
     base_depth = len(lib_name.split("."))
-    max_mod_depth = {
+    return {
         "light": base_depth,          # only root's direct members
         "mid":   base_depth + 1,      # one level of submodules
         "full":  math.inf,            # unlimited
     }.get(depth, math.inf)
 
-    def walk(m) -> None:
-        # Skip aliases to avoid alias resolution crashes (e.g., pandas.annotations -> __future__.annotations)
-        if getattr(m, "kind", None) and getattr(m.kind, "value", None) == "alias":
-            return
-
-        path = getattr(m, "path", lib_name)
-        d = len(path.split("."))
+# ---------- static (griffe-only) signatures ----------
+_KIND = {"positional_only": "POSITIONAL_ONLY", "positional_or_keyword": "POSITIONAL_OR_KEYWORD",
+         "var_positional": "VAR_POSITIONAL", "keyword_only": "KEYWORD_ONLY", "var_keyword": "VAR_KEYWORD"}
 
-        if getattr(m, "kind", None) and m.kind.value in {"module", "package"}:
-            if d > max_mod_depth:
-                return
-            for child in getattr(m, "members", {}).values():
-                walk(child)
-            return
+def _static_params(m) -> Tuple[list, Any] | None:
+    """(griffe parameters, return annotation) for functions and classes (via __init__), else None."""
+    kind = m.kind.value
+    try:
+        if kind == "function":
+            return list(m.parameters), m.returns
+        if kind == "class":
+            init = m.all_members.get("__init__")
+            if init is None or init.kind.value != "function":
+                return None
+            return list(init.parameters)[1:], init.returns  # like inspect.signature(cls): no self
+    except Exception:  # unresolvable aliases/bases
+        return None
+    return None
 
-        qualname = path
-        objtype = m.kind.value
-        module = getattr(getattr(m, "module", None), "path", lib_name)
-        owner = getattr(getattr(m, "parent", None), "path", None)
-        is_public = 0 if any(part.startswith("_") for part in qualname.split(".")) else 1
+def _static_signature(m) -> Tuple[str, str, str | None] | None:
+    """(signature, params_json, returns_text) rendered like inspect.signature, or None."""
+    found = _static_params(m)
+    if found is None:
+        return None
+    params, returns = found
+    parts, rows, prev = [], [], None
+    for p in params:
+        kind = _KIND.get(getattr(p.kind, "name", None), "POSITIONAL_OR_KEYWORD")
+        if prev == "POSITIONAL_ONLY" and kind != "POSITIONAL_ONLY":
+            parts.append("/")
+        if kind == "KEYWORD_ONLY" and prev not in ("KEYWORD_ONLY", "VAR_POSITIONAL"):
+            parts.append("*")
+        ann = None if p.annotation is None else str(p.annotation)
+        # griffe gives *args/**kwargs the defaults () and {}; inspect shows none
+        default = None if p.default is None or kind in ("VAR_POSITIONAL", "VAR_KEYWORD") else str(p.default)
+        txt = {"VAR_POSITIONAL": "*", "VAR_KEYWORD": "**"}.get(kind, "") + p.name
+        if ann is not None:
+            txt += f": {ann}"
+        if default is not None:
+            txt += f" = {default}" if ann is not None else f"={default}"
+        parts.append(txt)
+        rows.append({"name": p.name, "kind": kind, "default": default, "annotation": ann})
+        prev = kind
+    if prev == "POSITIONAL_ONLY":
+        parts.append("/")
+    returns_text = None if returns is None else str(returns)
+    sig_txt = f"({', '.join(parts)})" + (f" -> {returns_text}" if returns_text is not None else "")
+    return sig_txt, json.dumps(rows), returns_text
 
-        pyobj = _import_qualname(qualname)
+def _runtime_signature(pyobj: Any) -> Tuple[str | None, str | None, str | None]:
+    sig_txt = params_json = returns_text = None
+    try:
+        if pyobj and (inspect.isfunction(pyobj) or inspect.ismethod(pyobj) or inspect.isclass(pyobj)):
+            sig = inspect.signature(pyobj)
+            sig_txt = _ADDR.sub("", str(sig))
+            params_json = json.dumps([
+                {
+                    "name": p.name, "kind": str(p.kind),
+                    "default": None if p.default is inspect._empty else _stable_repr(p.default),
+                    "annotation": None if p.annotation is inspect._empty else _stable_repr(p.annotation),
+                } for p in sig.parameters.values()
+            ])
+            returns_text = None if sig.return_annotation is inspect._empty else _stable_repr(sig.return_annotation)
+    except Exception:
+        pass
+    return sig_txt, params_json, returns_text
 
-        sig_txt = params_json = returns_text = None
-        try:
-            if pyobj and (inspect.isfunction(pyobj) or inspect.ismethod(pyobj) or inspect.isclass(pyobj)):
-                sig = inspect.signature(pyobj)
-                sig_txt = str(sig)
-                params_json = json.dumps([
-                    {
-                        "name": p.name, "kind": str(p.kind),
-                        "default": None if p.default is inspect._empty else repr(p.default),
-                        "annotation": None if p.annotation is inspect._empty else repr(p.annotation),
-                    } for p in sig.parameters.values()
-                ])
-                returns_text = None if sig.return_annotation is inspect._empty else repr(sig.return_annotation)
-        except Exception:
-            pass
+def _symbol_row(m, lib_name: str, static: bool = False, import_fallback: bool = True) -> SymbolRow:
+    qualname = getattr(m, "path", lib_name)
+    objtype = m.kind.value
+    module = getattr(getattr(m, "module", None), "path", lib_name)
+    owner = getattr(getattr(m, "parent", None), "path", None)
+    is_public = 0 if any(part.startswith("_") for part in qualname.split(".")) else 1
 
+    if static:
+        # griffe's model only; import the symbol just for what the model lacks
+        static_sig = _static_signature(m)
+        raw_doc = m.docstring.value if m.docstring else None
+        pyobj = None
+        if import_fallback and (raw_doc is None or (static_sig is None and objtype in ("function", "class"))):
+            pyobj = _import_qualname(qualname, module)
+        sig_txt, params_json, returns_text = static_sig or _runtime_signature(pyobj)
+        if raw_doc is None and pyobj is not None:
+            try:
+                raw_doc = inspect.getdoc(pyobj)
+            except Exception:
+                raw_doc = None
+    else:
+        pyobj = _import_qualname(qualname, module)
+        sig_txt, params_json, returns_text = _runtime_signature(pyobj)
         raw_doc = None
         try:
             raw_doc = inspect.getdoc(pyobj) if pyobj else (m.docstring.value if m.docstring else None)
         except Exception:
             raw_doc = None
 
-        summary = params_doc_json = returns_doc_json = None
+    summary = params_doc_json = returns_doc_json = None
+    if raw_doc:
+        try:
+            parsed = parse_doc(raw_doc)
+            summary = (parsed.short_description or "")[:2048]
+            params_doc_json = json.dumps([
+                {"arg": p.arg_name, "type": p.type_name, "desc": p.description}
+                for p in parsed.params
+            ])
+            returns_doc_json = json.dumps({
+                "type": getattr(parsed.returns, "type_name", None),
+                "desc": getattr(parsed.returns, "description", None),
+            })
+        except Exception:
+            pass
+
+    return (qualname, objtype, module, owner, is_public, _hash(raw_doc), _hash(sig_txt),
+            sig_txt, params_json, returns_text, summary, params_doc_json, returns_doc_json, raw_doc)
+
+def _walk(m, lib_name: str, max_mod_depth: float,
+          static: bool = False, import_fallback: bool = True) -> Iterator[SymbolRow]:
+    # Skip aliases to avoid alias resolution crashes (e.g., pandas.annotations -> __future__.annotations)
+    if getattr(m, "kind", None) and getattr(m.kind, "value", None) == "alias":
+        return
+
+    path = getattr(m, "path", lib_name)
+    d = len(path.split("."))
+
+    if getattr(m, "kind", None) and m.kind.value in {"module", "package"}:
+        if d > max_mod_depth:
+            return
+        for child in getattr(m, "members", {}).values():
+            yield from _walk(child, lib_name, max_mod_depth, static, import_fallback)
+        return
+
+    yield _symbol_row(m, lib_name, static, import_fallback)
+
+@lru_cache(maxsize=None)
+def _model(lib_name: str, inspect_compiled: bool = True):
+    # griffe imports compiled modules to inspect them; a strict static scan opts out
+    return load(lib_name, allow_inspection=inspect_compiled)
+
+def _member_rows(lib_name: str, member_name: str, depth: str,
+                 static: bool = False, import_fallback: bool = True) -> List[SymbolRow]:
+    """Worker task: all rows under one top-level member (usually a submodule)."""
+    member = _model(lib_name, not static or import_fallback).members[member_name]
+    return list(_walk(member, lib_name, _max_mod_depth(lib_name, depth), static, import_fallback))
+
+class _RowWriter:
+    """
+    Buffers symbol rows and flushes them with executemany in large chunks.
+    Symbol ids are assigned up front (existing ids and hashes looked up once per scan), so no
+    per-row SELECT is needed to link signatures/docstrings to their symbol.
+
+    A symbol already in the DB is rewritten in place (one signature/docstring row per symbol).
+    incremental=True skips symbols whose doc_hash and sig_hash are unchanged, and
+    finish() then deletes the symbols the scan did not see.
+    """
+    def __init__(self, con: sqlite3.Connection, lib_id: int, incremental: bool = False, chunk: int = 5000):
+        self.con, self.lib_id, self.incremental, self.chunk = con, lib_id, incremental, chunk
+        self.known: Dict[str, Tuple[int, Any, Any]] = {
+            q: (i, dh, sh) for q, i, dh, sh in con.execute(
+                "SELECT qualname, id, doc_hash, sig_hash FROM symbols WHERE library_id=?", (lib_id,))
+        }
+        self.seen: Set[str] = set()
+        self.next_id = (con.execute("SELECT IFNULL(MAX(id), 0) FROM symbols").fetchone()[0]) + 1
+        self.stats = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        self._reset()
+
+    def _reset(self) -> None:
+        self.symbols: List[tuple] = []
+        self.updates: List[tuple] = []
+        self.signatures: List[tuple] = []
+        self.docstrings: List[tuple] = []
+        self.cleared: List[tuple] = []  # changed symbols whose signature/docstring may be gone
+
+    def _pending(self) -> int:
+        return (len(self.symbols) + len(self.updates) + len(self.signatures)
+                + len(self.docstrings) + len(self.cleared))
+
+    def add(self, row: SymbolRow) -> None:
+        (qualname, objtype, module, owner, is_public, doc_hash, sig_hash,
+         sig_txt, params_json, returns_text, summary, params_doc_json, returns_doc_json, raw_doc) = row
+        if qualname in self.seen:  # first occurrence wins, as with INSERT OR IGNORE
+            return
+        self.seen.add(qualname)
+        prev = self.known.get(qualname)
+        if prev is None:
+            sym_id = self.next_id
+            self.next_id += 1
+            self.stats["added"] += 1
+            self.symbols.append((sym_id, self.lib_id, qualname, objtype, module, owner, is_public, doc_hash, sig_hash))
+        else:
+            sym_id = prev[0]
+            same = prev[1] == doc_hash and prev[2] == sig_hash
+            self.stats["unchanged" if same else "changed"] += 1
+            if same and self.incremental:
+                return
+            self.updates.append((objtype, module, owner, is_public, doc_hash, sig_hash, sym_id))
+            self.cleared.append((sym_id,))
+        if sig_txt or params_json or returns_text:
+            self.signatures.append((sym_id, sig_txt, params_json, returns_text))
         if raw_doc:
-            try:
-                parsed = parse_doc(raw_doc)
-                summary = (parsed.short_description or "")[:2048]
-                params_doc_json = json.dumps([
-                    {"arg": p.arg_name, "type": p.type_name, "desc": p.description}
-                    for p in parsed.params
-                ])
-                returns_doc_json = json.dumps({
-                    "type": getattr(parsed.returns, "type_name", None),
-                    "desc": getattr(parsed.returns, "description", None),
-                })
-            except Exception:
-                pass
+            self.docstrings.append((sym_id, summary, params_doc_json, returns_doc_json, raw_doc))
+        if self._pending() >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.symbols:
+            self.con.executemany(
+                "INSERT INTO symbols(id,library_id,qualname,objtype,module,owner,is_public,doc_hash,sig_hash) "
+                "VALUES(?,?,?,?,?,?,?,?,?)", self.symbols)
+        if self.updates:
+            self.con.executemany(
+                "UPDATE symbols SET objtype=?,module=?,owner=?,is_public=?,doc_hash=?,sig_hash=? WHERE id=?",
+                self.updates)
+        if self.cleared:
+            self.con.executemany("DELETE FROM signatures WHERE symbol_id=?", self.cleared)
+            self.con.executemany("DELETE FROM docstrings WHERE symbol_id=?", self.cleared)
+        if self.signatures:
+            self.con.executemany(
+                "INSERT INTO signatures(symbol_id,signature,params_json,returns_text) VALUES(?,?,?,?)",
+                self.signatures)
+        if self.docstrings:
+            self.con.executemany(
+                "INSERT INTO docstrings(symbol_id,summary,params_json,returns_json,raw) VALUES(?,?,?,?,?)",
+                self.docstrings)
+        self._reset()
+
+    def finish(self) -> Dict[str, int]:
+        """Flush, drop vanished symbols (incremental only) and return the diff summary."""
+        self.flush()
+        if self.incremental:
+            gone = [(v[0],) for q, v in self.known.items() if q not in self.seen]
+            if gone:
+                self.con.executemany("DELETE FROM signatures WHERE symbol_id=?", gone)
+                self.con.executemany("DELETE FROM docstrings WHERE symbol_id=?", gone)
+                self.con.executemany("UPDATE examples SET symbol_id=NULL WHERE symbol_id=?", gone)
+                self.con.executemany(
+                    "DELETE FROM card_facts WHERE card_id IN (SELECT id FROM cards WHERE symbol_id=?)", gone)
+                self.con.executemany("DELETE FROM cards WHERE symbol_id=?", gone)
+                self.con.executemany("DELETE FROM symbols WHERE id=?", gone)
+            self.stats["removed"] = len(gone)
+        return dict(self.stats)
+
+def _write_rows(w: _RowWriter, rows: Iterable[SymbolRow]) -> None:
+    for row in rows:
+        w.add(row)
+
+def _scan_pragmas(con: sqlite3.Connection) -> None:
+    # the scan is one rebuildable transaction: trade durability for write speed
+    con.execute("PRAGMA synchronous=OFF;")
+    con.execute("PRAGMA cache_size=-262144;")  # 256 MiB
+    con.execute("PRAGMA temp_store=MEMORY;")
+
+def scan_library(lib_name: str, db_path: str = "data/db/api_index.db",
+                 schema_path: str | None = None, depth: str = "full", jobs: int = 1,
+                 incremental: bool = False, static: bool = False,
+                 import_fallback: bool = True) -> Dict[str, int]:
+    """
+    depth:
+      - 'light' -> only direct children of root module (e.g., pandas.*), no recursion
+      - 'mid'   -> recurse one submodule level (e.g., pandas.core, pandas.tests), not deeper
+      - 'full'  -> no limit
+    jobs: >1 introspects top-level members in a process pool; this process stays the only
+          writer and inserts results in member order, so the DB matches a serial scan.
+    incremental: compare against the previous scan of the same library version; only
+          symbols whose doc_hash/sig_hash changed are rewritten, vanished ones are deleted.
+    static: build signatures/docstrings from griffe's model without importing the library;
+          import_fallback imports a symbol only when the model lacks its docstring or signature.
+          The library version then comes from package metadata; without import_fallback
+          nothing from the library is imported (compiled modules without stubs are skipped).
+    Returns the diff summary {added, changed, unchanged, removed} against the previous scan.
+    """
+    con = _connect(db_path)
+    _ensure_schema(con, schema_path)
+    _scan_pragmas(con)
 
-        sym_id = _insert_symbol(
-            con, lib_id,
-            qualname=qualname, objtype=objtype, module=module, owner=owner,
-            is_public=is_public, doc_hash=_hash(raw_doc), sig_hash=_hash(sig_txt),
-        )
-        _insert_signature(con, sym_id, sig_txt, params_json, returns_text)
-        _insert_docstring(con, sym_id, summary=summary, params_json=params_doc_json,
-                          returns_json=returns_doc_json, raw=raw_doc)
+    version = _library_version(lib_name, static)
+    lib_id = _get_or_insert_library(con, lib_name, version)
+    w = _RowWriter(con, lib_id, incremental=incremental)
 
-    for member in model.members.values():
-        walk(member)
+    model = _model(lib_name, not static or import_fallback)
+    names = list(model.members)
+    if jobs > 1 and len(names) > 1:
+        # fork where available so workers inherit the already-loaded griffe model
+        ctx = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as ex:
+            for rows in ex.map(_member_rows, repeat(lib_name), names, repeat(depth),
+                               repeat(static), repeat(import_fallback)):
+                _write_rows(w, rows)
+    else:
+        max_mod_depth = _max_mod_depth(lib_name, depth)
+        for name in names:
+            _write_rows(w, _walk(model.members[name], lib_name, max_mod_depth,
+                                 static, import_fallback))
 
+    stats = w.finish()
+    if incremental:
+        con.execute("UPDATE libraries SET scanned_at=datetime('now') WHERE id=?", (lib_id,))
     con.commit()
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE);")
     con.close()
+    return stats
 
 if __name__ == "__main__":
-    # Usage: python -m codetutor.adapters.python.scan.scan <library> [--depth light|mid|full]
+    # Usage: python -m codetutor.adapters.python.scan.scan <library> [--depth light|mid|full] [--jobs N] [--incremental]
+    #        [--static [--no-import-fallback]]
     import argparse
     ap = argparse.ArgumentParser(prog="scan", add_help=True, description=None)
     ap.add_argument("library", help="Import name, e.g., pandas")
     ap.add_argument("--depth", choices=["light", "mid", "full"], default="full")
+    ap.add_argument("--jobs", type=int, default=1, help="worker processes for introspection")
+    ap.add_argument("--incremental", action="store_true",
+                    help="only rewrite symbols whose doc/signature hash changed; delete vanished ones")
+    ap.add_argument("--static", action="store_true",
+                    help="build signatures/docstrings from griffe's static model, without importing")
+    ap.add_argument("--no-import-fallback", dest="import_fallback", action="store_false",
+                    help="with --static: never import, even where static data is missing")
     args = ap.parse_args()
-    scan_library(args.library, depth=args.depth)
+    stats = scan_library(args.library, depth=args.depth, jobs=args.jobs, incremental=args.incremental,
+                         static=args.static, import_fallback=args.import_fallback)
+    print(" ".join(f"{k}={v}" for k, v in stats.items()))
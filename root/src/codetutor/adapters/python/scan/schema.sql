@@ -30,6 +30,7 @@ CREATE TABLE IF NOT EXISTS signatures(
 	returns_text TEXT,
 	FOREIGN KEY(symbol_id) REFERENCES symbols(id)
 );
+CREATE UNIQUE INDEX IF NOT EXISTS ux_signatures on signatures(symbol_id);
 
 CREATE TABLE IF NOT EXISTS docstrings(
 	id INTEGER PRIMARY KEY,
@@ -40,6 +41,7 @@ CREATE TABLE IF NOT EXISTS docstrings(
 	raw TEXT,
 	FOREIGN KEY(symbol_id) REFERENCES symbols(id)
 );
+CREATE UNIQUE INDEX IF NOT EXISTS ux_docstrings on docstrings(symbol_id);
 
 CREATE TABLE IF NOT EXISTS examples(
 	id INTEGER PRIMARY KEY,
@@ -1,9 +1,11 @@
 # FILE: src/codetutor/ctdsl/synth_cards.py
-# usage: python -m codetutor.ctdsl.synth_cards pandas --db data/db/api_index.db --limit 50
+# usage: python -m codetutor.ctdsl.synth_cards pandas --db data/db/api_index.db [--limit 50] [--jobs 4] [--to-db]
 from __future__ import annotations
-import argparse, json, re, sqlite3, sys
+import argparse, json, multiprocessing, os, re, sqlite3, sys
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+from codetutor.core.dsl.emit import CardEmitter, library_id
+from codetutor.core.dsl.loader import Card
 
 # ---- tiny helpers ----
 def q(s: Optional[str]) -> str:
@@ -74,25 +76,29 @@ def infer_mutates(params: List[Tuple[str,str,bool,Optional[str]]]) -> Optional[b
     return None  # unknown
 
 # ---- DB access (expects your scan schema: libraries, symbols, signatures, docstrings) ----
+# only the columns synthesis reads (docstrings are not used, so raw text is never pulled)
 SQL = """
-SELECT s.qualname, s.objtype, s.owner, s.is_public,
-       sig.signature, sig.params_json, sig.returns_text,
-       d.raw as doc_raw
+SELECT s.id, s.qualname, s.owner, sig.params_json, sig.returns_text
 FROM symbols s
 LEFT JOIN signatures sig ON sig.symbol_id = s.id
-LEFT JOIN docstrings d   ON d.symbol_id = s.id
 WHERE s.library_id = (SELECT id FROM libraries WHERE name = ?)
   AND s.is_public = 1
 ORDER BY s.qualname
+LIMIT ?
 """
 
-def rows_for_library(db_path: str, lib: str, limit: Optional[int]) -> List[sqlite3.Row]:
+SymbolRow = Tuple[int, str, Optional[str], Optional[str], Optional[str]]  # id, qualname, owner, params_json, returns_text
+
+def iter_rows(db_path: str, lib: str, limit: Optional[int] = None) -> Iterator[SymbolRow]:
+    """Stream rows from the cursor; memory stays flat whatever the library size."""
     con = sqlite3.connect(db_path)
-    con.row_factory = sqlite3.Row
-    cur = con.execute(SQL, (lib,))
-    rows = cur.fetchmany(limit) if limit else cur.fetchall()
-    con.close()
-    return rows
+    try:
+        yield from con.execute(SQL, (lib, limit if limit else -1))
+    finally:
+        con.close()
+
+def rows_for_library(db_path: str, lib: str, limit: Optional[int]) -> List[SymbolRow]:
+    return list(iter_rows(db_path, lib, limit))
 
 # ---- Card synthesis ----
 def card_block(qualname: str,
@@ -124,32 +130,87 @@ def card_block(qualname: str,
     lines.append("}\n")
     return "\n".join(lines)
 
-def synth_cards(db_path: str, lib: str, outdir: str, limit: int) -> Path:
-    rows = rows_for_library(db_path, lib, limit)
-    if not rows:
-        sys.exit(f"No public symbols found for library '{lib}' in {db_path}")
-
+def card_ir(qualname: str,
+            profile: str,
+            accepts: Optional[str],
+            params: List[Tuple[str,str,bool,Optional[str]]],
+            returns: Optional[str],
+            mutates: Optional[bool],
+            is_stop: bool) -> Card:
+    """The Card that parsing card_block(...) yields, built without going through text."""
+    c = Card(qualname=qualname, profile=profile)
+    if accepts:
+        c.pre["accepts"] = accepts
+    if params:
+        c.pre["args"] = [(n, dom, bool(req), d) for (n, dom, req, d) in params]
+    if returns:
+        c.post["returns"] = returns
+    if mutates is not None:
+        c.post["mutates_input"] = bool(mutates)
+    c.post["is_valid_stop"] = bool(is_stop)
+    return c
+
+def card_for_row(row: SymbolRow) -> Tuple[int, str, Card]:
+    """(symbol id, .ctdsl block, IR) for one symbol row."""
+    sym_id, qual, owner, params_json, returns_text = row
+    params = infer_params(params_json)
+    accepts = infer_accepts(owner)
+    returns = infer_returns(qual, owner, returns_text)
+    mutates = infer_mutates(params)
+    is_stop = infer_is_stop(qual, returns)
+    parts = dict(profile="auto", accepts=accepts, params=params,
+                 returns=returns, mutates=mutates, is_stop=is_stop)
+    return sym_id, card_block(qual, **parts), card_ir(qual, **parts)
+
+def synth_cards(db_path: str, lib: str, outdir: str, limit: Optional[int] = None, jobs: int = 1,
+                to_db: bool = False) -> Path:
+    """
+    Rows are streamed from the DB and each card is written as soon as it is built, into a
+    temp file that replaces cards.ctdsl at the end (readers never see a half-written file).
+    jobs > 1 builds cards in a process pool; imap keeps DB order, so output is identical.
+    to_db (opt-in) also stores the cards in the same DB (cards/card_facts, see core.dsl.emit) so
+    they can be planned on with load_cards_db() without parsing the .ctdsl file.
+    """
     # ensure output dir: data/cards/{library}
     out_dir = Path(outdir) if outdir else Path("data") / "cards" / lib
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / "cards.ctdsl"
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
 
-    blocks: List[str] = []
-    for r in rows:
-        qual = r["qualname"]
-        owner = r["owner"]
-        params = infer_params(r["params_json"])
-        accepts = infer_accepts(owner)
-        returns = infer_returns(qual, owner, r["returns_text"])
-        mutates = infer_mutates(params)
-        is_stop = infer_is_stop(qual, returns)
-        blocks.append(
-            card_block(qual, profile="auto", accepts=accepts, params=params,
-                       returns=returns, mutates=mutates, is_stop=is_stop)
-        )
-
-    out_path.write_text("".join(blocks), encoding="utf-8")
-    print(f"Wrote {len(blocks)} cards → {out_path}")
+    n = 0
+    no_symbols = f"No public symbols found for library '{lib}' in {db_path}"
+    rows = iter_rows(db_path, lib, limit)
+    con = sqlite3.connect(db_path)
+    try:
+        try:
+            lib_id = library_id(con, lib)
+        except (ValueError, sqlite3.OperationalError):  # never scanned (or no DB at all)
+            sys.exit(no_symbols)
+        emitter = CardEmitter(con, lib_id) if to_db else None
+        try:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+                try:
+                    built = pool.imap(card_for_row, rows, chunksize=256) if pool else map(card_for_row, rows)
+                    for sym_id, block, card in built:
+                        f.write(block); n += 1
+                        if emitter is not None:
+                            emitter.add(sym_id, card)
+                finally:
+                    if pool is not None:
+                        pool.terminate()
+            if not n:
+                sys.exit(no_symbols)
+            if emitter is not None:
+                emitter.close()  # commit first: a failed commit must not leave a new file behind
+            os.replace(tmp_path, out_path)
+        except BaseException:  # including Ctrl-C and the exit above: no stray cards.ctdsl.tmp
+            tmp_path.unlink(missing_ok=True)
+            raise
+    finally:
+        rows.close()  # closes its connection even when the stream was not exhausted
+        con.close()
+    print(f"Wrote {n} cards → {out_path}" + (f" and {db_path}" if to_db else ""))
     return out_path
 
 # ---- CLI (minimal) ----
@@ -162,13 +223,16 @@ def main():
         default="data/cards/python/{library}",
         help="Override output dir (default data/cards/python/{library})"
     )
-    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--limit", type=int, default=None, help="only the first N symbols (default: all)")
+    ap.add_argument("--jobs", type=int, default=1, help="worker processes for card building")
+    ap.add_argument("--to-db", action="store_true",
+                    help="also store the cards in the cards/card_facts tables of --db")
     args = ap.parse_args()
     args.outdir = args.outdir.format(library=args.library)
 
-    synth_cards(args.db, args.library, args.outdir, args.limit)
+    synth_cards(args.db, args.library, args.outdir, args.limit, args.jobs, args.to_db)
 
-#usage: python -m codetutor.adapters.python.synth.synth_cards pandas --db data/db/api_index.db --limit 50
+#usage: python -m codetutor.adapters.python.synth.synth_cards pandas --db data/db/api_index.db [--limit 50] [--jobs 4] [--to-db]
 
 if __name__ == "__main__":
     main()
@@ -1,108 +1,493 @@
 from __future__ import annotations
 import json, os, random, sys, time
+from collections import deque
+from itertools import islice
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
-from codetutor.core.dsl.loader import load_cards, IR
-from codetutor.core.planner.compat import build_compat
-from codetutor.core.planner.z3core import choose_plan
-from codetutor.core.generation.arg_sampler import sample_kwargs
-from codetutor.core.generation.realize_universal import realize_program
+from codetutor.core.dsl.loader import load_cards, load_cards_db, IR
+from codetutor.core.ir.card import CardTable
+from codetutor.core.planner.compat import CompatGraph, build_compat
+from codetutor.core.planner.sampler import PlanSampler
+from codetutor.core.planner.selector import ThompsonSelector
+from codetutor.core.generation.arg_sampler import arg_stream, sample_kwargs_batch
+from codetutor.core.learning.stats import BetaStats, FailureMemo, open_bandit_stats, open_failure_memo
+from codetutor.adapters.python.realize.realizer import get_realizer, step_at
 from codetutor.core.generation.text import render_question
-from codetutor.core.sandbox.runner import run_code
-from codetutor.core.sandbox.inspectors import fingerprint
+from codetutor.core.sandbox.cache import open_exec_cache
+from codetutor.core.sandbox.runner import SandboxPool, SandboxResult, run_code
+from codetutor.core.sandbox.inspectors import failure_site, fingerprint
+from codetutor.utils.io import open_question_sink, question_key
+from codetutor.utils.logging import count, span, tracing
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    import numpy as np
+
+@dataclass
+class Candidate:
+    seq: int            # position in the (seeded) candidate stream
+    attempt: int        # plan attempt this candidate belongs to
+    plan: List[int]
+    kwargs: List[Dict[str, Any]]
+    program: str
+    prefix: str = ""    # leading part of `program` (fixture + first call), see Realizer.parts
 
 # ---------- core search ----------
-def pick_start_indices(ir: IR) -> List[int]:
-    starts = [i for i,c in enumerate(ir.cards) if str(c.pre.get("accepts")) in {"DataFrame","Series"}]
-    return starts if starts else list(range(len(ir.cards)))
+def pick_start_indices(table: CardTable) -> List[int]:
+    starts = table.rows_accepting({"DataFrame","Series"})
+    return starts if starts else list(range(len(table)))
 
-def try_one_plan(language: str, library: str, ir: IR,
-                 plan: List[int],
-                 arg_resamples: int,
-                 env: Dict[str, object]) -> Optional[Dict]:
-    # multiple arg resamples per plan
-    for _ in range(max(1, arg_resamples)):
-        kwarg_list = [sample_kwargs(ir.cards[i].pre.get("args") or [], env) for i in plan]
+def _sandbox_timeout() -> float:
+    return float(os.getenv("CT_TIMEOUT", "8.0"))
+
+def _pack(ir: IR, cand: Candidate, res: SandboxResult) -> Dict:
+    out_preview = "\n".join(res.stdout.splitlines()[:5])
+    return {
+        "apis": [ir.cards[i].qualname for i in cand.plan],
+        "kwargs": cand.kwargs,
+        "program": cand.program,
+        "stdout": res.stdout,
+        "preview": out_preview,
+    }
+
+def plan_candidates(language: str, library: str, ir: IR,
+                    plan: List[int],
+                    arg_resamples: int,
+                    env: Dict[str, object],
+                    gen: Optional["np.random.Generator"] = None,
+                    memo: Optional[FailureMemo] = None) -> Iterator[Tuple[List[Dict[str, Any]], str, str]]:
+    """
+    Yield (kwargs, prefix, suffix); the program is prefix + suffix.
+    The `arg_resamples` kwarg lists are drawn at once from `gen` (see arg_stream) and
+    repeated draws are dropped, so a plan never runs the same program twice.
+    memo: a draw is kept with probability kwargs_weight of each step's argument shape, so
+    shapes known to fail for a card are run less often or not at all.
+    """
+    realizer = get_realizer(language, library)
+    if gen is None:
+        gen = arg_stream()
+    k = max(1, arg_resamples)
+    with span("sample_kwargs"):
+        draws = sample_kwargs_batch([ir.cards[i].pre.get("args") or [] for i in plan], env, k, gen)
+    count("kwargs.duplicates", k - len(draws))
+    for kwarg_list in draws:
+        if memo is not None:
+            ws = [memo.kwargs_weight(ir.cards[i].qualname, kw) for i, kw in zip(plan, kwarg_list)]
+            if not all(w >= 1.0 or gen.random() < w for w in ws):
+                memo.skipped += 1
+                continue
         try:
-            code = realize_program(language, library, ir, plan, kwarg_list)
+            with span("realize"):
+                prefix, suffix = realizer.parts(ir, plan, kwarg_list)
         except Exception:
+            count("realize.failed")
             continue  # realization failed (e.g., missing fixture) → resample args/plan
+        yield kwarg_list, prefix, suffix
 
-        res = run_code(code, timeout=float(os.getenv("CT_TIMEOUT", "8.0")), allowed_imports=[library])
+def try_one_plan(language: str, library: str, ir: IR,
+                 plan: List[int],
+                 arg_resamples: int,
+                 env: Dict[str, object],
+                 pool: Optional[SandboxPool] = None) -> Optional[Dict]:
+    for kwarg_list, prefix, suffix in plan_candidates(language, library, ir, plan, arg_resamples, env):
+        code = prefix + suffix
+        timeout = _sandbox_timeout()
+        res = pool.run(code, timeout=timeout) if pool else run_code(code, timeout=timeout, allowed_imports=[library])
         if not res.ok:
             continue
-
-        out_preview = "\n".join(res.stdout.splitlines()[:5])
-        return {
-            "apis": [ir.cards[i].qualname for i in plan],
-            "kwargs": kwarg_list,
-            "program": code,
-            "stdout": res.stdout,
-            "preview": out_preview,
-        }
+        return _pack(ir, Candidate(0, 0, plan, kwarg_list, code), res)
     return None
 
-def generate_question_multi(library: str,
-                            language: str = "python",
-                            cards_path: Optional[str] = None,
-                            max_plans: int = 200,
-                            arg_resamples: int = 3) -> Dict:
-    cards_path = cards_path or f"data/cards/{language}/{library}/cards.ctdsl"
-    ir: IR = load_cards(cards_path)
-
-    compat_pairs, stop_set = build_compat(ir)
-    if not compat_pairs:
-        raise SystemExit("No compatible pairs; regenerate cards with a higher limit or improve traits.")
-
-    starts = pick_start_indices(ir)
-    env = {"columns": ["A","B","C"]}  # generic sampler hint
+def make_planner(compat: CompatGraph, kind: str = "sample",
+                 bandit: Optional[BetaStats] = None) -> Callable[[int, random.Random], Optional[List[int]]]:
+    """
+    'sample':   uniform draw from the precomputed plan space (planner.sampler)
+    'z3':       persistent Z3 session (planner.z3core), for richer constraints; never repeats a plan
+    'thompson': successors drawn by Thompson sampling on `bandit` counters (planner.selector)
+    """
+    if kind == "thompson":
+        return ThompsonSelector(compat, bandit).sample
+    if kind == "z3":
+        from codetutor.core.planner.z3core import PlannerSession
+        session = PlannerSession(compat)
+        return lambda a1, rng: session.next_plan(a1)
+    sampler = PlanSampler(compat)
+    return sampler.sample
 
+def iter_candidates(language: str, library: str, ir: IR,
+                    compat: CompatGraph,
+                    max_plans: int, arg_resamples: int,
+                    env: Dict[str, object],
+                    rng: random.Random,
+                    planner: str = "sample",
+                    memo: Optional[FailureMemo] = None,
+                    bandit: Optional[BetaStats] = None,
+                    gen: Optional["np.random.Generator"] = None) -> Iterator[Candidate]:
+    """
+    Plans are drawn from rng, their kwargs from gen (default: a stream seeded from rng).
+    Without a memo the candidate stream depends only on the IR, rng and gen, never on sandbox
+    outcomes, so a fixed seed yields the same stream whatever the number of workers.
+    memo: plans are kept with probability memo.plan_weight (up to 4 draws per attempt) and
+    kwargs are drawn likewise, so known-bad edges and argument shapes are rarely run again.
+    The stream then also depends on the outcomes recorded so far.
+    planner 'thompson' also picks the start node by Thompson sampling on `bandit`, which
+    the caller updates as results come in (the same caveat applies).
+    """
+    starts = pick_start_indices(compat.table)
+    if planner == "thompson":
+        selector = ThompsonSelector(compat, bandit)
+        choose, pick_start = selector.sample, lambda: selector.start(starts, rng)
+    else:
+        choose, pick_start = make_planner(compat, planner), lambda: rng.choice(starts)
+    if gen is None:
+        gen = arg_stream(rng.getrandbits(64))
+    quals = compat.table.qualnames
+    seq = 0
     # Plan attempts; vary start node to diversify search
     for attempt in range(1, max_plans + 1):
-        a1_idx = random.choice(starts)
-        plan = choose_plan(a1_idx, len(ir.cards), compat_pairs, stop_set)
+        count("attempts")
+        a1_idx = pick_start()
+        for _ in range(1 if memo is None else 4):
+            with span("choose_plan", planner=planner):
+                plan = choose(a1_idx, rng)
+            if memo is None or not plan:
+                break
+            w = memo.plan_weight([quals[i] for i in plan])
+            if w >= 1.0 or rng.random() < w:
+                break
+            memo.skipped += 1
+            plan = None
         if not plan:
+            count("attempts.no_plan")
             continue
+        for kwarg_list, prefix, suffix in plan_candidates(language, library, ir, plan, arg_resamples,
+                                                          env, gen, memo):
+            count("candidates")
+            yield Candidate(seq, attempt, plan, kwarg_list, prefix + suffix, prefix)
+            seq += 1
+
+def _observe(memo: Optional[FailureMemo], bandit: Optional[BetaStats], compat: CompatGraph,
+             cand: Candidate, res: SandboxResult, reward: bool) -> None:
+    """
+    Record a result in the bandit counters (`reward`: it gave a new question), the trace
+    counters (failures by reason) and the failure memo, blaming the step whose line raised.
+    """
+    quals = [compat.table.qualnames[i] for i in cand.plan]
+    if bandit is not None:
+        bandit.update(quals, reward)
+    if res.ok:
+        count("results.ok")
+        if memo is not None and cand.prefix:
+            memo.record(quals, cand.kwargs)
+        return
+    site = failure_site(res.stderr) if memo is not None or tracing() else None
+    if tracing():
+        reason = ("timeout" if res.timed_out else "truncated" if res.truncated else site[0] if site
+                  else "empty_output" if res.returncode == 0 else f"exit_{res.returncode}")
+        count(f"results.failed.{reason}")
+    if memo is None or not cand.prefix or site is None:
+        return  # timeout, crash or empty output: nothing to blame a step for
+    exc, lineno = site
+    step = step_at(cand.prefix, len(cand.plan), lineno) if lineno is not None else None
+    if step is not None:
+        memo.record(quals, cand.kwargs, step, exc)
 
-        pack = try_one_plan(language, library, ir, plan, arg_resamples, env)
-        if pack:
-            # success → package as a question artifact
-            fp = fingerprint(pack["stdout"])
-            out_dir = Path("data") / "questions" / language / library
-            out_dir.mkdir(parents=True, exist_ok=True)
-
-            # Minimal QG (template; FLAN optional if installed)
-            qg = render_question(
-                apis=pack["apis"],
-                output_preview=pack["preview"],
-                inputs_hint=None,
-                requirements=[]
-            )
-            doc = {
-                "library": library,
-                "apis": pack["apis"],
-                "kwargs": pack["kwargs"],
-                "program": pack["program"],
-                "output_preview": pack["preview"],
-                "fingerprint": fp,
-                "question_text": qg["question_text"],
-                "created_at": int(time.time()),
-                "attempt": attempt,
-            }
-            (out_dir / f"q_{fp}.json").write_text(json.dumps(doc, indent=2), encoding="utf-8")
-            return doc
+def _prefix_groups(batch: List[Candidate]) -> List[List[Candidate]]:
+    groups: Dict[str, List[Candidate]] = {}
+    for c in batch:
+        groups.setdefault(c.prefix, []).append(c)
+    return list(groups.values())
 
+def run_candidates(cands: Iterator[Candidate], pool: SandboxPool,
+                   workers: int = 1, share_prefix: bool = False) -> Iterator[Tuple[Candidate, SandboxResult]]:
+    """
+    Run candidates with up to `workers` sandboxes in flight; yield results in stream order.
+    Stopping the iteration cancels everything not yet started and kills the sandboxes still
+    running (pool.cancel), so it returns at once instead of waiting out their timeouts.
+    share_prefix: candidates are read a few per worker at a time, and those with the same
+    prefix (fixture + first call) run it once through pool.run_shared; results are unchanged.
+    """
+    workers = max(1, workers)
+    timeout = _sandbox_timeout()
+    chunk = 4 * workers if share_prefix else 1
+    from concurrent.futures import ThreadPoolExecutor
+    ex = ThreadPoolExecutor(max_workers=workers)
+    # (candidate, future, index into the future's result list or -1 for a single result)
+    window: Deque[Tuple[Candidate, Future, int]] = deque()
+    it = iter(cands)
+    try:
+        while True:
+            batch = list(islice(it, chunk))
+            if not batch:
+                break
+            slot: Dict[int, Tuple[Future, int]] = {}
+            for group in (_prefix_groups(batch) if share_prefix else [batch]):
+                if len(group) == 1:
+                    slot[group[0].seq] = (ex.submit(pool.run, group[0].program, timeout), -1)
+                    continue
+                fut = ex.submit(pool.run_shared, group[0].prefix,
+                                [c.program[len(c.prefix):] for c in group], timeout)
+                for i, c in enumerate(group):
+                    slot[c.seq] = (fut, i)
+            for c in batch:
+                window.append((c, *slot[c.seq]))
+            # keep a few queued behind the running ones so workers never idle on the ordered head
+            while len(window) >= 2 * max(workers, chunk):
+                head, fut, i = window.popleft()
+                yield head, fut.result() if i < 0 else fut.result()[i]
+        while window:
+            head, fut, i = window.popleft()
+            yield head, fut.result() if i < 0 else fut.result()[i]
+    finally:
+        running = [fut for _, fut, _ in window if not fut.cancel() and not fut.done()]
+        ex.shutdown(wait=False, cancel_futures=True)
+        if running:
+            pool.cancel()
+
+def _question_doc(library: str, pack: Dict, attempt: int) -> Dict:
+    # success → package as a question artifact
+    fp = fingerprint(pack["stdout"])
+
+    # Minimal QG (template; FLAN optional if installed)
+    with span("render_question"):
+        qg = render_question(
+            apis=pack["apis"],
+            output_preview=pack["preview"],
+            inputs_hint=None,
+            requirements=[]
+        )
+    doc = {
+        "library": library,
+        "apis": pack["apis"],
+        "kwargs": pack["kwargs"],
+        "program": pack["program"],
+        "output_preview": pack["preview"],
+        "fingerprint": fp,
+        "question_text": qg["question_text"],
+        "created_at": int(time.time()),
+        "attempt": attempt,
+    }
+    return doc
+
+def _save_question(language: str, library: str, pack: Dict, attempt: int) -> Dict:
+    doc = _question_doc(library, pack, attempt)
+    out_dir = Path("data") / "questions" / language / library
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / f"q_{doc['fingerprint']}.json").write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    return doc
+
+def _load_plan_space(library: str, language: str, cards_path: Optional[str]):
+    cards_path = cards_path or f"data/cards/{language}/{library}/cards.ctdsl"
+    if Path(cards_path).suffix.lower() in {".db", ".sqlite", ".sqlite3"}:
+        # cards stored by synth_cards in the scan DB: no parsing, successors via indexed lookups
+        ir: IR = load_cards_db(cards_path, library)
+    else:
+        # CT_LAZY_CARDS=1: parse card bodies on demand via the byte-offset index (huge card files)
+        ir = load_cards(cards_path, lazy=os.getenv("CT_LAZY_CARDS") == "1")
+
+    compat = build_compat(ir)
+    if not compat:
+        raise SystemExit("No compatible pairs; regenerate cards with a higher limit or improve traits.")
+    return ir, compat
+
+def _open_learned(language: str, library: str, planner: str,
+                  learn: bool) -> Tuple[Optional[FailureMemo], Optional[BetaStats]]:
+    # learned state makes a run depend on earlier runs, so it is opt-in (thompson needs it)
+    if not (learn or planner == "thompson"):
+        return None, None
+    bandit = open_bandit_stats(language, library)
+    if bandit is None and planner == "thompson":
+        # CT_BANDIT_STATS=off: learn within this run only; the selector and _observe must
+        # share these counters, or every draw would stay on the uniform prior
+        bandit = BetaStats()
+    return open_failure_memo(language, library), bandit
+
+def generate_questions(library: str,
+                       language: str = "python",
+                       cards_path: Optional[str] = None,
+                       max_plans: int = 200,
+                       arg_resamples: int = 3,
+                       k: int = 1,
+                       workers: int = 1,
+                       seed: Optional[int] = None,
+                       planner: str = "sample",
+                       share_prefix: bool = False,
+                       learn: bool = False) -> List[Dict]:
+    """
+    Return the first `k` valid questions (at most one per plan attempt) in candidate-stream order.
+    learn: load the failure memo and bandit counters and persist them afterwards (always on
+    for the 'thompson' planner). Without it a fixed `seed` gives the same result on every
+    run, for any `workers` and `share_prefix`.
+    """
+    ir, compat = _load_plan_space(library, language, cards_path)
+    env = {"columns": ["A","B","C"]}  # generic sampler hint
+    rng = random.Random(seed)
+    # outcomes of earlier runs steer the search (see iter_candidates)
+    memo, bandit = _open_learned(language, library, planner, learn)
+    cands = iter_candidates(language, library, ir, compat, max_plans, arg_resamples, env, rng, planner,
+                            memo, bandit, arg_stream(seed))
+
+    docs: List[Dict] = []
+    done_attempts = set()
+    cache = open_exec_cache([library])  # programs seen in earlier runs are not re-executed
+    # warm workers: library imported once, one fork per candidate
+    with SandboxPool([library], size=workers, cache=cache) as pool:
+        results = run_candidates(cands, pool, workers, share_prefix)
+        try:
+            for cand, res in results:
+                _observe(memo, bandit, compat, cand, res, res.ok)
+                if not res.ok or cand.attempt in done_attempts:
+                    continue
+                done_attempts.add(cand.attempt)
+                docs.append(_save_question(language, library, _pack(ir, cand, res), cand.attempt))
+                if len(docs) >= k:
+                    return docs
+        finally:
+            results.close()
+            if cache is not None:
+                cache.close()
+            for learned in (memo, bandit):
+                if learned is not None:
+                    learned.save()
+
+    if docs:
+        return docs
     raise SystemExit(f"Failed to produce a valid snippet after {max_plans} plan attempts "
                      f"× {arg_resamples} arg resamples per plan.")
 
+def generate_question_multi(library: str,
+                            language: str = "python",
+                            cards_path: Optional[str] = None,
+                            max_plans: int = 200,
+                            arg_resamples: int = 3,
+                            workers: int = 1,
+                            seed: Optional[int] = None,
+                            planner: str = "sample",
+                            share_prefix: bool = False,
+                            learn: bool = False) -> Dict:
+    return generate_questions(library, language, cards_path, max_plans=max_plans,
+                              arg_resamples=arg_resamples, k=1, workers=workers, seed=seed,
+                              planner=planner, share_prefix=share_prefix, learn=learn)[0]
+
+def generate_batch(library: str,
+                   target: int,
+                   sink_path: str | Path,
+                   language: str = "python",
+                   cards_path: Optional[str] = None,
+                   max_plans: int = 200,
+                   arg_resamples: int = 3,
+                   workers: int = 1,
+                   seed: Optional[int] = None,
+                   planner: str = "sample",
+                   share_prefix: bool = False,
+                   learn: bool = False) -> Dict:
+    """
+    Stream up to `target` distinct questions into a JSONL/SQLite sink (see utils.io).
+    Cards and compat are built once for the whole batch. Questions are deduped on
+    output fingerprint + API sequence; re-running with the same sink resumes: accepted
+    programs are never re-run and only the missing questions are generated.
+    `max_plans` is the plan-attempt budget per question. The batch draws from one stream
+    per `seed`; a seeded resume replays it, skipping accepted programs and their attempts
+    (failures come from the exec cache), so it continues where the interrupted run stopped.
+    Without a seed a resume draws a new stream and only skips known programs and questions.
+    learn: as in generate_questions.
+    """
+    sink = open_question_sink(sink_path)
+    try:
+        seen_keys, seen_programs, done_attempts = set(), set(), set()
+        for d in sink.accepted():
+            seen_keys.add(question_key(d))
+            seen_programs.add(fingerprint(d["program"]))
+            if seed is not None and d.get("attempt") is not None:
+                done_attempts.add(d["attempt"])  # attempt numbers only mean something in the same stream
+        have = len(seen_keys)
+        stats = {"sink": str(sink_path), "resumed_from": have, "accepted": 0, "duplicates": 0, "candidates": 0}
+        if have >= target:
+            return stats
+
+        ir, compat = _load_plan_space(library, language, cards_path)
+        env = {"columns": ["A","B","C"]}  # generic sampler hint
+        rng = random.Random(seed)
+        # a seeded resume replays the attempts already spent, so it keeps the whole budget
+        budget = max_plans * (target if seed is not None else target - have)
+        memo, bandit = _open_learned(language, library, planner, learn)
+        cands = (c for c in iter_candidates(language, library, ir, compat,
+                                             budget, arg_resamples, env, rng, planner, memo, bandit,
+                                             arg_stream(seed))
+                 if c.attempt not in done_attempts and fingerprint(c.program) not in seen_programs)
+
+        cache = open_exec_cache([library])
+        with SandboxPool([library], size=workers, cache=cache) as pool:
+            results = run_candidates(cands, pool, workers, share_prefix)
+            try:
+                for cand, res in results:
+                    stats["candidates"] += 1
+                    if not res.ok or cand.attempt in done_attempts:
+                        _observe(memo, bandit, compat, cand, res, res.ok)
+                        continue
+                    doc = _question_doc(library, _pack(ir, cand, res), cand.attempt)
+                    key = question_key(doc)
+                    _observe(memo, bandit, compat, cand, res, key not in seen_keys)  # duplicates earn nothing
+                    if key in seen_keys:
+                        stats["duplicates"] += 1
+                        continue
+                    done_attempts.add(cand.attempt)
+                    seen_keys.add(key); seen_programs.add(fingerprint(cand.program))
+                    sink.write(doc)
+                    stats["accepted"] += 1
+                    if have + stats["accepted"] >= target:
+                        break
+            finally:
+                results.close()
+                if cache is not None:
+                    stats["cache_hits"] = cache.hits
+                    cache.close()
+                if memo is not None:
+                    stats["memo_skips"] = memo.skipped
+                    memo.save()
+                if bandit is not None:
+                    bandit.save()
+        return stats
+    finally:
+        sink.close()
+
 # ---------- tiny CLI (keep args minimal) ----------
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("usage: python -m codetutor.core.cli.gen_question <library> [<max_plans> [<arg_resamples>]]")
-        sys.exit(2)
-    lib = sys.argv[1]
-    max_plans = int(sys.argv[2]) if len(sys.argv) > 2 else int(os.getenv("CT_MAX_PLANS", "200"))
-    arg_resamples = int(sys.argv[3]) if len(sys.argv) > 3 else int(os.getenv("CT_ARG_RESAMPLES", "3"))
-    q = generate_question_multi(lib, "python", None, max_plans=max_plans, arg_resamples=arg_resamples)
-    print(json.dumps(q, indent=2))
+    import argparse
+    ap = argparse.ArgumentParser(prog="gen_question")
+    ap.add_argument("library")
+    ap.add_argument("max_plans", nargs="?", type=int, default=int(os.getenv("CT_MAX_PLANS", "200")))
+    ap.add_argument("arg_resamples", nargs="?", type=int, default=int(os.getenv("CT_ARG_RESAMPLES", "3")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("CT_WORKERS", "1")),
+                    help="sandbox runs kept in flight at once")
+    ap.add_argument("--first", type=int, default=1, metavar="K", help="return the first K valid questions")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--cards", default=None,
+                    help="cards.ctdsl file or scan DB with stored cards (default data/cards/python/<library>/cards.ctdsl)")
+    ap.add_argument("--planner", choices=["sample", "z3", "thompson"], default=os.getenv("CT_PLANNER", "sample"),
+                    help="plan source: precomputed plan-space sampling (default), Z3, or Thompson sampling "
+                         "on the outcomes of earlier runs")
+    ap.add_argument("--share-prefix", action="store_true", default=os.getenv("CT_SHARE_PREFIX") == "1",
+                    help="run each shared fixture + first call once and fork per continuation")
+    ap.add_argument("--learn", action="store_true", default=os.getenv("CT_LEARN") == "1",
+                    help="steer by, and update, the failure memo and bandit counters of earlier runs "
+                         "(implied by --planner thompson; results then depend on those runs)")
+    ap.add_argument("--count", type=int, default=None,
+                    help="batch mode: stream this many distinct questions to --out (resumable)")
+    ap.add_argument("--out", default=None,
+                    help="batch sink, .jsonl or .db (default data/questions/python/<library>/questions.jsonl)")
+    args = ap.parse_args()
+    if args.count is not None:
+        out = args.out or Path("data") / "questions" / "python" / args.library / "questions.jsonl"
+        stats = generate_batch(args.library, args.count, out, "python", args.cards, max_plans=args.max_plans,
+                               arg_resamples=args.arg_resamples, workers=args.workers, seed=args.seed,
+                               planner=args.planner, share_prefix=args.share_prefix, learn=args.learn)
+        print(json.dumps(stats, indent=2))
+        sys.exit(0)
+    qs = generate_questions(args.library, "python", args.cards, max_plans=args.max_plans,
+                            arg_resamples=args.arg_resamples, k=args.first,
+                            workers=args.workers, seed=args.seed, planner=args.planner,
+                            share_prefix=args.share_prefix, learn=args.learn)
+    print(json.dumps(qs[0] if args.first == 1 else qs, indent=2))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json, pickle, sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from blake3 import blake3
+from codetutor.core.dsl.loader import Card, PLANNING_FACTS, load_cards
+
+# bump when the trait set or its encoding in card_facts changes
+ONTOLOGY_VERSION = "planning-v1"
+
+# trait name -> kind; planning facts become indexed card_facts rows, the full card goes to ir_blob
+#   enum: val_enum_code, one code space shared by all enum traits (so returns=X joins accepts=X)
+#   bool: val_i 0/1
+TRAITS: Dict[str, str] = {
+    "accepts": "enum", "accepts_axis": "enum", "accepts_dtype": "enum",
+    "returns": "enum", "produces_axis": "enum", "produces_dtype": "enum",
+    "is_valid_stop": "bool", "mutates_input": "bool",
+}
+
+def card_blob(c: Card) -> bytes:
+    """Compact binary IR: a pickled plain tuple (no class paths), read back by card_from_blob."""
+    return pickle.dumps((c.qualname, c.profile, c.pre, c.post, c.links), protocol=pickle.HIGHEST_PROTOCOL)
+
+def card_from_blob(blob: bytes) -> Card:
+    qualname, profile, pre, post, links = pickle.loads(blob)
+    return Card(qualname=qualname, profile=profile, pre=pre, post=post, links=links)
+
+def trait_ids(con: sqlite3.Connection) -> Dict[str, int]:
+    """Ensure the planning traits exist; return name -> id."""
+    con.executemany(
+        "INSERT OR IGNORE INTO traits(name,king,category) VALUES(?,?,?)",
+        [(name, TRAITS[name], ns) for ns, names in PLANNING_FACTS.items() for name in names])
+    return dict(con.execute("SELECT name, id FROM traits"))
+
+def label_codes(con: sqlite3.Connection) -> Dict[str, int]:
+    return {label: code for code, label in con.execute("SELECT DISTINCT code, label FROM trait_enums")}
+
+def _ontology_version_id(con: sqlite3.Connection) -> int:
+    row = con.execute("SELECT id FROM ontology_versions WHERE version=?", (ONTOLOGY_VERSION,)).fetchone()
+    if row:
+        return row[0]
+    return con.execute("INSERT INTO ontology_versions(version) VALUES(?)", (ONTOLOGY_VERSION,)).lastrowid
+
+def _fact_value(kind: str, v: Any) -> Optional[Any]:
+    # same absence rules as CardTable: empty/None enum facts are not stored
+    if kind == "bool":
+        return None if v is None else int(bool(v))
+    return None if v is None or v == "" else str(v)
+
+class CardEmitter:
+    """
+    Writes cards of one library into cards/card_facts with executemany in chunks.
+    Card ids are assigned up front so facts need no lastrowid round-trip. Previous cards of
+    the library are replaced; nothing is visible to readers until close() commits.
+    """
+    def __init__(self, con: sqlite3.Connection, library_id: int, chunk: int = 5000):
+        self.con, self.library_id, self.chunk = con, library_id, chunk
+        self.traits = trait_ids(con)
+        self.codes = label_codes(con)
+        self.next_code = (con.execute("SELECT IFNULL(MAX(code), -1) FROM trait_enums").fetchone()[0]) + 1
+        self.enums: set = set(con.execute("SELECT trait_id, code FROM trait_enums"))
+        self.onto_id = _ontology_version_id(con)
+        mine = "SELECT c.id FROM cards c JOIN symbols s ON s.id=c.symbol_id WHERE s.library_id=?"
+        con.execute(f"DELETE FROM card_facts WHERE card_id IN ({mine})", (library_id,))
+        con.execute(f"DELETE FROM cards WHERE id IN ({mine})", (library_id,))
+        self.next_id = (con.execute("SELECT IFNULL(MAX(id), 0) FROM cards").fetchone()[0]) + 1
+        self.n = 0
+        self.cards: List[tuple] = []
+        self.facts: List[tuple] = []
+        self.new_enums: List[tuple] = []
+
+    def _code(self, trait_id: int, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = self.next_code
+            self.next_code += 1
+        if (trait_id, code) not in self.enums:
+            self.enums.add((trait_id, code))
+            self.new_enums.append((trait_id, code, label))
+        return code
+
+    def add(self, symbol_id: int, card: Card) -> None:
+        card_id = self.next_id
+        self.next_id += 1
+        blob = card_blob(card)
+        self.cards.append((card_id, symbol_id, self.onto_id, blob, blake3(blob).hexdigest(),
+                           json.dumps([card.profile])))
+        for ns, names in PLANNING_FACTS.items():
+            src = card.pre if ns == "pre" else card.post
+            for name in names:
+                kind = TRAITS[name]
+                v = _fact_value(kind, src.get(name))
+                if v is None:
+                    continue
+                tid = self.traits[name]
+                if kind == "bool":
+                    self.facts.append((card_id, int(ns == "pre"), tid, None, v))
+                else:
+                    self.facts.append((card_id, int(ns == "pre"), tid, self._code(tid, v), None))
+        self.n += 1
+        if len(self.cards) + len(self.facts) >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.new_enums:
+            self.con.executemany("INSERT INTO trait_enums(trait_id,code,label) VALUES(?,?,?)", self.new_enums)
+        if self.cards:
+            self.con.executemany(
+                "INSERT INTO cards(id,symbol_id,ontology_version_id,ir_blob,hash,profiles_json) "
+                "VALUES(?,?,?,?,?,?)", self.cards)
+        if self.facts:
+            self.con.executemany(
+                "INSERT INTO card_facts(card_id,is_pre,trait_id,val_enum_code,val_i) VALUES(?,?,?,?,?)",
+                self.facts)
+        self.cards, self.facts, self.new_enums = [], [], []
+
+    def close(self) -> int:
+        self.flush()
+        self.con.commit()
+        return self.n
+
+def library_id(con: sqlite3.Connection, library: str) -> int:
+    row = con.execute("SELECT id FROM libraries WHERE name=?", (library,)).fetchone()
+    if row is None:
+        raise ValueError(f"library {library!r} has not been scanned into this DB")
+    return row[0]
+
+def emit_cards(db_path: str, library: str, cards: Iterable[Card]) -> Tuple[int, int]:
+    """
+    Replace the stored cards of `library` (e.g. from a hand-edited .ctdsl file).
+    Cards are linked to scanned symbols by qualname; returns (written, skipped without symbol).
+    """
+    con = sqlite3.connect(db_path)
+    try:
+        lib_id = library_id(con, library)
+        ids = dict(con.execute("SELECT qualname, id FROM symbols WHERE library_id=?", (lib_id,)))
+        em, skipped = CardEmitter(con, lib_id), 0
+        for c in cards:
+            sym = ids.get(c.qualname)
+            if sym is None:
+                skipped += 1; continue
+            em.add(sym, c)
+        return em.close(), skipped
+    finally:
+        con.close()
+
+if __name__ == "__main__":
+    # Usage: python -m codetutor.core.dsl.emit <cards.ctdsl> <library> [--db data/db/api_index.db]
+    import argparse
+    ap = argparse.ArgumentParser(prog="emit")
+    ap.add_argument("cards")
+    ap.add_argument("library")
+    ap.add_argument("--db", default="data/db/api_index.db")
+    args = ap.parse_args()
+    n, skipped = emit_cards(args.db, args.library, load_cards(args.cards).cards)
+    print(f"Stored {n} cards ({skipped} without a scanned symbol) → {args.db}")
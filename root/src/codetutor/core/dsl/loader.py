@@ -1,10 +1,25 @@
 from __future__ import annotations
+import json, mmap, os, pickle, re, sqlite3
+from collections import OrderedDict
+from collections.abc import Sequence
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from lark import Lark, Transformer, Token, Tree
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from blake3 import blake3
+from codetutor.utils.logging import traced
 
 GRAMMAR_PATH = Path(__file__).with_name("ctdsl.lark")
+# content-addressed IR cache: <dir>/<blake3(format, grammar, parser + IR code, cards file)>.pkl
+IR_CACHE_DIR = Path(os.getenv("CT_IR_CACHE", "data/cache/ir"))
+IR_CACHE_FORMAT = b"ir-v2"  # bump when Card/IR layout changes
+INDEX_FORMAT = 2              # bump when the .idx layout changes
+
+# facts the planner reads for every card (compat, start selection); everything else is per-plan
+PLANNING_FACTS = {
+    "pre":  ("accepts", "accepts_axis", "accepts_dtype"),
+    "post": ("returns", "produces_axis", "produces_dtype", "is_valid_stop", "mutates_input"),
+}
 
 @dataclass
 class Card:
@@ -19,52 +34,232 @@ class IR:
     cards: List[Card]
     index: Dict[str, int]
 
-class _ToPython(Transformer):
-    def SIGNED_NUMBER(self, t: Token):
-        s = str(t)
-        return int(s) if s.lstrip("-").isdigit() else float(s)
-    def ESCAPED_STRING(self, t: Token):
-        return t[1:-1]
-    def true(self, _):  return True
-    def false(self, _): return False
-    def tuple(self, items): return tuple(items)
-    def list(self, items):  return list(items)
-
-class _BuildIR(Transformer):
-    def __init__(self):
-        self.cards: List[Card] = []
-        self._vp = _ToPython()
-
-    def card(self, items):
-        qual = items[0]; profile = items[1]
-        c = Card(qualname=qual, profile=profile)
-        for it in items[2:]:
-            if isinstance(it, tuple) and len(it) == 3 and it[0] in ("pre","post"):
-                ns, key, val = it
-                (c.pre if ns=="pre" else c.post)[key] = val
-            elif isinstance(it, tuple) and len(it) == 2:
-                c.links.append(it)
-        self.cards.append(c)
-
-    def fact(self, items):
-        ns = str(items[0]); key = str(items[1]); val = self._vp.transform(Tree("value", items[2:3]))
-        return (ns, key, val)
-
-    def modal_fact(self, items):
-        # treat like a normal fact for now; modal semantics handled later
-        _modal = str(items[0]); ns = str(items[1]); key = str(items[2]); val = self._vp.transform(Tree("value", items[3:4]))
-        return (ns, key, val)
-
-    def link(self, items):
-        rel = str(items[0]); tgt = str(items[1])
-        return (rel, tgt)
-
-    def QUALNAME(self, t): return str(t)
-    def CNAME(self, t):    return str(t)
-
-def load_cards(path: str | Path) -> IR:
-    text = Path(path).read_text(encoding="utf-8")
-    parser = Lark.open(GRAMMAR_PATH.as_posix(), parser="lalr")
-    tree = parser.parse(text)
-    tx = _BuildIR(); tx.transform(tree)
-    return IR(cards=tx.cards, index={c.qualname:i for i,c in enumerate(tx.cards)})
+    def planning_cards(self) -> List[Card]:
+        """Cards as seen by whole-graph passes; only PLANNING_FACTS are guaranteed to be present."""
+        return self.cards
+
+def parse_cards(text: str) -> IR:
+    from codetutor.core.dsl.parser import parse_cards as _parse  # lark loads on the first parse
+    return _parse(text)
+
+@lru_cache(maxsize=None)
+def _code_stamp() -> bytes:
+    # the grammar and the code that turns its trees into IR (parser.py) or defines the IR
+    # (this module): editing either invalidates the cache without a format bump
+    h = blake3(GRAMMAR_PATH.read_bytes())
+    for mod in ("parser.py", "loader.py"):
+        h.update(b"\0"); h.update(Path(__file__).with_name(mod).read_bytes())
+    return h.digest()
+
+def _cache_key(data: bytes) -> str:
+    h = blake3(IR_CACHE_FORMAT)
+    h.update(_code_stamp()); h.update(b"\0"); h.update(data)
+    return h.hexdigest()
+
+@traced("load_cards")
+def load_cards(path: str | Path, use_cache: bool = True, lazy: bool = False) -> IR:
+    if lazy:
+        return load_cards_lazy(path)
+    data = Path(path).read_bytes()
+    cache_path = IR_CACHE_DIR / f"{_cache_key(data)}.pkl" if use_cache else None
+    if cache_path is not None and cache_path.exists():
+        try:
+            with cache_path.open("rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # unreadable entry → re-parse and overwrite
+    ir = parse_cards(data.decode("utf-8"))
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(ir, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass  # cache is best-effort
+    return ir
+
+
+# ---------- lazy loading (byte-offset index) ----------
+_CARD_START = re.compile(rb"^[ \t]*card[ \t]+([A-Za-z_][A-Za-z0-9_.]*)[ \t]*:", re.M)
+
+def _planning_stub(c: Card) -> Card:
+    return Card(qualname=c.qualname, profile=c.profile,
+                pre={k: c.pre[k] for k in PLANNING_FACTS["pre"] if k in c.pre},
+                post={k: c.post[k] for k in PLANNING_FACTS["post"] if k in c.post})
+
+class _LazyCards(Sequence):
+    """Cards parsed on first access from an mmap of the .ctdsl file; keeps an LRU of parsed cards."""
+    def __init__(self, path: Path, spans: List[Tuple[int, int]], max_cached: int = 4096):
+        self.path = path
+        self.spans = spans
+        self.max_cached = max_cached
+        self._mm: Optional[mmap.mmap] = None
+        self._lru: "OrderedDict[int, Card]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def _block(self, i: int) -> str:
+        if self._mm is None:
+            with self.path.open("rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start, end = self.spans[i]
+        return self._mm[start:end].decode("utf-8")
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        c = self._lru.get(i)
+        if c is not None:
+            self._lru.move_to_end(i)
+            return c
+        c = parse_cards(self._block(i)).cards[0]
+        self._lru[i] = c
+        if len(self._lru) > self.max_cached:
+            self._lru.popitem(last=False)
+        return c
+
+class LazyIR(IR):
+    """
+    IR whose cards are parsed on demand. Planning facts for every card come from the
+    index, so compat/start selection never parse card bodies.
+    """
+    def __init__(self, path: Path, entries: List[list]):
+        self.cards = _LazyCards(path, [(e[1], e[2]) for e in entries])
+        self.index = {e[0]: i for i, e in enumerate(entries)}
+        self._stubs = [Card(qualname=e[0], profile=e[3], pre=e[4], post=e[5]) for e in entries]
+
+    def planning_cards(self) -> List[Card]:
+        return self._stubs
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+def build_card_index(path: str | Path) -> List[list]:
+    """
+    Scan `path` for card blocks and write `<path>.idx` (JSON) next to it:
+    one [qualname, start, end, profile, pre_facts, post_facts] entry per card.
+    """
+    path = Path(path)
+    st = path.stat()
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        starts = [m.start() for m in _CARD_START.finditer(mm)]
+        ends = starts[1:] + [len(mm)]
+        entries = []
+        for start, end in zip(starts, ends):
+            c = _planning_stub(parse_cards(mm[start:end].decode("utf-8")).cards[0])
+            entries.append([c.qualname, start, end, c.profile, c.pre, c.post])
+    doc = {"format": INDEX_FORMAT, "code": _code_stamp().hex(),
+           "size": st.st_size, "mtime_ns": st.st_mtime_ns, "entries": entries}
+    try:
+        tmp = _index_path(path).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(doc, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, _index_path(path))
+    except OSError:
+        pass  # read-only location → index lives for this process only
+    return entries
+
+def _read_card_index(path: Path) -> Optional[List[list]]:
+    p = _index_path(path)
+    if not p.exists():
+        return None
+    try:
+        doc = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    st = path.stat()
+    if (doc.get("format") != INDEX_FORMAT or doc.get("size") != st.st_size
+            or doc.get("mtime_ns") != st.st_mtime_ns
+            or doc.get("code") != _code_stamp().hex()):  # facts were parsed by other code
+        return None
+    return doc["entries"]
+
+def load_cards_lazy(path: str | Path) -> LazyIR:
+    """Open a (possibly huge) .ctdsl file through its byte-offset index, building it on first use."""
+    path = Path(path)
+    entries = _read_card_index(path)
+    if entries is None:
+        entries = build_card_index(path)
+    return LazyIR(path, entries)
+
+
+# ---------- DB-backed IR (cards/card_facts written by core.dsl.emit) ----------
+class _DbCards(Sequence):
+    """Cards decoded from cards.ir_blob on first access; keeps an LRU like _LazyCards."""
+    def __init__(self, con: sqlite3.Connection, card_ids: List[int], max_cached: int = 4096):
+        self.con = con
+        self.card_ids = card_ids
+        self.max_cached = max_cached
+        self._lru: "OrderedDict[int, Card]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.card_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        c = self._lru.get(i)
+        if c is not None:
+            self._lru.move_to_end(i)
+            return c
+        from codetutor.core.dsl.emit import card_from_blob
+        blob = self.con.execute("SELECT ir_blob FROM cards WHERE id=?", (self.card_ids[i],)).fetchone()[0]
+        c = self._lru[i] = card_from_blob(blob)
+        if len(self._lru) > self.max_cached:
+            self._lru.popitem(last=False)
+        return c
+
+class DbIR(IR):
+    """
+    IR stored in the scan DB. Card bodies are read on demand and planning facts come from
+    card_facts, so nothing is parsed; build_compat() looks successors up through
+    ix_card_facts_trait instead of joining every card in memory.
+    """
+    def __init__(self, con: sqlite3.Connection, library_id: int):
+        self.con = con
+        self.library_id = library_id
+        rows = con.execute(
+            "SELECT c.id, s.qualname, c.profiles_json FROM cards c JOIN symbols s ON s.id=c.symbol_id "
+            "WHERE s.library_id=? ORDER BY c.id", (library_id,)).fetchall()
+        self.card_ids = [r[0] for r in rows]
+        self.row_of = {cid: i for i, cid in enumerate(self.card_ids)}
+        self.cards = _DbCards(con, self.card_ids)
+        self.index = {r[1]: i for i, r in enumerate(rows)}
+        self.heads = [(r[1], (json.loads(r[2] or "[]") or [""])[0]) for r in rows]  # (qualname, profile)
+        self._stubs: Optional[List[Card]] = None
+
+    def labels(self) -> Dict[int, str]:
+        return dict(self.con.execute("SELECT DISTINCT code, label FROM trait_enums"))
+
+    def facts(self) -> Iterator[Tuple[int, str, Optional[int], Optional[int]]]:
+        """(row, trait name, val_enum_code, val_i) for every stored planning fact of the library."""
+        row_of = self.row_of
+        for card_id, name, code, val_i in self.con.execute(
+                "SELECT f.card_id, t.name, f.val_enum_code, f.val_i FROM card_facts f "
+                "JOIN traits t ON t.id=f.trait_id JOIN cards c ON c.id=f.card_id "
+                "JOIN symbols s ON s.id=c.symbol_id WHERE s.library_id=?", (self.library_id,)):
+            yield row_of[card_id], name, code, val_i
+
+    def planning_cards(self) -> List[Card]:
+        if self._stubs is None:
+            labels = self.labels()
+            stubs = [Card(qualname=q, profile=p) for q, p in self.heads]
+            for row, name, code, val_i in self.facts():
+                c = stubs[row]
+                (c.pre if name in PLANNING_FACTS["pre"] else c.post)[name] = \
+                    labels[code] if code is not None else bool(val_i)
+            self._stubs = stubs
+        return self._stubs
+
+@traced("load_cards")
+def load_cards_db(db_path: str | Path, library: str) -> DbIR:
+    """Open the cards stored for `library` (see core.dsl.emit) without reading card bodies."""
+    con = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True, check_same_thread=False)
+    row = con.execute("SELECT id FROM libraries WHERE name=?", (library,)).fetchone()
+    if row is None:
+        raise ValueError(f"library {library!r} has not been scanned into {db_path}")
+    return DbIR(con, row[0])
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import json
+from functools import lru_cache
+from typing import List
+from lark import Lark, Transformer, Token, Tree
+from codetutor.core.dsl.loader import GRAMMAR_PATH, Card, IR
+
+# ctdsl text -> IR; apart from loader so lark is imported only when a deck is actually parsed
+
+class _ToPython(Transformer):
+    def SIGNED_NUMBER(self, t: Token):
+        s = str(t)
+        return int(s) if s.lstrip("-").isdigit() else float(s)
+    def ESCAPED_STRING(self, t: Token):
+        # writers quote with json.dumps, so undo exactly that
+        try:
+            return json.loads(t)
+        except ValueError:
+            return t[1:-1]
+    def true(self, _):  return True
+    def false(self, _): return False
+    def null(self, _):  return None
+    # the elements come as one value_list child; an empty "()"/"[]" leaves the placeholder
+    # None in its place (a null element is a None *inside* the value_list)
+    def value_list(self, items): return items
+    def tuple(self, items): return () if items[0] is None else tuple(items[0])
+    def list(self, items):  return [] if items[0] is None else list(items[0])
+
+class _BuildIR(Transformer):
+    def __init__(self):
+        self.cards: List[Card] = []
+        self._vp = _ToPython()
+
+    def card(self, items):
+        qual = items[0]; profile = items[1]
+        c = Card(qualname=qual, profile=profile)
+        for it in items[2:]:
+            if isinstance(it, tuple) and len(it) == 3 and it[0] in ("pre","post"):
+                ns, key, val = it
+                (c.pre if ns=="pre" else c.post)[key] = val
+            elif isinstance(it, tuple) and len(it) == 2:
+                c.links.append(it)
+        self.cards.append(c)
+
+    def _value(self, item):
+        return self._vp.transform(Tree("value", [item])).children[0]
+
+    def fact(self, items):
+        ns = str(items[0]); key = str(items[1]); val = self._value(items[2])
+        return (ns, key, val)
+
+    def modal_fact(self, items):
+        # treat like a normal fact for now; modal semantics handled later
+        _modal = str(items[0]); ns = str(items[1]); key = str(items[2]); val = self._value(items[3])
+        return (ns, key, val)
+
+    def link(self, items):
+        rel = str(items[0]); tgt = str(items[1])
+        return (rel, tgt)
+
+    def QUALNAME(self, t): return str(t)
+    def CNAME(self, t):    return str(t)
+
+@lru_cache(maxsize=None)
+def get_parser() -> Lark:
+    # compiled once per process; cache=True also reuses the LALR tables across processes
+    return Lark.open(GRAMMAR_PATH.as_posix(), parser="lalr", cache=True)
+
+def parse_cards(text: str) -> IR:
+    tree = get_parser().parse(text)
+    tx = _BuildIR(); tx.transform(tree)
+    return IR(cards=tx.cards, index={c.qualname:i for i,c in enumerate(tx.cards)})
@@ -1,23 +1,89 @@
 from __future__ import annotations
 import random
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from codetutor.utils.logging import traced
+
+if TYPE_CHECKING:
+    import numpy as np  # imported by the batch sampler only, to keep `import gen_question` cheap
 
 # params schema: list of (name:str, domain:str, required:bool, default:Optional[str])
-def sample_kwargs(params: List[Tuple[str,str,bool,object]], env: Dict[str,Any]) -> Dict[str,Any]:
+# rng: pass a seeded random.Random for reproducible draws; defaults to the global `random` module
+@traced("sample_kwargs")
+def sample_kwargs(params: List[Tuple[str,str,bool,object]], env: Dict[str,Any],
+                  rng: Optional[random.Random] = None) -> Dict[str,Any]:
+    rng = rng or random
     kwargs: Dict[str,Any] = {}
     for name, dom, required, default in params:
         if default is not None and not required:
             # often safest to omit optionals; include sometimes
-            if random.random() < 0.2: kwargs[name] = coerce(default)
+            if rng.random() < 0.2: kwargs[name] = coerce(default)
             continue
         if not required:
             # include some optional args randomly
-            if random.random() < 0.3:
-                kwargs[name] = sample_value(dom, env)
+            if rng.random() < 0.3:
+                kwargs[name] = sample_value(dom, env, rng)
             continue
-        kwargs[name] = sample_value(dom, env)
+        kwargs[name] = sample_value(dom, env, rng)
     return kwargs
 
+def arg_stream(seed: Optional[int] = None, worker: int = 0) -> "np.random.Generator":
+    """
+    Generator for sample_kwargs_batch: stream `worker` of `seed`, i.e. the same as
+    SeedSequence(seed).spawn(n)[worker], so workers draw independent, reproducible streams.
+    seed None: fresh OS entropy.
+    """
+    import numpy as np
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(worker,)))
+
+def _value_column(domain: str, env: Dict[str,Any], u: "np.ndarray") -> List[Any]:
+    # sample_value() for a column of uniforms u in [0, 1), one value per draw
+    d = domain or "any"
+    k = len(u)
+    if "bool" in d: return (u < 0.5).tolist()
+    if "int" in d: return (1 + (u * 3).astype(int)).tolist()
+    if "float" in d: return (0.1 + u * 2.9).round(2).tolist()
+    if "enum[" in d: return [sample_value(d, env)] * k
+    if "str|list[str]" in d:
+        col = (env.get("columns") or ["A"])[0]
+        return [col if x else [col] for x in (u < 0.5).tolist()]
+    if "list" in d: return [[] for _ in range(k)]
+    if "dict" in d: return [{} for _ in range(k)]
+    return [sample_value(d, env)] * k  # str / any: constant
+
+@traced("sample_kwargs_batch")
+def sample_kwargs_batch(plan_params: Sequence[List[Tuple[str,str,bool,object]]], env: Dict[str,Any], k: int,
+                        gen: Optional["np.random.Generator"] = None) -> List[List[Dict[str,Any]]]:
+    """
+    `k` kwarg lists for a plan (one params schema per step) from a single uniform draw,
+    with sample_kwargs()'s distribution. Identical lists are dropped, first one kept, so
+    every returned draw is a distinct program; may return fewer than `k`.
+    """
+    if gen is None:
+        gen = arg_stream()
+    n = sum(len(params) for params in plan_params)
+    u = gen.random((2, n, k))  # [0]: include an optional arg?  [1]: its value
+    steps: List[List[Tuple[str, List[bool], List[Any]]]] = []
+    j = 0
+    for params in plan_params:
+        cols = []
+        for name, dom, required, default in params:
+            if default is not None and not required:
+                cols.append((name, (u[0, j] < 0.2).tolist(), [coerce(default)] * k))
+            else:
+                keep = [True] * k if required else (u[0, j] < 0.3).tolist()
+                cols.append((name, keep, _value_column(dom, env, u[1, j])))
+            j += 1
+        steps.append(cols)
+    out: List[List[Dict[str,Any]]] = []
+    seen = set()
+    for r in range(k):
+        draw = [{name: vals[r] for name, keep, vals in cols if keep[r]} for cols in steps]
+        key = repr(draw)  # args keep schema order, so equal draws have equal reprs
+        if key not in seen:
+            seen.add(key)
+            out.append(draw)
+    return out
+
 def coerce(v):
     # defaults are strings from DB; try to interpret
     if isinstance(v, (int, float, bool)): return v
@@ -29,18 +95,19 @@ def coerce(v):
     except: pass
     return s
 
-def sample_value(domain: str, env: Dict[str,Any]):
+def sample_value(domain: str, env: Dict[str,Any], rng: Optional[random.Random] = None):
+    rng = rng or random
     d = domain or "any"
-    if "bool" in d: return random.choice([True, False])
-    if "int" in d: return random.randint(1,3)
-    if "float" in d: return round(random.uniform(0.1, 3.0), 2)
+    if "bool" in d: return rng.choice([True, False])
+    if "int" in d: return rng.randint(1,3)
+    if "float" in d: return round(rng.uniform(0.1, 3.0), 2)
     if "enum[" in d:
         inside = d[d.find("[")+1:d.find("]")]
         items = [x.strip() for x in inside.split("|") if x.strip()]
         return items[0] if items else "enumval"
     if "str|list[str]" in d:
         col = (env.get("columns") or ["A"])[0]
-        return random.choice([col, [col]])
+        return rng.choice([col, [col]])
     if "list" in d: return []
     if "dict" in d: return {}
     if "str" in d:
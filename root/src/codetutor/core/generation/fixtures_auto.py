@@ -13,7 +13,7 @@ except Exception:
 
 def collect_type_labels(ir: IR) -> Set[str]:
     labels: Set[str] = set()
-    for c in ir.cards:
+    for c in ir.planning_cards():
         a = c.pre.get("accepts"); r = c.post.get("returns")
         if isinstance(a, str) and a: labels.add(a)
         if isinstance(r, str) and r: labels.add(r)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, List, Optional
+from codetutor.core.dsl.loader import IR, DbIR
+
+ABSENT = -1  # label id / flag value for "fact not present"
+
+class Labels:
+    """Interned type/axis/dtype labels: each distinct string is stored once and referred to by id."""
+    __slots__ = ("names", "ids")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, value: Any) -> int:
+        if value is None:
+            return ABSENT
+        s = str(value)
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.names)
+            self.names.append(s)
+        return i
+
+    def id(self, name: str) -> int:
+        return self.ids.get(name, ABSENT)
+
+    def name(self, i: int) -> Optional[str]:
+        return None if i < 0 else self.names[i]
+
+class CardTable:
+    """
+    Columnar view of the planning facts of an IR: one int column per fact, labels interned.
+    Whole-graph passes (compat, start selection, samplers) walk these arrays instead of
+    per-card dicts. Row i is ir.cards[i].
+      accepts/returns: label id, ABSENT when missing or empty (same as compat's `str(x or "")`)
+      *_axis/*_dtype:  label id, ABSENT when missing (gates are no-ops then)
+      is_valid_stop:   0/1
+      mutates:         0/1, ABSENT when unknown
+    """
+    __slots__ = ("labels", "qualnames", "accepts", "returns", "accepts_axis", "produces_axis",
+                 "accepts_dtype", "produces_dtype", "is_valid_stop", "mutates")
+
+    def __init__(self):
+        self.labels = Labels()
+        self.qualnames: List[str] = []
+        self.accepts = array("i")
+        self.returns = array("i")
+        self.accepts_axis = array("i")
+        self.produces_axis = array("i")
+        self.accepts_dtype = array("i")
+        self.produces_dtype = array("i")
+        self.is_valid_stop = bytearray()
+        self.mutates = array("b")
+
+    def __len__(self) -> int:
+        return len(self.qualnames)
+
+    @classmethod
+    def from_ir(cls, ir: IR) -> "CardTable":
+        t = cls()
+        lab = t.labels.intern
+        for c in ir.planning_cards():
+            pre, post = c.pre, c.post
+            t.qualnames.append(c.qualname)
+            t.accepts.append(lab(pre.get("accepts") or None))
+            t.returns.append(lab(post.get("returns") or None))
+            t.accepts_axis.append(lab(pre.get("accepts_axis")))
+            t.produces_axis.append(lab(post.get("produces_axis")))
+            t.accepts_dtype.append(lab(pre.get("accepts_dtype")))
+            t.produces_dtype.append(lab(post.get("produces_dtype")))
+            t.is_valid_stop.append(1 if post.get("is_valid_stop") else 0)
+            m = post.get("mutates_input")
+            t.mutates.append(ABSENT if m is None else int(bool(m)))
+        return t
+
+    @classmethod
+    def from_db(cls, ir: DbIR) -> "CardTable":
+        """Same columns straight from card_facts; label ids are the DB's trait_enums codes."""
+        t = cls()
+        n = len(ir.card_ids)
+        labels = ir.labels()
+        t.labels.names = [labels.get(i, "") for i in range(max(labels, default=-1) + 1)]
+        t.labels.ids = {name: code for code, name in labels.items()}
+        t.qualnames = [q for q, _ in ir.heads]
+        for col in ("accepts", "returns", "accepts_axis", "produces_axis", "accepts_dtype", "produces_dtype"):
+            setattr(t, col, array("i", [ABSENT]) * n)
+        t.is_valid_stop = bytearray(n)
+        t.mutates = array("b", [ABSENT]) * n
+        enum_cols = {"accepts": t.accepts, "returns": t.returns,
+                     "accepts_axis": t.accepts_axis, "produces_axis": t.produces_axis,
+                     "accepts_dtype": t.accepts_dtype, "produces_dtype": t.produces_dtype}
+        for row, name, code, val_i in ir.facts():
+            if name == "is_valid_stop":
+                t.is_valid_stop[row] = 1 if val_i else 0
+            elif name == "mutates_input":
+                t.mutates[row] = int(bool(val_i))
+            elif name in enum_cols:
+                enum_cols[name][row] = code
+        return t
+
+    def rows_accepting(self, names) -> List[int]:
+        ids = {self.labels.id(n) for n in names} - {ABSENT}
+        return [i for i, a in enumerate(self.accepts) if a in ids]
@@ -0,0 +1,22 @@
+from __future__ import annotations
+import random
+from typing import Callable, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+def beta_draw(counts: Sequence[int], rng: Optional[random.Random] = None) -> float:
+    """One draw from Beta(1 + successes, 1 + failures): the posterior of a uniform prior."""
+    rng = rng or random
+    return rng.betavariate(1 + counts[0], 1 + counts[1])
+
+def thompson_pick(arms: Sequence[T], draw: Callable[[T], float]) -> Optional[T]:
+    """
+    Thompson sampling over `arms`: draw a success rate for each from its posterior and
+    play the best. Untried arms draw from the uniform prior, so they keep being explored.
+    """
+    best, best_theta = None, -1.0
+    for a in arms:
+        theta = draw(a)
+        if theta > best_theta:
+            best, best_theta = a, theta
+    return best
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import json, os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+FAILURE_MEMO_DIR = os.getenv("CT_FAILURE_MEMO", "data/cache/failures")  # "off" disables
+BANDIT_STATS_DIR = os.getenv("CT_BANDIT_STATS", "data/cache/bandit")      # "off" disables
+
+def _off(setting: str) -> bool:
+    return setting.lower() in {"", "0", "off", "none"}
+
+def kwargs_shape(kwargs: Dict[str, Any]) -> str:
+    """Argument names and value types, e.g. "axis:int,columns:list" (values themselves are ignored)."""
+    return ",".join(f"{k}:{type(kwargs[k]).__name__}" for k in sorted(kwargs))
+
+def _counter() -> Dict[str, Any]:
+    return {"tries": 0, "fails": {}}
+
+def _bump(c: Dict[str, Any], exc: Optional[str] = None) -> None:
+    c["tries"] += 1
+    if exc is not None:
+        c["fails"][exc] = c["fails"].get(exc, 0) + 1
+
+class FailureMemo:
+    """
+    Negative results of sandbox runs for one library, persisted as JSON between runs:
+      apis:  qualname -> kwargs_shape -> {"tries", "fails": {exception type: n}}
+      edges: "a\\tb"   -> {"tries", "fails": {exception type: n}} for consecutive steps a, b
+    A run counts as a try for every step it reached; the failing step (and the edge into it)
+    also gets a fail. weight() is the smoothed success rate (1.0 while untried), and a key
+    that failed min_fails times without ever succeeding is skipped outright (weight 0).
+    """
+    def __init__(self, path: Optional[str | Path] = None, min_fails: int = 3):
+        self.path = Path(path) if path else None
+        self.min_fails = min_fails
+        self.apis: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.edges: Dict[str, Dict[str, Any]] = {}
+        self.skipped = 0  # draws rejected because of the memo (plans and kwargs)
+        if self.path is not None and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.apis, self.edges = data.get("apis", {}), data.get("edges", {})
+            except (ValueError, OSError):
+                pass  # a corrupt memo only costs the learned pruning
+
+    @staticmethod
+    def _edge(a: str, b: str) -> str:
+        return f"{a}\t{b}"
+
+    def record(self, quals: Sequence[str], kwarg_list: Sequence[Dict[str, Any]],
+               step: Optional[int] = None, exc: Optional[str] = None) -> None:
+        """One run of the plan `quals`; step/exc locate the failure (None: every step ran)."""
+        reached = len(quals) if step is None else min(step + 1, len(quals))
+        for k in range(reached):
+            failed = exc if k == step else None
+            shapes = self.apis.setdefault(quals[k], {})
+            _bump(shapes.setdefault(kwargs_shape(kwarg_list[k]), _counter()), failed)
+            if k > 0:
+                _bump(self.edges.setdefault(self._edge(quals[k - 1], quals[k]), _counter()), failed)
+
+    def weight(self, c: Optional[Dict[str, Any]]) -> float:
+        if c is None:
+            return 1.0
+        n, f = c["tries"], sum(c["fails"].values())
+        if f >= self.min_fails and f == n:
+            return 0.0
+        return (n - f + 1) / (n + 1)
+
+    def kwargs_weight(self, qual: str, kwargs: Dict[str, Any]) -> float:
+        return self.weight(self.apis.get(qual, {}).get(kwargs_shape(kwargs)))
+
+    def plan_weight(self, quals: Sequence[str]) -> float:
+        """Product of the edge weights; 0 if some card has never run without failing."""
+        w = 1.0
+        for q in quals:
+            shapes = self.apis.get(q)
+            if shapes:
+                f = sum(sum(c["fails"].values()) for c in shapes.values())
+                if f >= self.min_fails and f == sum(c["tries"] for c in shapes.values()):
+                    return 0.0
+        for a, b in zip(quals, quals[1:]):
+            w *= self.weight(self.edges.get(self._edge(a, b)))
+        return w
+
+    def failures(self, qual: str) -> Dict[str, int]:
+        """Exception type -> count over all argument shapes of `qual`."""
+        out: Dict[str, int] = {}
+        for c in self.apis.get(qual, {}).values():
+            for exc, n in c["fails"].items():
+                out[exc] = out.get(exc, 0) + n
+        return out
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"apis": self.apis, "edges": self.edges}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+def open_failure_memo(language: str, library: str) -> Optional[FailureMemo]:
+    """The library's memo under CT_FAILURE_MEMO (a directory), or None when set to "off"."""
+    if _off(FAILURE_MEMO_DIR):
+        return None
+    return FailureMemo(Path(FAILURE_MEMO_DIR) / language / f"{library}.json")
+
+_UNSEEN = (0, 0)
+
+class BetaStats:
+    """
+    Success/failure counters of sandbox outcomes for one library, persisted as JSON:
+      apis:    qualname -> [successes, failures] of the plans containing it
+      edges:   "a\tb"   -> [successes, failures] of the plans with consecutive steps a, b
+      lengths: "2"/"3"  -> [successes, failures] per plan length
+    With a uniform prior each counter is Beta(1 + successes, 1 + failures) (core.learning.bandits).
+    """
+    def __init__(self, path: Optional[str | Path] = None):
+        self.path = Path(path) if path else None
+        self.apis: Dict[str, List[int]] = {}
+        self.edges: Dict[str, List[int]] = {}
+        self.lengths: Dict[str, List[int]] = {}
+        if self.path is not None and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.apis, self.edges = data.get("apis", {}), data.get("edges", {})
+                self.lengths = data.get("lengths", {})
+            except (ValueError, OSError):
+                pass
+
+    def api(self, q: str) -> Sequence[int]:
+        return self.apis.get(q, _UNSEEN)
+
+    def edge(self, a: str, b: str) -> Sequence[int]:
+        return self.edges.get(f"{a}\t{b}", _UNSEEN)
+
+    def length(self, n: int) -> Sequence[int]:
+        return self.lengths.get(str(n), _UNSEEN)
+
+    def update(self, quals: Sequence[str], reward: bool) -> None:
+        """Credit (or blame) every API, edge and the length of one run plan."""
+        k = 0 if reward else 1
+        for q in quals:
+            self.apis.setdefault(q, [0, 0])[k] += 1
+        for a, b in zip(quals, quals[1:]):
+            self.edges.setdefault(f"{a}\t{b}", [0, 0])[k] += 1
+        self.lengths.setdefault(str(len(quals)), [0, 0])[k] += 1
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"apis": self.apis, "edges": self.edges, "lengths": self.lengths}),
+                       encoding="utf-8")
+        os.replace(tmp, self.path)
+
+def open_bandit_stats(language: str, library: str) -> Optional[BetaStats]:
+    """The library's counters under CT_BANDIT_STATS (a directory), or None when set to "off"."""
+    if _off(BANDIT_STATS_DIR):
+        return None
+    return BetaStats(Path(BANDIT_STATS_DIR) / language / f"{library}.json")
@@ -1,37 +1,115 @@
 from __future__ import annotations
-from typing import Set, Tuple
-from codetutor.core.dsl.loader import IR
-
-def build_compat(ir: IR) -> tuple[Set[tuple[int, int]], set[int]]:
-    pairs: Set[tuple[int, int]] = set()
-    stops: set[int] = set()
-
-    for i, ci in enumerate(ir.cards):
-        if bool(ci.post.get("is_valid_stop")):
-            stops.add(i)
-
-        for j, cj in enumerate(ir.cards):
-            ret = str(ci.post.get("returns") or "")
-            acc = str(cj.pre.get("accepts") or "")
-            if not (ret and acc):  # must have types on both sides
-                continue
-
-            ok = (ret == acc)
-
-            # Optional gates if present in your cards (no-ops if absent)
-            # Axis compatibility: e.g., "rows"/"cols"
-            out_axis = ci.post.get("produces_axis")
-            req_axis = cj.pre.get("accepts_axis")
-            if ok and (req_axis is not None and out_axis is not None):
-                ok = (str(out_axis) == str(req_axis))
-
-            # Dtype/domain compatibility
-            out_dtype = ci.post.get("produces_dtype")
-            req_dtype = cj.pre.get("accepts_dtype")
-            if ok and (req_dtype is not None and out_dtype is not None):
-                ok = (str(out_dtype) == str(req_dtype))
-
-            if ok:
-                pairs.add((i, j))
-
-    return pairs, stops
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Set, Tuple, Union
+from codetutor.core.dsl.loader import IR, DbIR
+from codetutor.core.ir.card import ABSENT, CardTable
+from codetutor.utils.logging import traced
+
+_EMPTY = array("i")
+
+def _gate(out: int, req: int) -> bool:
+    # Optional gates (no-ops if either side is absent)
+    return out < 0 or req < 0 or out == req
+
+class CompatGraph:
+    """
+    A_i -> A_j edges as sorted per-node successor arrays, plus the valid-stop set.
+    Cards with the same output signature (returns, produces_axis, produces_dtype) share one
+    successor array, so memory grows with distinct signatures rather than with edge count.
+    """
+    __slots__ = ("n", "succ", "stops", "table")
+
+    def __init__(self, n: int, succ: "Sequence[array]", stops: Set[int], table: CardTable):
+        self.n = n
+        self.succ = succ
+        self.stops = stops
+        self.table = table
+
+    def successors(self, i: int) -> array:
+        return self.succ[i]
+
+    def has_edge(self, i: int, j: int) -> bool:
+        s = self.succ[i]
+        k = bisect_left(s, j)
+        return k < len(s) and s[k] == j
+
+    def n_edges(self) -> int:
+        return sum(len(s) for s in self.succ)
+
+    def pairs(self) -> Iterator[Tuple[int, int]]:
+        for i, s in enumerate(self.succ):
+            for j in s:
+                yield (i, j)
+
+    def __bool__(self) -> bool:
+        return any(len(s) for s in self.succ)
+
+class _DbSuccessors(Sequence):
+    """
+    succ[i] for a DbIR, resolved on first use: the cards whose pre.accepts equals i's
+    post.returns come from ix_card_facts_trait, then the axis/dtype gates run on the table.
+    Arrays are shared per output signature like build_compat's, so each lookup runs once.
+    """
+    def __init__(self, ir: DbIR, t: CardTable):
+        self.ir, self.t = ir, t
+        self.accepts_trait = ir.con.execute("SELECT id FROM traits WHERE name='accepts'").fetchone()[0]
+        self.shared: Dict[Tuple[int, int, int], array] = {}
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __getitem__(self, i: int) -> array:
+        t = self.t
+        key = (t.returns[i], t.produces_axis[i], t.produces_dtype[i])
+        ret, out_axis, out_dtype = key
+        if ret == ABSENT:
+            return _EMPTY
+        s = self.shared.get(key)
+        if s is None:
+            row_of, js = self.ir.row_of, []
+            for (card_id,) in self.ir.con.execute(
+                    "SELECT card_id FROM card_facts WHERE trait_id=? AND is_pre=1 AND val_enum_code=?",
+                    (self.accepts_trait, ret)):
+                j = row_of.get(card_id)  # facts of other libraries share the code space
+                if j is not None and _gate(out_axis, t.accepts_axis[j]) and _gate(out_dtype, t.accepts_dtype[j]):
+                    js.append(j)
+            s = self.shared[key] = array("i", sorted(js)) if js else _EMPTY
+        return s
+
+@traced("build_compat")
+def build_compat(ir: Union[IR, CardTable]) -> CompatGraph:
+    if isinstance(ir, DbIR):
+        # planning straight from SQL: successors are looked up per node as the planner asks
+        t = CardTable.from_db(ir)
+        stops = {i for i, f in enumerate(t.is_valid_stop) if f}
+        return CompatGraph(len(t), _DbSuccessors(ir, t), stops, t)
+    t = ir if isinstance(ir, CardTable) else CardTable.from_ir(ir)
+    n = len(t)
+
+    # Bucket targets by accepted label id, then by their (axis, dtype) requirements
+    targets: Dict[int, Dict[Tuple[int, int], List[int]]] = defaultdict(lambda: defaultdict(list))
+    for j, (acc, ax, dt) in enumerate(zip(t.accepts, t.accepts_axis, t.accepts_dtype)):
+        if acc != ABSENT:
+            targets[acc][(ax, dt)].append(j)
+    stops: Set[int] = {i for i, f in enumerate(t.is_valid_stop) if f}
+
+    # Join each distinct output signature with the matching buckets only
+    shared: Dict[Tuple[int, int, int], array] = {}
+    succ: List[array] = []
+    for key in zip(t.returns, t.produces_axis, t.produces_dtype):
+        ret, out_axis, out_dtype = key
+        if ret == ABSENT:  # must have types on both sides
+            succ.append(_EMPTY); continue
+        s = shared.get(key)
+        if s is None:
+            js: List[int] = []
+            for (req_axis, req_dtype), members in targets.get(ret, {}).items():
+                if _gate(out_axis, req_axis) and _gate(out_dtype, req_dtype):
+                    js.extend(members)
+            s = shared[key] = array("i", sorted(js)) if js else _EMPTY
+        succ.append(s)
+
+    return CompatGraph(n, succ, stops, t)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import random
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional
+from codetutor.core.planner.compat import CompatGraph
+
+class PlanSampler:
+    """
+    Uniform sampling of 2-/3-step plans (same constraints as z3core.choose_plan):
+      [a1, x2]      x2 in succ(a1), stop(x2)
+      [a1, x2, x3]  x2 in succ(a1), x3 in succ(x2), stop(x3), all distinct
+    Path counts are computed per shared successor array (see CompatGraph) on first use and
+    cached, so a draw is a bisect plus a rare rejection (when a proposal revisits a node),
+    independent of how many plans exist, and only nodes reachable from the sampled starts
+    are ever visited. w2/w3 re-weight 2-step vs 3-step plans (1.0/1.0 = uniform over plans).
+    """
+    def __init__(self, graph: CompatGraph, w2: float = 1.0, w3: float = 1.0):
+        self.graph = graph
+        self.w2, self.w3 = w2, w3
+        self._stop: Dict[int, array] = {}
+        self._cum: Dict[int, array] = {}
+
+    def stop_succ(self, x: int) -> array:
+        """succ(x) filtered to valid stops, shared like the successor arrays themselves."""
+        s = self.graph.succ[x]
+        t = self._stop.get(id(s))
+        if t is None:
+            stops = self.graph.stops
+            t = self._stop[id(s)] = array("i", (j for j in s if j in stops))
+        return t
+
+    @staticmethod
+    def _has(arr: array, x: int) -> bool:
+        k = bisect_right(arr, x)
+        return k > 0 and arr[k - 1] == x
+
+    def _cumulative(self, s: array) -> array:
+        # prefix sums of b over a shared successor array, cached per array
+        cum = self._cum.get(id(s))
+        if cum is None:
+            total, cum = 0, array("q")
+            for x in s:
+                total += len(self.stop_succ(x))  # 3rd-step proposals after x
+                cum.append(total)
+            self._cum[id(s)] = cum
+        return cum
+
+    def count(self, a1: int) -> int:
+        """Exact number of valid plans starting at a1 (O(|succ(a1)|))."""
+        s, t = self.graph.succ[a1], self.stop_succ(a1)
+        n2 = len(t) - (1 if self._has(t, a1) else 0)
+        n3 = 0
+        for x in s:
+            if x != a1:
+                t2 = self.stop_succ(x)
+                n3 += len(t2) - self._has(t2, x) - self._has(t2, a1)
+        return n2 + n3
+
+    def sample(self, a1: int, rng: Optional[random.Random] = None, max_tries: int = 32) -> Optional[List[int]]:
+        rng = rng or random
+        s, t = self.graph.succ[a1], self.stop_succ(a1)
+        cum = self._cumulative(s)
+        p2 = len(t) * self.w2
+        p3 = (cum[-1] if cum else 0) * self.w3
+        if p2 + p3 <= 0:
+            return None
+        for _ in range(max_tries):
+            if rng.random() * (p2 + p3) < p2:
+                x2 = t[rng.randrange(len(t))]
+                if x2 != a1:
+                    return [a1, x2]
+                continue
+            k = bisect_right(cum, rng.randrange(cum[-1]))
+            x2 = s[k]
+            if x2 == a1:
+                continue
+            t2 = self.stop_succ(x2)
+            x3 = t2[rng.randrange(len(t2))]
+            if x3 != a1 and x3 != x2:
+                return [a1, x2, x3]
+        return None
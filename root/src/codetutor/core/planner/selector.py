@@ -0,0 +1,64 @@
+from __future__ import annotations
+import random
+from array import array
+from typing import List, Optional, Sequence
+from codetutor.core.learning.bandits import beta_draw, thompson_pick
+from codetutor.core.learning.stats import BetaStats
+from codetutor.core.planner.compat import CompatGraph
+from codetutor.core.planner.sampler import PlanSampler
+
+class ThompsonSelector:
+    """
+    Plans with the constraints of PlanSampler ([a1, x2] with stop(x2), or [a1, x2, x3] with
+    stop(x3), all distinct), but every choice is a Thompson draw on BetaStats instead of
+    uniform: the start on its API counter, each successor on edge x API, and the plan length
+    on the per-length counter. Each choice looks at `subset` random arms only, so a step
+    costs the same on a hub with thousands of successors as on a leaf.
+    """
+    def __init__(self, graph: CompatGraph, stats: Optional[BetaStats] = None, subset: int = 32):
+        self.graph = graph
+        self.stats = stats if stats is not None else BetaStats()
+        self.subset = subset
+        self.quals = graph.table.qualnames
+        self._plans = PlanSampler(graph)  # for its cached stop-successor arrays
+
+    def _arms(self, arr: Sequence[int], rng: random.Random, exclude: Sequence[int] = ()) -> List[int]:
+        if len(arr) <= self.subset:
+            return [x for x in arr if x not in exclude]
+        return [x for x in {arr[rng.randrange(len(arr))] for _ in range(self.subset)} if x not in exclude]
+
+    def _n_tails(self, a1: int, x2: int) -> int:
+        # 3rd steps after [a1, x2]: stops among succ(x2), other than a1 and x2
+        t = self._plans.stop_succ(x2)
+        return len(t) - PlanSampler._has(t, x2) - PlanSampler._has(t, a1)
+
+    def _viable(self, a1: int, x2: int) -> bool:
+        return x2 in self.graph.stops or self._n_tails(a1, x2) > 0
+
+    def _step(self, a: int, arms: List[int], rng: random.Random) -> Optional[int]:
+        st, qa, q = self.stats, self.quals[a], self.quals
+        return thompson_pick(sorted(arms), lambda b: beta_draw(st.edge(qa, q[b]), rng) * beta_draw(st.api(q[b]), rng))
+
+    def start(self, starts: Sequence[int], rng: Optional[random.Random] = None) -> int:
+        rng = rng or random
+        st, q = self.stats, self.quals
+        return thompson_pick(sorted(self._arms(starts, rng)), lambda a: beta_draw(st.api(q[a]), rng))
+
+    def sample(self, a1: int, rng: Optional[random.Random] = None, max_tries: int = 8) -> Optional[List[int]]:
+        rng = rng or random
+        succ: array = self.graph.succ[a1]
+        if not len(succ):
+            return None
+        for _ in range(max_tries):
+            x2 = self._step(a1, [x for x in self._arms(succ, rng, (a1,)) if self._viable(a1, x)], rng)
+            if x2 is None:
+                continue
+            lengths = ([2] if x2 in self.graph.stops else []) + ([3] if self._n_tails(a1, x2) else [])
+            n = lengths[0] if len(lengths) == 1 else \
+                thompson_pick(lengths, lambda k: beta_draw(self.stats.length(k), rng))
+            if n == 2:
+                return [a1, x2]
+            x3 = self._step(x2, self._arms(self._plans.stop_succ(x2), rng, (a1, x2)), rng)
+            if x3 is not None:  # None only if the subset drew a1/x2 alone
+                return [a1, x2, x3]
+        return None
@@ -1,11 +1,12 @@
 from __future__ import annotations
-from typing import Iterable, List, Sequence, Set, Tuple
-from z3 import Solver, Int, Bool, Or, And, Distinct, Not, BoolVal, sat
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+from z3 import Solver, Int, Bool, Or, And, Distinct, Not, BoolVal, is_true, sat
+from codetutor.core.planner.compat import CompatGraph
 
-# Pairs are 0-based indices into cards
+# Node ids are 0-based indices into cards
 def choose_plan(a1_idx: int,
                 n_cards: int,
-                compat_pairs: Set[Tuple[int,int]],
+                compat: CompatGraph,
                 stop_set: Set[int]) -> List[int] | None:
     s = Solver()
     x1, x2, x3 = Int("x1"), Int("x2"), Int("x3")
@@ -14,12 +15,12 @@ def choose_plan(a1_idx: int,
     s.add(Distinct(x1, x2, x3))
 
     # A1 -> A2
-    allowed_from_a1 = [j for (i,j) in compat_pairs if i == a1_idx]
+    allowed_from_a1 = list(compat.successors(a1_idx))
     if not allowed_from_a1: return None
     s.add(Or([x2 == j for j in allowed_from_a1]))
 
     # (A2 -> A3) or stop(A2)
-    allowed_any = Or([And(x2 == i, x3 == j) for (i,j) in compat_pairs]) if compat_pairs else BoolVal(False)
+    allowed_any = Or([And(x2 == i, x3 == j) for (i,j) in compat.pairs()]) if compat else BoolVal(False)
     stop2 = Or([x2 == k for k in stop_set]) if stop_set else BoolVal(False)
     stop3 = Or([x3 == k for k in stop_set]) if stop_set else BoolVal(False)
     s.add( Or( And(Not(use3), stop2),
@@ -27,4 +28,86 @@ def choose_plan(a1_idx: int,
 
     if s.check() != sat: return None
     m = s.model()
-    return [m[x1].as_long(), m[x2].as_long()] if not m[use3] else [m[x1].as_long(), m[x2].as_long(), m[x3].as_long()]
\ No newline at end of file
+    return [m[x1].as_long(), m[x2].as_long()] if not m[use3] else [m[x1].as_long(), m[x2].as_long(), m[x3].as_long()]
+
+def _member(x, ids: Sequence[int]):
+    # x ∈ ids as a disjunction of integer ranges (card ids of one bucket are mostly contiguous)
+    if not ids: return BoolVal(False)
+    ranges, lo, hi = [], ids[0], ids[0]
+    for j in ids[1:]:
+        if j == hi + 1:
+            hi = j; continue
+        ranges.append((lo, hi)); lo = hi = j
+    ranges.append((lo, hi))
+    return Or([x == a if a == b else And(x >= a, x <= b) for a, b in ranges])
+
+class PlannerSession:
+    """
+    Persistent Z3 planner: the compat graph is encoded once, each start is solved in a
+    push/pop scope, and plans that were emitted (or reported via reject()) are excluded
+    with blocking clauses, so every call for a start yields a plan not seen before.
+    Extra hard constraints (axis/dtype, future soft constraints) go through add().
+    """
+    def __init__(self, compat: CompatGraph, block_emitted: bool = True):
+        self.compat = compat
+        self.block_emitted = block_emitted
+        self.s = Solver()
+        self.x1, self.x2, self.x3 = Int("x1"), Int("x2"), Int("x3")
+        self.use3 = Bool("use3")
+        n = compat.n
+        x1, x2, x3, use3 = self.x1, self.x2, self.x3, self.use3
+        self.s.add(x1 >= 0, x1 < n, x2 >= 0, x2 < n, x3 >= 0, x3 < n)
+        self.s.add(Distinct(x1, x2, x3))
+
+        # edge(x, y): sources that share a successor array are encoded once as a group
+        groups: Dict[int, Tuple[List[int], Sequence[int]]] = {}
+        for i, succ in enumerate(compat.succ):
+            if len(succ):
+                groups.setdefault(id(succ), ([], succ))[0].append(i)
+        def edge(x, y):
+            return Or([And(_member(x, srcs), _member(y, succ)) for srcs, succ in groups.values()]) \
+                if groups else BoolVal(False)
+        stops = sorted(compat.stops)
+
+        # A1 -> A2, then (A2 -> A3 and stop(A3)) or stop(A2)
+        self.s.add(edge(x1, x2))
+        self.s.add(Or(And(Not(use3), _member(x2, stops)),
+                      And(use3, edge(x2, x3), _member(x3, stops))))
+        self._blocked: Dict[int, List[List[int]]] = {}
+        self._exhausted: Set[int] = set()
+
+    def add(self, *constraints) -> None:
+        self.s.add(*constraints)
+        self._exhausted.clear()
+
+    def _block(self, plan: List[int]):
+        x1, x2, x3, use3 = self.x1, self.x2, self.x3, self.use3
+        if len(plan) == 2:
+            return Not(And(x1 == plan[0], x2 == plan[1], Not(use3)))
+        return Not(And(x1 == plan[0], x2 == plan[1], x3 == plan[2], use3))
+
+    def reject(self, plan: List[int]) -> None:
+        blocked = self._blocked.setdefault(plan[0], [])
+        if plan not in blocked:
+            blocked.append(list(plan))
+
+    def next_plan(self, a1_idx: int) -> List[int] | None:
+        if a1_idx in self._exhausted or not len(self.compat.succ[a1_idx]):
+            return None
+        self.s.push()
+        try:
+            self.s.add(self.x1 == a1_idx)
+            for plan in self._blocked.get(a1_idx, ()):
+                self.s.add(self._block(plan))
+            if self.s.check() != sat:
+                self._exhausted.add(a1_idx)
+                return None
+            m = self.s.model()
+            plan = [a1_idx, m[self.x2].as_long()]
+            if is_true(m.eval(self.use3, model_completion=True)):
+                plan.append(m[self.x3].as_long())
+        finally:
+            self.s.pop()
+        if self.block_emitted:
+            self.reject(plan)
+        return plan
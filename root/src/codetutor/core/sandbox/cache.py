@@ -0,0 +1,103 @@
+from __future__ import annotations
+import json, os, sqlite3, sys, threading, time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, Optional
+from blake3 import blake3
+from codetutor.core.sandbox.runner import (OUTPUT_LIMIT, SandboxResult, _import_guard_prelude,
+                                           _limits_prelude)
+from codetutor.utils.logging import count
+
+EXEC_CACHE_PATH = os.getenv("CT_EXEC_CACHE", "data/cache/exec.db")  # "off" disables
+EXEC_CACHE_MB = float(os.getenv("CT_EXEC_CACHE_MB", "256"))
+
+def _library_version(name: str) -> str:
+    from importlib import metadata
+    try:
+        return metadata.version(name.split(".")[0])
+    except Exception:
+        return ""
+
+class ExecCache:
+    """
+    Persistent sandbox results keyed by blake3(interpreter, library versions, import guard,
+    resource limits, timeout, program). Timed-out runs are not stored (they depend on machine
+    load); anything else the limits decide (truncated output, MemoryError) is keyed by them.
+    Entries are evicted least-recently-used first once the stored results exceed max_bytes.
+    Thread-safe: SandboxPool.run is called from run_candidates' worker threads.
+    """
+    def __init__(self, path: str | Path, allowed_imports: Iterable[str] = (), max_bytes: int = 256 << 20):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        allowed = sorted(set(allowed_imports))
+        # the guard and limits are hashed as the code that enforces them, so editing either
+        # (or CT_MEM_MB / CT_NOFILE / CT_OUTPUT_BYTES) starts a fresh namespace
+        sandbox = blake3((_import_guard_prelude(allowed) + _limits_prelude()).encode("utf-8")).hexdigest()
+        self.namespace = "|".join([sys.executable, sys.version, sandbox, f"output={OUTPUT_LIMIT}"] +
+                                  [f"{m}=={_library_version(m)}" for m in allowed]).encode("utf-8")
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL;")
+        self.con.execute("PRAGMA synchronous=NORMAL;")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS exec_cache("
+            " key TEXT PRIMARY KEY, result_json TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self.con.execute("CREATE INDEX IF NOT EXISTS ix_exec_cache_lru ON exec_cache(last_used)")
+        self.con.commit()
+        self.total = self.con.execute("SELECT IFNULL(SUM(size), 0) FROM exec_cache").fetchone()[0]
+
+    def key(self, program: str, timeout: float) -> str:
+        h = blake3(self.namespace)
+        h.update(f"\0{float(timeout)!r}\0".encode("utf-8")); h.update(program.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, program: str, timeout: float) -> Optional[SandboxResult]:
+        k = self.key(program, timeout)
+        with self._lock:
+            row = self.con.execute("SELECT result_json FROM exec_cache WHERE key=?", (k,)).fetchone()
+            if row is None:
+                self.misses += 1
+                count("exec_cache.miss")
+                return None
+            self.hits += 1
+            count("exec_cache.hit")
+            self.con.execute("UPDATE exec_cache SET last_used=? WHERE key=?", (time.time(), k))
+            self.con.commit()
+        return SandboxResult(**json.loads(row[0]))
+
+    def put(self, program: str, timeout: float, res: SandboxResult) -> None:
+        if res.timed_out:
+            return
+        data = json.dumps(asdict(res), ensure_ascii=False)
+        k = self.key(program, timeout)
+        with self._lock:
+            old = self.con.execute("SELECT size FROM exec_cache WHERE key=?", (k,)).fetchone()
+            self.con.execute("INSERT OR REPLACE INTO exec_cache(key,result_json,size,last_used) VALUES(?,?,?,?)",
+                             (k, data, len(data), time.time()))
+            self.total += len(data) - (old[0] if old else 0)
+            if self.total > self.max_bytes:
+                self._evict()
+            self.con.commit()
+
+    def _evict(self) -> None:
+        # drop down to 90% of the budget so eviction does not run on every insert
+        target = self.max_bytes * 0.9
+        victims = []
+        for k, size in self.con.execute("SELECT key, size FROM exec_cache ORDER BY last_used"):
+            if self.total <= target:
+                break
+            victims.append((k,))
+            self.total -= size
+        self.con.executemany("DELETE FROM exec_cache WHERE key=?", victims)
+
+    def close(self) -> None:
+        with self._lock:
+            self.con.close()
+
+def open_exec_cache(allowed_imports: Iterable[str]) -> Optional[ExecCache]:
+    """The default on-disk cache (CT_EXEC_CACHE, CT_EXEC_CACHE_MB), or None when set to "off"."""
+    if EXEC_CACHE_PATH.lower() in {"", "0", "off", "none"}:
+        return None
+    return ExecCache(EXEC_CACHE_PATH, allowed_imports, max_bytes=int(EXEC_CACHE_MB * (1 << 20)))
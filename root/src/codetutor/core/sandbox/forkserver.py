@@ -0,0 +1,257 @@
+# Warm sandbox worker: imports the target library once, installs the import guard,
+# then runs every candidate program in a fresh fork of itself.
+# Launched as a plain script by runner.SandboxPool (no codetutor imports needed here).
+# Protocol: one JSON object per line.
+#   startup (argv[1]): {"preload": [...], "prelude": "<guard code>",
+#                       "limits": "<defines _sandbox_limits(timeout)>", "output_bytes": int}
+#   request  (stdin):  {"code": "...", "timeout": 6.0}
+#   reply    (stdout): {"returncode": int, "stdout": str, "stderr": str, "timed_out": bool,
+#                       "max_rss_kb": int, "cpu_time": float, "truncated": bool}
+# Every program runs under _sandbox_limits(timeout) (rlimits, applied in its fork), and at most
+# output_bytes of each stream are read back (0: unbounded).
+# SIGTERM (SandboxPool.cancel) kills the program running now, with its process group, and exits.
+# Shared-prefix request: `prefix` runs once in a fork, each suffix then runs in a fork of
+# that process, and every reply is what running prefix + suffix as one program gives.
+#   request  (stdin):  {"prefix": "...", "suffixes": ["...", ...], "timeout": 6.0}
+#   reply    (stdout): {"results": [<reply as above>, ...]}
+from __future__ import annotations
+import builtins, importlib, json, os, resource, signal, sys, tempfile, time, traceback
+from contextlib import ExitStack
+from typing import Callable, List, Optional, Tuple
+
+def _exit_code(code) -> int:
+    # mirror the interpreter's handling of SystemExit(code)
+    if code is None: return 0
+    if isinstance(code, int): return code
+    sys.stderr.write(f"{code}\n")
+    return 1
+
+_PROTO_FD = -1
+_RUNNING: Optional[Tuple[int, bool]] = None  # (pid, own process group) of the program being waited on
+_LIMITS: Callable[[float], None] = lambda timeout: None
+_OUT_CAP = 0
+
+def _detach(out_fd: int, err_fd: int) -> None:
+    # detach from the protocol pipes so a candidate can neither read requests nor forge replies
+    global _PROTO_FD
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0); os.close(null)
+    if _PROTO_FD >= 0:
+        os.close(_PROTO_FD)
+        _PROTO_FD = -1
+    os.dup2(out_fd, 1); os.dup2(err_fd, 2)
+
+def _exec(code: str, g: dict, first_line: int = 1) -> Optional[int]:
+    """Run `code` in namespace g; None if it ran to the end, else the exit code it ended with."""
+    try:
+        # pad so line numbers in tracebacks match the combined prefix + suffix program
+        exec(compile("\n" * (first_line - 1) + code, "<string>", "exec"), g)
+    except SystemExit as e:
+        return _exit_code(e.code)
+    except BaseException as e:
+        # drop this frame so the traceback reads like `python -c`
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
+    finally:
+        try: sys.stdout.flush(); sys.stderr.flush()
+        except Exception: pass
+    return None
+
+def _on_term(signum, frame) -> None:
+    if _RUNNING is not None:
+        pid, group = _RUNNING
+        try:
+            os.killpg(pid, signal.SIGKILL) if group else os.kill(pid, signal.SIGKILL)
+        except OSError:
+            try: os.kill(pid, signal.SIGKILL)  # not yet its own group leader
+            except OSError: pass
+    os._exit(1)
+
+def _child(code: str, out_fd: int, err_fd: int, g: Optional[dict] = None, first_line: int = 1) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _detach(out_fd, err_fd)
+    rc = 1
+    try:
+        rc = _exec(code, g if g is not None else {"__name__": "__main__", "__builtins__": builtins}, first_line)
+    finally:
+        os._exit(0 if rc is None else rc)
+
+def _read(f) -> Tuple[str, bool]:
+    """At most _OUT_CAP bytes of a capture file, and whether there was more."""
+    f.seek(0)
+    data = f.read(_OUT_CAP + 1) if _OUT_CAP > 0 else f.read()
+    cut = 0 < _OUT_CAP < len(data)
+    return data[:_OUT_CAP if cut else None].decode("utf-8", errors="replace"), cut
+
+def _join(*parts: Tuple[str, bool]) -> Tuple[str, bool]:
+    # captures of prefix + suffix, bounded like a single capture
+    text, cut = "".join(t for t, _ in parts), any(c for _, c in parts)
+    if 0 < _OUT_CAP < len(text):
+        text, cut = text[:_OUT_CAP], True
+    return text, cut
+
+def _usage(ru) -> Tuple[int, float]:
+    # (peak RSS in KiB, user + system CPU seconds); macOS reports ru_maxrss in bytes
+    rss = ru.ru_maxrss // 1024 if sys.platform == "darwin" else ru.ru_maxrss
+    return rss, ru.ru_utime + ru.ru_stime
+
+def _wait(pid: int, timeout: float, group: bool = False) -> Tuple[Optional[int], int, float]:
+    """
+    (exit code, peak RSS KiB, CPU seconds) of `pid`; the exit code is None if it was killed
+    (with its process group) at the timeout.
+    """
+    global _RUNNING
+    deadline = time.monotonic() + timeout
+    delay = 0.0005
+    _RUNNING = (pid, group)
+    try:
+        while True:
+            done, status, ru = os.wait4(pid, os.WNOHANG)
+            if done:
+                break
+            if time.monotonic() >= deadline:
+                try:
+                    os.killpg(pid, signal.SIGKILL) if group else os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    os.kill(pid, signal.SIGKILL)
+                _, _, ru = os.wait4(pid, 0)
+                return (None, *_usage(ru))
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+    finally:
+        _RUNNING = None
+    rc = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else (
+        -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status))
+    return (rc, *_usage(ru))
+
+def _reply(rc: Optional[int], out: Tuple[str, bool], err: Tuple[str, bool], rss: int, cpu: float) -> dict:
+    """Reply for one program; rc None means it was killed at the timeout."""
+    stderr = err[0]
+    if out[1] or err[1]:
+        stderr += f"\nOUTPUT TRUNCATED at {_OUT_CAP} bytes"
+    if rc is None:
+        stderr += "\nTIMEOUT"
+    return {"returncode": -1 if rc is None else rc, "stdout": out[0], "stderr": stderr,
+            "timed_out": rc is None, "max_rss_kb": rss, "cpu_time": round(cpu, 4),
+            "truncated": out[1] or err[1]}
+
+def _run(code: str, timeout: float) -> dict:
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        sys.stdout.flush(); sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            _LIMITS(timeout)
+            _child(code, out.fileno(), err.fileno())
+        rc, rss, cpu = _wait(pid, timeout)
+        return _reply(rc, _read(out), _read(err), rss, cpu)
+
+def _prefix_child(prefix: str, suffixes: List[str], out_fd: int, err_fd: int,
+                  leaf_fds: List[tuple], status_fd: int, timeout: float) -> None:
+    """
+    Run `prefix`, then fork once per suffix from the resulting state. Writes one JSON line
+    per suffix ({"i", "returncode", "timed_out", "max_rss_kb", "cpu_time"}) or a single
+    {"prefix": rc, ...} if the prefix itself ended the program. Suffixes inherit the limits
+    applied here; their CPU time and peak RSS include the prefix's.
+    """
+    _LIMITS(timeout)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # the server kills this whole group on cancel
+    _detach(out_fd, err_fd)
+    try:
+        os.setpgid(0, 0)  # the server kills prefix + running suffix together
+    except OSError:
+        pass
+    g = {"__name__": "__main__", "__builtins__": builtins}
+    t0 = time.monotonic()
+    signal.setitimer(signal.ITIMER_REAL, timeout)  # default SIGALRM action ends a slow prefix
+    try:
+        rc = _exec(prefix, g)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    head_rss, head_cpu = _usage(resource.getrusage(resource.RUSAGE_SELF))
+    if rc is not None:
+        line = {"prefix": rc, "max_rss_kb": head_rss, "cpu_time": head_cpu}
+        os.write(status_fd, (json.dumps(line) + "\n").encode())
+        os._exit(0)
+    budget = timeout - (time.monotonic() - t0)
+    first_line = prefix.count("\n") + 1
+    for i, (code, (o, e)) in enumerate(zip(suffixes, leaf_fds)):
+        rc, rss, cpu = None, 0, 0.0
+        if budget > 0:
+            pid = os.fork()
+            if pid == 0:
+                _child(code, o, e, g, first_line)
+            rc, rss, cpu = _wait(pid, budget)
+        line = {"i": i, "returncode": -1 if rc is None else rc, "timed_out": rc is None,
+                "max_rss_kb": max(head_rss, rss), "cpu_time": head_cpu + cpu}
+        os.write(status_fd, (json.dumps(line) + "\n").encode())
+    os._exit(0)
+
+def _run_shared(prefix: str, suffixes: List[str], timeout: float) -> dict:
+    with ExitStack() as stack:
+        tmp = lambda: stack.enter_context(tempfile.TemporaryFile())
+        out, err, status = tmp(), tmp(), tmp()
+        leaves = [(tmp(), tmp()) for _ in suffixes]
+        sys.stdout.flush(); sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            _prefix_child(prefix, suffixes, out.fileno(), err.fileno(),
+                          [(o.fileno(), e.fileno()) for o, e in leaves], status.fileno(), timeout)
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            pass
+        # safety net only: the prefix process enforces the per-program timeouts itself
+        rc, rss, cpu = _wait(pid, timeout * (len(suffixes) + 1) + 1.0, group=True)
+
+        head_out, head_err = _read(out), _read(err)
+        done, head = {}, None
+        status.seek(0)
+        for line in status.read().decode().splitlines():
+            d = json.loads(line)
+            if "prefix" in d:
+                head = d
+            else:
+                done[d["i"]] = d
+        results = []
+        for i, (o, e) in enumerate(leaves):
+            d = done.get(i)
+            if d is None and head is not None:
+                results.append(_reply(head["prefix"], head_out, head_err, head["max_rss_kb"], head["cpu_time"]))
+                continue
+            if d is None:
+                # prefix process died: slow prefix (SIGALRM), safety net, or a crash
+                timed = rc is None or rc == -signal.SIGALRM
+                d = {"returncode": rc, "timed_out": timed, "max_rss_kb": rss, "cpu_time": cpu}
+            results.append(_reply(None if d["timed_out"] else d["returncode"],
+                                  _join(head_out, _read(o)), _join(head_err, _read(e)),
+                                  d["max_rss_kb"], d["cpu_time"]))
+        return {"results": results}
+
+def main() -> None:
+    global _PROTO_FD, _LIMITS, _OUT_CAP
+    cfg = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+    ns: dict = {}
+    exec(compile(cfg.get("limits") or "", "<sandbox-prelude>", "exec"), ns)
+    _LIMITS = ns.get("_sandbox_limits", _LIMITS)
+    _OUT_CAP = int(cfg.get("output_bytes") or 0)
+    # keep the protocol channel private; anything the library prints goes to stderr
+    _PROTO_FD = os.dup(1)
+    proto = os.fdopen(_PROTO_FD, "w", encoding="utf-8")
+    os.dup2(2, 1)
+    for name in cfg.get("preload") or []:
+        try: importlib.import_module(name)
+        except Exception: pass  # the candidate will hit the same error and report it itself
+    # own file name, so guard frames in tracebacks are not mistaken for program lines
+    exec(compile(cfg.get("prelude") or "", "<sandbox-prelude>", "exec"), {"__name__": "__sandbox_prelude__"})
+    signal.signal(signal.SIGTERM, _on_term)
+    proto.write(json.dumps({"ready": True}) + "\n"); proto.flush()
+    for line in sys.stdin:
+        req = json.loads(line)
+        if "suffixes" in req:
+            res = _run_shared(req["prefix"], req["suffixes"], float(req.get("timeout", 6.0)))
+        else:
+            res = _run(req["code"], float(req.get("timeout", 6.0)))
+        proto.write(json.dumps(res) + "\n"); proto.flush()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 from __future__ import annotations
-import csv, io, json, hashlib
-from typing import Any, Dict, Tuple, Literal
+import csv, io, json, hashlib, re
+from typing import Any, Dict, Optional, Tuple, Literal
+from codetutor.utils.logging import traced
 
+_FRAME = re.compile(r'^\s*File "<string>", line (\d+)')
+_EXC = re.compile(r'^([A-Za-z_][\w.]*)(?::|$)')
+
+@traced("fingerprint")
 def fingerprint(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
 
@@ -40,3 +45,23 @@ def summarize(stdout: str) -> Dict[str, Any]:
 def validate_nonempty(stdout: str) -> Tuple[bool, str]:
     ok = bool(stdout.strip())
     return ok, "nonempty output" if ok else "empty output"
+
+def failure_site(stderr: str) -> Optional[Tuple[str, Optional[int]]]:
+    """
+    (exception type, program line of the innermost frame in the program) from a traceback
+    on stderr; the line is None if the error was raised outside it. None if no traceback.
+    """
+    lines = stderr.splitlines()
+    if not any(l.startswith("Traceback (most recent call last)") for l in lines):
+        return None
+    lineno: Optional[int] = None
+    exc: Optional[str] = None
+    for l in lines:
+        m = _FRAME.match(l)
+        if m:
+            lineno, exc = int(m.group(1)), None
+            continue
+        m = _EXC.match(l)
+        if m and exc is None:
+            exc = m.group(1).rsplit(".", 1)[-1]
+    return (exc, lineno) if exc else None
@@ -1,7 +1,18 @@
 from __future__ import annotations
-import os, subprocess, sys, textwrap
+import json, os, queue, signal, subprocess, sys, tempfile, textwrap, threading, time
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from codetutor.utils.logging import span, traced
+
+FORKSERVER_PATH = Path(__file__).with_name("forkserver.py")
+
+# per-run limits (0 disables each): address space the program may add to what is loaded when
+# it starts, open files, and bytes kept per output stream (more ends the run, see _limits_prelude)
+MEM_LIMIT_MB = int(os.getenv("CT_MEM_MB", "2048"))
+NOFILE_LIMIT = int(os.getenv("CT_NOFILE", "256"))
+OUTPUT_LIMIT = int(os.getenv("CT_OUTPUT_BYTES", str(1 << 20)))
 
 @dataclass
 class SandboxResult:
@@ -10,36 +21,373 @@ class SandboxResult:
     stdout: str
     stderr: str
     timed_out: bool
+    max_rss_kb: int = 0      # peak resident set of the run (0 where not measured)
+    cpu_time: float = 0.0    # user + system seconds
+    truncated: bool = False  # an output stream hit OUTPUT_LIMIT
 
-def _import_guard_prelude(allowed: Iterable[str]) -> str:
+# never importable by a program, even where the library itself loads them: process spawning,
+# sockets and foreign calls (os stays importable, every library needs it; the rlimits apply)
+DENIED_IMPORTS = frozenset({
+    "subprocess", "_posixsubprocess", "pty", "multiprocessing", "_multiprocessing",
+    "socket", "_socket", "ssl", "_ssl", "socketserver", "http", "ftplib", "smtplib", "poplib",
+    "imaplib", "telnetlib", "xmlrpc", "ctypes", "_ctypes",
+})
+
+@lru_cache(maxsize=None)
+def _guard_allowlist(allowed: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Top-level modules a program may import: the allowed libraries, and what a fresh
+    interpreter has loaded once the limits prelude ran and the libraries were imported,
+    minus DENIED_IMPORTS. Computed in a subprocess so a cold run and a warm worker (whose
+    own imports are not the program's business) use the same list.
+    """
+    probe = _limits_prelude() + textwrap.dedent(f"""
+    import sys
+    for _m in {list(allowed)!r}:
+        try: __import__(_m)
+        except Exception: pass
+    print(" ".join(sorted({{m.split('.')[0] for m in sys.modules}})))
+    """)
+    try:
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                             env=_sandbox_env(), timeout=120).stdout
+    except (OSError, subprocess.SubprocessError):
+        out = ""
     base = {m.split('.')[0] for m in allowed}
-    base |= {"builtins"}  # always allowed
+    return tuple(sorted((set(out.split()) - DENIED_IMPORTS) | base | {"builtins"}))
+
+def _import_guard_prelude(allowed: Iterable[str]) -> str:
     # Lightweight import guard; no effect if allowed is empty.
+    # The libraries are imported first (their own imports are not checked), then every loaded
+    # module outside the allowlist is dropped from sys.modules so that importing it again goes
+    # through the guard. Cold runs and warm workers thus reject exactly the same imports.
+    allowed = tuple(sorted(set(allowed)))
+    if not allowed:
+        return ""
     return textwrap.dedent(f"""
     import sys
+    for _m in {list(allowed)!r}:
+        try: __import__(_m)
+        except Exception: pass  # the program will hit the same error and report it itself
+    _allowed = set({list(_guard_allowlist(allowed))!r})
+    for _m in [m for m in sys.modules if m.split('.')[0] not in _allowed]:
+        del sys.modules[_m]
     class _Guard:
         def find_spec(self, fullname, path=None, target=None):
             base = fullname.split('.')[0]
-            if base in {sorted(base)!r}:
+            if base in _allowed:
                 return None
             raise ImportError(f"Module {{fullname}} not allowed in sandbox")
-    if {bool(base)!r}:
-        sys.meta_path.insert(0, _Guard())
+    sys.meta_path.insert(0, _Guard())
     """)
 
+def _limits_prelude(mem_mb: int = MEM_LIMIT_MB, nofile: int = NOFILE_LIMIT,
+                    output_bytes: int = OUTPUT_LIMIT) -> str:
+    # Defines _sandbox_limits(timeout), called in the process about to run a program.
+    # Soft and hard limits are both lowered so the program cannot raise them again.
+    #   RLIMIT_AS:     current address space + mem_mb (a MemoryError past it)
+    #   RLIMIT_CPU:    the wall-clock timeout rounded up, +1s (SIGXCPU for busy threads)
+    #   RLIMIT_FSIZE:  output_bytes + 1, so writing past the cap fails (EFBIG) and ends the run
+    #   RLIMIT_CORE:   0, no core files
+    # Imports happen here, not in the function: a warm fork calls it after the import guard is up.
+    return textwrap.dedent(f"""
+    try:
+        import math, resource
+    except ImportError:
+        resource = None  # no rlimits on this platform
+    def _sandbox_limits(timeout):
+        if resource is None:
+            return
+        def cap(res, n):
+            soft, hard = resource.getrlimit(res)
+            if hard != resource.RLIM_INFINITY:
+                n = min(n, hard)
+            try:
+                resource.setrlimit(res, (n, n))
+            except (ValueError, OSError):
+                pass
+        if {mem_mb!r} > 0:
+            base = 0
+            try:
+                with open("/proc/self/statm") as f:
+                    base = int(f.read().split()[0]) * resource.getpagesize()
+            except (OSError, ValueError):
+                pass
+            cap(resource.RLIMIT_AS, base + {mem_mb!r} * 2**20)
+        cap(resource.RLIMIT_CPU, math.ceil(timeout) + 1)
+        if {nofile!r} > 0:
+            cap(resource.RLIMIT_NOFILE, {nofile!r})
+        if {output_bytes!r} > 0:
+            cap(resource.RLIMIT_FSIZE, {output_bytes!r} + 1)
+        cap(resource.RLIMIT_CORE, 0)
+    """)
+
+def _sandbox_env() -> dict:
+    env = os.environ.copy()
+    env.setdefault("PYTHONHASHSEED", "0")  # determinism
+    return env
+
+def _read_capped(f) -> Tuple[str, bool]:
+    f.seek(0)
+    data = f.read(OUTPUT_LIMIT + 1) if OUTPUT_LIMIT > 0 else f.read()
+    cut = 0 < OUTPUT_LIMIT < len(data)
+    return data[:OUTPUT_LIMIT if cut else None].decode("utf-8", errors="replace"), cut
+
+def _wait_process(p: subprocess.Popen, timeout: float) -> Tuple[Optional[int], int, float]:
+    """(exit code or None at the timeout, peak RSS KiB, CPU seconds) of a Popen child."""
+    if not hasattr(os, "wait4"):
+        try:
+            return p.wait(timeout), 0, 0.0
+        except subprocess.TimeoutExpired:
+            p.kill(); p.wait()
+            return None, 0, 0.0
+    deadline, delay = time.monotonic() + timeout, 0.0005
+    while True:
+        pid, status, ru = os.wait4(p.pid, os.WNOHANG)
+        if pid:
+            break
+        if time.monotonic() >= deadline:
+            p.kill()
+            _, status, ru = os.wait4(p.pid, 0)
+            p.returncode = -signal.SIGKILL
+            return None, ru.ru_maxrss, ru.ru_utime + ru.ru_stime
+        time.sleep(delay)
+        delay = min(delay * 2, 0.01)
+    p.returncode = os.waitstatus_to_exitcode(status)
+    return p.returncode, ru.ru_maxrss, ru.ru_utime + ru.ru_stime
+
+@traced("run_code")
 def run_code(code: str,
              timeout: float = 6.0,
              allowed_imports: Optional[Iterable[str]] = None) -> SandboxResult:
-    prelude = _import_guard_prelude(allowed_imports or [])
-    payload = prelude + "\n" + code
-    env = os.environ.copy()
-    env.setdefault("PYTHONHASHSEED", "0")  # determinism
-    try:
-        p = subprocess.run(
-            [sys.executable, "-c", payload],
-            capture_output=True, text=True, timeout=timeout, env=env
-        )
-        ok = (p.returncode == 0 and bool(p.stdout.strip()))
-        return SandboxResult(ok=ok, returncode=p.returncode, stdout=p.stdout, stderr=p.stderr, timed_out=False)
-    except subprocess.TimeoutExpired as e:
-        return SandboxResult(ok=False, returncode=-1, stdout=e.stdout or "", stderr=(e.stderr or "") + "\nTIMEOUT", timed_out=True)
+    prelude = _limits_prelude() + f"_sandbox_limits({timeout!r})\n" + _import_guard_prelude(allowed_imports or [])
+    # both compiled separately so traceback lines of "<string>" are the program's, as in the forkserver
+    payload = (f"exec(compile({prelude!r}, '<sandbox-prelude>', 'exec'))\n"
+               f"exec(compile({code!r}, '<string>', 'exec'), {{'__name__': '__main__'}})\n")
+    # output goes to files and is read back bounded, so a chatty program cannot fill our memory
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        p = subprocess.Popen([sys.executable, "-c", payload], stdin=subprocess.DEVNULL,
+                             stdout=out, stderr=err, env=_sandbox_env())
+        rc, rss, cpu = _wait_process(p, timeout)
+        (stdout, out_cut), (stderr, err_cut) = _read_capped(out), _read_capped(err)
+    truncated = out_cut or err_cut
+    if truncated:
+        stderr += f"\nOUTPUT TRUNCATED at {OUTPUT_LIMIT} bytes"
+    if rc is None:
+        return SandboxResult(ok=False, returncode=-1, stdout=stdout, stderr=stderr + "\nTIMEOUT", timed_out=True,
+                             max_rss_kb=rss, cpu_time=round(cpu, 4), truncated=truncated)
+    ok = (rc == 0 and bool(stdout.strip()) and not truncated)
+    return SandboxResult(ok=ok, returncode=rc, stdout=stdout, stderr=stderr, timed_out=False,
+                         max_rss_kb=rss, cpu_time=round(cpu, 4), truncated=truncated)
+
+
+# ---------- warm worker pool ----------
+def _cancelled() -> SandboxResult:
+    # timed_out, so that no cache keeps it
+    return SandboxResult(ok=False, returncode=-1, stdout="", stderr="CANCELLED", timed_out=True)
+
+def _result(r: dict) -> SandboxResult:
+    ok = (r["returncode"] == 0 and bool(r["stdout"].strip()) and not r["truncated"])
+    return SandboxResult(ok=ok, returncode=r["returncode"], stdout=r["stdout"], stderr=r["stderr"],
+                         timed_out=r["timed_out"], max_rss_kb=r["max_rss_kb"], cpu_time=r["cpu_time"],
+                         truncated=r["truncated"])
+
+class _ForkServer:
+    """One long-lived forkserver.py process; serves one request at a time."""
+    def __init__(self, preload: List[str], prelude: str):
+        self.killed = False
+        cfg = json.dumps({"preload": preload, "prelude": prelude,
+                          "limits": _limits_prelude(), "output_bytes": OUTPUT_LIMIT})
+        with span("sandbox.start_worker", preload=preload):  # interpreter start + library import
+            self.proc = subprocess.Popen(
+                [sys.executable, str(FORKSERVER_PATH), cfg],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, encoding="utf-8", env=_sandbox_env(),
+            )
+            if not self.proc.stdout.readline():
+                raise RuntimeError("sandbox forkserver failed to start")
+
+    def run(self, code: str, timeout: float) -> SandboxResult:
+        self.proc.stdin.write(json.dumps({"code": code, "timeout": timeout}) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError("sandbox forkserver exited")
+        return _result(json.loads(line))
+
+    def run_shared(self, prefix: str, suffixes: List[str], timeout: float) -> List[SandboxResult]:
+        req = {"prefix": prefix, "suffixes": suffixes, "timeout": timeout}
+        self.proc.stdin.write(json.dumps(req) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError("sandbox forkserver exited")
+        return [_result(r) for r in json.loads(line)["results"]]
+
+    def kill(self) -> None:
+        """End the program running now and the server with it (SIGTERM, see forkserver.py)."""
+        self.killed = True
+        try:
+            self.proc.terminate()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+        except Exception:
+            self.proc.kill()
+
+class SandboxPool:
+    """
+    Pool of warm sandbox workers for one library.
+    Each worker imports `allowed_imports` once, installs the import guard, and then runs every
+    program in a fresh fork, so candidates skip interpreter start-up and the library import.
+    Each fork runs under the per-run limits (MEM_LIMIT_MB etc.) on top of the warm state.
+    Results match run_code(), including which imports the guard rejects.
+    Falls back to run_code() where os.fork is unavailable (e.g. Windows).
+    cache: an ExecCache (core.sandbox.cache); programs it already knows are not run again.
+    """
+    def __init__(self, allowed_imports: Optional[Iterable[str]] = None, size: int = 1, cache=None):
+        self.allowed = list(allowed_imports or [])
+        self.cache = cache
+        self.size = max(1, size)
+        self.prelude = _import_guard_prelude(self.allowed)
+        self.warm = hasattr(os, "fork")
+        self._idle: "queue.Queue[_ForkServer]" = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._servers: List[_ForkServer] = []
+        self._busy: set = set()
+        self._closed = False
+
+    def _acquire(self) -> _ForkServer:
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("sandbox pool is closed")
+                if self._idle.empty() and self._started < self.size:
+                    self._started += 1
+                    try:
+                        srv = _ForkServer(self.allowed, self.prelude)
+                    except Exception:
+                        self._started -= 1
+                        raise
+                    self._servers.append(srv)
+                    self._busy.add(srv)
+                    return srv
+            try:
+                srv = self._idle.get(timeout=0.05)
+            except queue.Empty:
+                continue  # a worker may have been discarded meanwhile, leaving room for a new one
+            with self._lock:
+                self._busy.add(srv)
+            return srv
+
+    def _release(self, srv: _ForkServer) -> None:
+        with self._lock:
+            self._busy.discard(srv)
+        self._idle.put(srv)
+
+    def _discard(self, srv: _ForkServer) -> None:
+        srv.close()
+        with self._lock:
+            self._busy.discard(srv)
+            if srv in self._servers:  # close() may have dropped it already
+                self._servers.remove(srv)
+                self._started -= 1
+
+    def cancel(self) -> None:
+        """
+        Kill the workers that are running a program now, together with the program; their
+        pending run()/run_shared() calls return a CANCELLED result (never cached). Idle
+        workers are kept, and later calls start new workers as needed.
+        """
+        with self._lock:
+            busy = list(self._busy)
+        for srv in busy:
+            srv.kill()
+
+    def run(self, code: str, timeout: float = 6.0) -> SandboxResult:
+        hit = self.cache.get(code, timeout) if self.cache is not None else None
+        if hit is not None:
+            return hit
+        res = self._run(code, timeout)
+        if self.cache is not None:
+            self.cache.put(code, timeout, res)
+        return res
+
+    @traced("sandbox.run")
+    def _run(self, code: str, timeout: float) -> SandboxResult:
+        if not self.warm:
+            return run_code(code, timeout=timeout, allowed_imports=self.allowed)
+        try:
+            srv = self._acquire()
+        except Exception:
+            if self._closed:
+                return _cancelled()
+            return run_code(code, timeout=timeout, allowed_imports=self.allowed)
+        try:
+            res = srv.run(code, timeout)
+        except Exception:
+            # worker died (e.g. killed by the OS); replace it and answer this request cold
+            self._discard(srv)
+            if srv.killed:
+                return _cancelled()
+            return run_code(code, timeout=timeout, allowed_imports=self.allowed)
+        self._release(srv)
+        return res
+
+    def run_shared(self, prefix: str, suffixes: List[str], timeout: float = 6.0) -> List[SandboxResult]:
+        """
+        Results of run(prefix + s) for each suffix, with `prefix` executed once: its state is
+        snapshotted by forking and every suffix continues from a copy. `timeout` applies to
+        each combined program. A prefix not ending in a newline runs once per program instead.
+        """
+        results: List[Optional[SandboxResult]] = [
+            self.cache.get(prefix + s, timeout) if self.cache is not None else None for s in suffixes]
+        todo = [i for i, r in enumerate(results) if r is None]
+        for i, r in zip(todo, self._run_shared(prefix, [suffixes[i] for i in todo], timeout)):
+            results[i] = r
+            if self.cache is not None:
+                self.cache.put(prefix + suffixes[i], timeout, r)
+        return results
+
+    @traced("sandbox.run_shared")
+    def _run_shared(self, prefix: str, suffixes: List[str], timeout: float) -> List[SandboxResult]:
+        if not suffixes:
+            return []
+        if not self.warm or len(suffixes) < 2 or not prefix.endswith("\n"):
+            return [self._run(prefix + s, timeout) for s in suffixes]
+        try:
+            srv = self._acquire()
+        except Exception:
+            if self._closed:
+                return [_cancelled() for _ in suffixes]
+            return [run_code(prefix + s, timeout=timeout, allowed_imports=self.allowed) for s in suffixes]
+        try:
+            res = srv.run_shared(prefix, suffixes, timeout)
+        except Exception:
+            self._discard(srv)
+            if srv.killed:
+                return [_cancelled() for _ in suffixes]
+            return [run_code(prefix + s, timeout=timeout, allowed_imports=self.allowed) for s in suffixes]
+        self._release(srv)
+        return res
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            for srv in self._servers:
+                srv.close()
+            self._servers.clear()
+            self._busy.clear()
+            self._started = 0
+            self._idle = queue.Queue()
+
+    def __enter__(self) -> "SandboxPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
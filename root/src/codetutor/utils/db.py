@@ -1,8 +1,10 @@
 from __future__ import annotations
 import sqlite3
 from pathlib import Path
-from typing import Any, Iterable, Mapping, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where a DataFrame is built, so execute/insert callers never load it
 
 class DBTools:
     def __init__(self, db_path: str | Path = "data/db/api_index.db"):
@@ -31,10 +33,12 @@ class DBTools:
 
     # --- read as DataFrame ---
     def read_table(self, table: str, limit: Optional[int] = None) -> pd.DataFrame:
+        import pandas as pd
         q = f"SELECT * FROM {table}" + (f" LIMIT {int(limit)}" if limit else "")
         return pd.read_sql_query(q, self.con)
 
     def read_sql(self, sql: str, params: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+        import pandas as pd
         return pd.read_sql_query(sql, self.con, params=params or {})
 
     def to_dataframes(self) -> dict[str, pd.DataFrame]:
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import json, os, sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+# ---------- JSONL ----------
+def read_jsonl(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """Yield one object per line; a torn trailing line (crash mid-write) is skipped."""
+    p = Path(path)
+    if not p.exists():
+        return
+    with p.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+_TAIL_BLOCK = 64 << 10
+
+def _trim_torn_tail(p: Path) -> None:
+    # drop a partial last line so the next append starts on a fresh line; only the tail is
+    # read, one block at a time backwards from the end, so resuming a large sink stays cheap
+    if not p.exists() or p.stat().st_size == 0:
+        return
+    with p.open("rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = end
+        while pos > 0:
+            start = max(0, pos - _TAIL_BLOCK)
+            f.seek(start)
+            nl = f.read(pos - start).rfind(b"\n")
+            if nl >= 0:
+                f.truncate(start + nl + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+# ---------- question sinks ----------
+def question_key(doc: Dict[str, Any]) -> str:
+    """Dedupe key: output fingerprint + API sequence."""
+    return f"{doc['fingerprint']}|{'>'.join(doc['apis'])}"
+
+class JsonlSink:
+    """Append-only JSONL file; every line is flushed so a crash loses at most the line in flight."""
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _trim_torn_tail(self.path)
+        self._f = self.path.open("a", encoding="utf-8")
+
+    def accepted(self) -> Iterator[Dict[str, Any]]:
+        return read_jsonl(self.path)
+
+    def write(self, doc: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+class SqliteSink:
+    """One row per question, keyed by question_key(); committed per write."""
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(self.path))
+        self.con.execute("PRAGMA journal_mode=WAL;")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS questions("
+            " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, apis_json TEXT NOT NULL,"
+            " doc_json TEXT NOT NULL, created_at INTEGER)"
+        )
+        self.con.commit()
+
+    def accepted(self) -> Iterator[Dict[str, Any]]:
+        for (doc_json,) in self.con.execute("SELECT doc_json FROM questions ORDER BY rowid"):
+            yield json.loads(doc_json)
+
+    def write(self, doc: Dict[str, Any]) -> None:
+        self.con.execute(
+            "INSERT OR IGNORE INTO questions(key,fingerprint,apis_json,doc_json,created_at) VALUES(?,?,?,?,?)",
+            (question_key(doc), doc["fingerprint"], json.dumps(doc["apis"]),
+             json.dumps(doc, ensure_ascii=False), doc.get("created_at")),
+        )
+        self.con.commit()
+
+    def close(self) -> None:
+        self.con.close()
+
+def open_question_sink(path: str | Path):
+    """`.db`/`.sqlite` → SqliteSink, anything else → JsonlSink."""
+    suffix = Path(path).suffix.lower()
+    return SqliteSink(path) if suffix in {".db", ".sqlite", ".sqlite3"} else JsonlSink(path)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+import atexit, functools, json, os, threading, time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Tracing: spans (timed regions) and counters, off unless CT_TRACE names an output file.
+#   *.json      Chrome trace (chrome://tracing, Perfetto): written at exit
+#   otherwise   JSONL, one {"name", "ts_us", "dur_us", "tid", "args"} per span as it ends,
+#               then one {"counter", "value"} per counter at exit
+# Disabled, span() returns a shared no-op and traced functions cost one global lookup.
+
+class Tracer:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.chrome = self.path.suffix.lower() == ".json"
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter_ns()
+        self.counters: Counter = Counter()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._f = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.chrome:
+            self._f = self.path.open("w", encoding="utf-8")
+
+    def emit(self, name: str, start_ns: int, end_ns: int, args: Dict[str, Any]) -> None:
+        if os.getpid() != self.pid:
+            return  # forked worker (e.g. a multiprocessing pool): its events are not ours to write
+        ts, dur = (start_ns - self.t0) / 1000, (end_ns - start_ns) / 1000
+        tid = threading.get_ident()
+        with self._lock:
+            if self.chrome:
+                self.events.append({"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": self.pid,
+                                    "tid": tid, "args": args})
+            elif self._f is not None:
+                self._f.write(json.dumps({"name": name, "ts_us": round(ts, 1), "dur_us": round(dur, 1),
+                                          "tid": tid, "args": args}, default=str) + "\n")
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+
+    def close(self) -> None:
+        if os.getpid() != self.pid:
+            return
+        with self._lock:
+            if self.chrome:
+                end = (time.perf_counter_ns() - self.t0) / 1000
+                counters = [{"name": k, "ph": "C", "ts": end, "pid": self.pid, "args": {"value": v}}
+                            for k, v in sorted(self.counters.items())]
+                self.path.write_text(json.dumps({"traceEvents": self.events + counters}, default=str),
+                                     encoding="utf-8")
+            elif self._f is not None:
+                for k, v in sorted(self.counters.items()):
+                    self._f.write(json.dumps({"counter": k, "value": v}) + "\n")
+                self._f.close()
+                self._f = None
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any]):
+        self.tracer, self.name, self.args = tracer, name, args
+
+    def set(self, **args: Any) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.emit(self.name, self.start, time.perf_counter_ns(), self.args)
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+_NO_SPAN = _NoSpan()
+_TRACER: Optional[Tracer] = None
+
+def start_tracing(path: str | Path) -> Tracer:
+    """Trace into `path` from now on (replacing any active tracer); flushed at exit."""
+    global _TRACER
+    stop_tracing()
+    _TRACER = Tracer(path)
+    return _TRACER
+
+def stop_tracing() -> None:
+    global _TRACER
+    t, _TRACER = _TRACER, None
+    if t is not None:
+        t.close()
+
+def tracing() -> bool:
+    return _TRACER is not None
+
+def span(name: str, **args: Any):
+    """`with span("stage", key=value) as s: ...; s.set(more=...)` — a no-op unless tracing."""
+    t = _TRACER
+    return _NO_SPAN if t is None else _Span(t, name, args)
+
+def count(name: str, n: int = 1) -> None:
+    t = _TRACER
+    if t is not None:
+        t.count(name, n)
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator: every call of the function is a span (named after it unless `name` is given)."""
+    def deco(fn: F) -> F:
+        label = name or fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            t = _TRACER
+            if t is None:
+                return fn(*a, **kw)
+            with _Span(t, label, {}):
+                return fn(*a, **kw)
+        return wrapper  # type: ignore[return-value]
+    return deco
+
+def _flush_before_fork() -> None:
+    # a forked child inherits the JSONL write buffer; unflushed, it would be written a second
+    # time when the child drops its copy of the tracer
+    t = _TRACER
+    if t is not None:
+        t.flush()
+
+if os.getenv("CT_TRACE"):
+    start_tracing(os.environ["CT_TRACE"])
+atexit.register(stop_tracing)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_flush_before_fork)
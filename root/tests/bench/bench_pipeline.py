@@ -0,0 +1,248 @@
+"""
+Throughput benchmark of the question pipeline on synthetic card decks.
+
+    python tests/bench/bench_pipeline.py [--sizes 1000,10000,50000] [--plans 500]
+                                         [--workers N] [--share-prefix]
+                                         [--out bench.json] [--compare old.json]
+
+For each deck size a fresh interpreter (so peak RSS is per size) writes a synthetic
+cards.ctdsl and fixtures into a temp dir, then runs the real candidate pipeline
+(iter_candidates -> run_candidates, as in generate_questions) and times every stage:
+load (parse) / load_cached, compat, plan, sample, realize, sandbox, inspect. The stages
+inside the pipeline are read from its trace spans (utils.logging). The sandbox pool is a
+stub: a program is "ok" when its hash says so (--ok-rate) after an optional fixed delay
+(--sandbox-ms), so the numbers measure our code, not pandas. Results are JSON (per-stage p50/p90/p99/max in ms, accepted/s, peak
+RSS); --compare prints the ratios to an earlier file and exits 1 on a regression.
+"""
+from __future__ import annotations
+import argparse, hashlib, json, os, platform, random, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+TYPES = ["DataFrame"] * 4 + ["Series"] * 3 + ["DataFrameGroupBy", "SeriesGroupBy", "Index", "ndarray"]
+ARGS = [
+    [],
+    [("by", "str|list[str]", True, None), ("ascending", "bool", False, "True")],
+    [("axis", "enum[axis]", False, "0"), ("skipna", "bool", False, "True")],
+    [("n", "int", False, "5")],
+    [("columns", "str|list[str]", True, None), ("fill_value", "float", False, None)],
+]
+FIXTURES = {
+    "DataFrame": {"imports": ["import pandas as pd"],
+                  "setup": "curr = pd.DataFrame({'A':[1,2,3],'B':[10,20,30]})", "serializer": "csv"},
+    "Series": {"imports": ["import pandas as pd"], "setup": "curr = pd.Series([3,1,2])", "serializer": "csv"},
+}
+
+def synth_deck(n: int, seed: int = 0) -> str:
+    """n cards over a small type universe, shaped like synth_cards output."""
+    from codetutor.adapters.python.synth.synth_cards import card_block, infer_is_stop
+    rng = random.Random(seed)
+    blocks = ["ontology v0\n"]
+    for i in range(n):
+        qual = f"pandas.bench.m{i}"
+        ret = rng.choice(TYPES)
+        blocks.append(card_block(qual, "auto", rng.choice(TYPES), rng.choice(ARGS), ret, None,
+                                 infer_is_stop(qual, ret)))
+    return "\n".join(blocks)
+
+class StubSandbox:
+    """
+    Deterministic stand-in for SandboxPool (run, run_shared, cancel): no process, outcome
+    from the program hash. Records the time of every run for the "sandbox" stage.
+    """
+    def __init__(self, ok_rate: float = 0.3, delay_ms: float = 0.0):
+        self.ok_rate, self.delay = ok_rate, delay_ms / 1000.0
+        self.times: List[int] = []
+
+    def run(self, code: str, timeout: float = 6.0):
+        from codetutor.core.sandbox.runner import SandboxResult
+        t = time.perf_counter_ns()
+        if self.delay:
+            time.sleep(self.delay)
+        h = hashlib.sha1(code.encode("utf-8")).hexdigest()
+        if int(h[:8], 16) / 0xFFFFFFFF < self.ok_rate:
+            res = SandboxResult(ok=True, returncode=0, stdout=f"A,B\n{h[:6]},{h[6:12]}\n", stderr="",
+                                timed_out=False)
+        else:
+            res = SandboxResult(ok=False, returncode=1, stdout="", stderr="ValueError: stub", timed_out=False)
+        self.times.append(time.perf_counter_ns() - t)
+        return res
+
+    def run_shared(self, prefix: str, suffixes: List[str], timeout: float = 6.0):
+        return [self.run(prefix + s, timeout) for s in suffixes]
+
+    def cancel(self) -> None:
+        pass
+
+def percentiles(ns: List[int]) -> Dict[str, float]:
+    if not ns:
+        return {"n": 0}
+    s = sorted(ns)
+    at = lambda p: round(s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] / 1e6, 4)
+    return {"n": len(s), "p50_ms": at(50), "p90_ms": at(90), "p99_ms": at(99), "max_ms": at(100),
+            "total_ms": round(sum(s) / 1e6, 3)}
+
+def peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+# trace span -> bench stage, for the stages timed inside iter_candidates
+SPAN_STAGES = {"choose_plan": "plan", "sample_kwargs": "sample", "realize": "realize"}
+
+def run_one(n: int, plans: int, arg_resamples: int, seed: int, planner: str,
+            ok_rate: float, sandbox_ms: float, workers: int = 1, share_prefix: bool = False) -> Dict:
+    """One deck size, in the current process; cwd must be a scratch dir (cards, fixtures, IR cache, trace)."""
+    from codetutor.core.dsl.loader import load_cards
+    from codetutor.core.planner.compat import build_compat
+    from codetutor.core.generation.arg_sampler import arg_stream
+    from codetutor.core.cli.gen_question import _pack, _question_doc, iter_candidates, run_candidates
+    from codetutor.utils.logging import start_tracing, stop_tracing
+
+    cards = Path("data/cards/python/pandas/cards.ctdsl")
+    cards.parent.mkdir(parents=True, exist_ok=True)
+    cards.write_text(synth_deck(n, seed), encoding="utf-8")
+    fx = Path("data/fixtures/python/pandas/fixtures.json")
+    fx.parent.mkdir(parents=True, exist_ok=True)
+    fx.write_text(json.dumps(FIXTURES), encoding="utf-8")
+
+    stages: Dict[str, List[int]] = {k: [] for k in
+                                    ("load", "load_cached", "compat", "plan", "sample", "realize", "sandbox", "inspect")}
+    clock = time.perf_counter_ns
+    t = clock(); load_cards(cards); stages["load"].append(clock() - t)  # parse + cache write
+    t = clock(); ir = load_cards(cards); stages["load_cached"].append(clock() - t)
+    t = clock(); compat = build_compat(ir); stages["compat"].append(clock() - t)
+
+    rng = random.Random(seed)
+    env = {"columns": ["A", "B", "C"]}
+    sandbox = StubSandbox(ok_rate, sandbox_ms)
+    trace = Path("trace.jsonl")
+    accepted = candidates = 0
+    done_attempts = set()
+    start_tracing(trace)
+    t_gen = clock()
+    try:
+        # the generate_questions loop, minus the learned state and writing questions out
+        cands = iter_candidates("python", "pandas", ir, compat, plans, arg_resamples, env, rng, planner,
+                                gen=arg_stream(seed))
+        for cand, res in run_candidates(cands, sandbox, workers, share_prefix):  # type: ignore[arg-type]
+            candidates += 1
+            if not res.ok or cand.attempt in done_attempts:
+                continue
+            t = clock()
+            _question_doc("pandas", _pack(ir, cand, res), cand.attempt)
+            stages["inspect"].append(clock() - t)
+            done_attempts.add(cand.attempt)
+            accepted += 1
+    finally:
+        gen_s = (clock() - t_gen) / 1e9
+        stop_tracing()
+    for line in trace.read_text(encoding="utf-8").splitlines():
+        ev = json.loads(line)
+        if ev.get("name") in SPAN_STAGES:
+            stages[SPAN_STAGES[ev["name"]]].append(int(ev["dur_us"] * 1000))
+    stages["sandbox"] = sandbox.times
+    return {
+        "cards": n, "edges": compat.n_edges(), "plans": plans, "workers": workers, "candidates": candidates,
+        "accepted": accepted, "generate_s": round(gen_s, 4),
+        "accepted_per_s": round(accepted / gen_s, 2) if gen_s else None,
+        "peak_rss_kb": peak_rss_kb(),
+        "stages": {k: percentiles(v) for k, v in stages.items()},
+    }
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(new: Dict, old: Dict, threshold: float) -> bool:
+    """Print new/old ratios per size; True if some p50 or the throughput regressed past `threshold`."""
+    before = {r["cards"]: r for r in old.get("runs", [])}
+    regressed = False
+    for r in new["runs"]:
+        o = before.get(r["cards"])
+        if o is None:
+            continue
+        print(f"-- {r['cards']} cards (new/old)")
+        for k, st in r["stages"].items():
+            p_new, p_old = st.get("p50_ms"), o["stages"].get(k, {}).get("p50_ms")
+            if p_new is None or not p_old:
+                continue
+            ratio = p_new / p_old
+            flag = "  REGRESSION" if ratio > threshold else ""
+            regressed |= bool(flag)
+            print(f"   {k:12} p50 {p_old:10.4f} -> {p_new:10.4f} ms  x{ratio:.2f}{flag}")
+        if r.get("accepted_per_s") and o.get("accepted_per_s"):
+            ratio = o["accepted_per_s"] / r["accepted_per_s"]
+            flag = "  REGRESSION" if ratio > threshold else ""
+            regressed |= bool(flag)
+            print(f"   accepted/s {o['accepted_per_s']} -> {r['accepted_per_s']}{flag}")
+        if r.get("peak_rss_kb") and o.get("peak_rss_kb"):
+            print(f"   peak RSS {o['peak_rss_kb']} -> {r['peak_rss_kb']} KiB")
+    return regressed
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="bench_pipeline")
+    ap.add_argument("--sizes", default="1000,10000,50000", help="comma-separated deck sizes")
+    ap.add_argument("--plans", type=int, default=500, help="plan attempts per size")
+    ap.add_argument("--arg-resamples", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--planner", choices=["sample", "z3", "thompson"], default="sample")
+    ap.add_argument("--ok-rate", type=float, default=0.3, help="share of programs the stub sandbox accepts")
+    ap.add_argument("--sandbox-ms", type=float, default=0.0, help="simulated sandbox latency per program")
+    ap.add_argument("--workers", type=int, default=1, help="stub sandbox runs kept in flight (run_candidates)")
+    ap.add_argument("--share-prefix", action="store_true", help="group candidates by prefix (run_shared)")
+    ap.add_argument("--out", default=None, help="write results JSON here (default: stdout)")
+    ap.add_argument("--compare", default=None, metavar="OLD_JSON", help="print ratios against an earlier run")
+    ap.add_argument("--threshold", type=float, default=1.25, help="ratio counted as a regression by --compare")
+    ap.add_argument("--one", type=int, default=None, help=argparse.SUPPRESS)  # child mode: one size
+    args = ap.parse_args()
+
+    opts = (args.plans, args.arg_resamples, args.seed, args.planner, args.ok_rate, args.sandbox_ms,
+            args.workers, args.share_prefix)
+    if args.one is not None:
+        print(json.dumps(run_one(args.one, *opts)))
+        return
+
+    runs = []
+    for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        with tempfile.TemporaryDirectory(prefix="ct-bench-") as tmp:
+            env = dict(os.environ, CT_IR_CACHE=str(Path(tmp) / "ir"), CT_BANDIT_STATS="off", CT_FAILURE_MEMO="off")
+            argv = [sys.executable, str(Path(__file__).resolve()), "--one", str(n),
+                    "--plans", str(args.plans), "--arg-resamples", str(args.arg_resamples),
+                    "--seed", str(args.seed), "--planner", args.planner,
+                    "--ok-rate", str(args.ok_rate), "--sandbox-ms", str(args.sandbox_ms),
+                    "--workers", str(args.workers)] + (["--share-prefix"] if args.share_prefix else [])
+            p = subprocess.run(argv, cwd=tmp, env=env, capture_output=True, text=True)
+            if p.returncode != 0:
+                sys.exit(f"bench for {n} cards failed:\n{p.stderr}")
+            runs.append(json.loads(p.stdout.strip().splitlines()[-1]))
+            r = runs[-1]
+            print(f"{n:>7} cards: {r['accepted']} accepted, {r['accepted_per_s']}/s, "
+                  f"compat {r['stages']['compat']['p50_ms']:.1f} ms, peak RSS {r['peak_rss_kb']} KiB",
+                  file=sys.stderr)
+
+    result = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "git": _git_rev(),
+                 "created_at": int(time.time()),
+                 "args": {k: v for k, v in vars(args).items() if k not in {"out", "compare", "one"}}},
+        "runs": runs,
+    }
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        if compare(result, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from __future__ import annotations
+import pytest
+
+pytest.importorskip("blake3")
+from codetutor.core.sandbox import cache as cache_mod
+from codetutor.core.sandbox.cache import ExecCache
+from codetutor.core.sandbox.runner import SandboxResult
+
+OK = SandboxResult(ok=True, returncode=0, stdout="1\n", stderr="", timed_out=False)
+
+def test_results_are_keyed_by_timeout(tmp_path):
+    c = ExecCache(tmp_path / "exec.db")
+    c.put("print(1)", 6.0, OK)
+    assert c.get("print(1)", 6.0) == OK
+    assert c.get("print(1)", 0.5) is None
+    c.close()
+
+def test_timed_out_runs_are_not_stored(tmp_path):
+    c = ExecCache(tmp_path / "exec.db")
+    c.put("while True: pass", 1.0, SandboxResult(ok=False, returncode=-1, stdout="", stderr="TIMEOUT", timed_out=True))
+    assert c.get("while True: pass", 1.0) is None
+    c.close()
+
+def test_changed_limits_start_a_fresh_namespace(tmp_path, monkeypatch):
+    c = ExecCache(tmp_path / "exec.db")
+    c.put("print(1)", 6.0, OK)
+    c.close()
+    limits = cache_mod._limits_prelude
+    monkeypatch.setattr(cache_mod, "_limits_prelude", lambda: limits(mem_mb=64))  # CT_MEM_MB=64
+    c = ExecCache(tmp_path / "exec.db")
+    assert c.get("print(1)", 6.0) is None
+    c.close()
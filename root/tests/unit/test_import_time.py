@@ -0,0 +1,30 @@
+from __future__ import annotations
+import json, os, subprocess, sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+HEAVY = ("lark", "pandas", "z3", "transformers", "griffe", "concurrent.futures", "argparse")
+BUDGET_S = float(os.getenv("CT_IMPORT_BUDGET_S", "0.5"))
+
+def _import(module: str) -> dict:
+    # a fresh interpreter per check: sys.modules of the test process already holds everything
+    code = ("import json, sys, time\n"
+            "t = time.perf_counter()\n"
+            f"import {module}\n"
+            "dt = time.perf_counter() - t\n"
+            f"print(json.dumps({{'s': dt, 'loaded': [m for m in {HEAVY!r} if m in sys.modules]}}))\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(SRC), os.environ.get("PYTHONPATH", "")]))
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def test_gen_question_imports_no_heavy_dependency():
+    r = _import("codetutor.core.cli.gen_question")
+    assert r["loaded"] == []
+
+def test_db_tools_import_without_pandas():
+    assert "pandas" not in _import("codetutor.utils.db")["loaded"]
+
+def test_gen_question_import_within_budget():
+    _import("codetutor.core.cli.gen_question")  # first run compiles the .pyc files
+    r = min((_import("codetutor.core.cli.gen_question") for _ in range(3)), key=lambda r: r["s"])
+    assert r["s"] < BUDGET_S, f"importing gen_question took {r['s'] * 1000:.0f} ms (budget {BUDGET_S * 1000:.0f} ms)"
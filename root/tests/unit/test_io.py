@@ -0,0 +1,57 @@
+from __future__ import annotations
+import json
+import pytest
+from codetutor.utils.io import JsonlSink, SqliteSink, open_question_sink, question_key, read_jsonl
+
+def _doc(i: int) -> dict:
+    return {"fingerprint": f"fp{i}", "apis": ["pandas.DataFrame.head", f"pandas.m{i}"], "program": f"print({i})"}
+
+@pytest.mark.parametrize("name", ["q.jsonl", "q.db"])
+def test_sink_resumes_with_what_was_written(tmp_path, name):
+    sink = open_question_sink(tmp_path / name)
+    for i in range(3):
+        sink.write(_doc(i))
+    sink.close()
+    sink = open_question_sink(tmp_path / name)
+    assert [question_key(d) for d in sink.accepted()] == [question_key(_doc(i)) for i in range(3)]
+    sink.write(_doc(3))
+    sink.close()
+    assert len(list(open_question_sink(tmp_path / name).accepted())) == 4
+
+def test_open_question_sink_picks_by_suffix(tmp_path):
+    for name, cls in [("a.jsonl", JsonlSink), ("a.db", SqliteSink), ("a.sqlite3", SqliteSink), ("a.out", JsonlSink)]:
+        sink = open_question_sink(tmp_path / name)
+        assert isinstance(sink, cls)
+        sink.close()
+
+def test_jsonl_torn_tail_is_trimmed_before_appending(tmp_path):
+    p = tmp_path / "q.jsonl"
+    p.write_text(json.dumps(_doc(0)) + "\n" + json.dumps(_doc(1))[:17], encoding="utf-8")  # crash mid-write
+    assert [d["fingerprint"] for d in read_jsonl(p)] == ["fp0"]
+    sink = JsonlSink(p)
+    sink.write(_doc(2))
+    sink.close()
+    assert p.read_text(encoding="utf-8").count("\n") == 2
+    assert [d["fingerprint"] for d in read_jsonl(p)] == ["fp0", "fp2"]
+
+def test_jsonl_torn_only_line_leaves_empty_file(tmp_path):
+    p = tmp_path / "q.jsonl"
+    p.write_text('{"fingerprint": "fp', encoding="utf-8")
+    JsonlSink(p).close()
+    assert p.read_bytes() == b""
+
+def test_sqlite_sink_ignores_duplicate_keys(tmp_path):
+    sink = SqliteSink(tmp_path / "q.db")
+    sink.write(_doc(0))
+    sink.write(dict(_doc(0), program="print('again')"))
+    assert [d["program"] for d in sink.accepted()] == ["print(0)"]
+    sink.close()
+
+def test_torn_tail_longer_than_a_block_is_trimmed(tmp_path, monkeypatch):
+    from codetutor.utils import io
+    monkeypatch.setattr(io, "_TAIL_BLOCK", 16)
+    p = tmp_path / "q.jsonl"
+    head = json.dumps(_doc(0)) + "\n"
+    p.write_text(head + '{"fingerprint": "' + "x" * 100, encoding="utf-8")
+    JsonlSink(p).close()
+    assert p.read_text(encoding="utf-8") == head
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import pytest
+from codetutor.core.dsl import loader
+from codetutor.core.dsl.loader import load_cards, parse_cards
+from codetutor.adapters.python.synth.synth_cards import card_block
+
+DECK = r'''ontology v0
+# comment line
+card pandas.DataFrame.sort_values : auto {
+  pre.accepts = "DataFrame";
+  pre.args = [ ("by","str|list[str]",true,null), ("ascending","bool",false,"True") ];
+  post.returns = "DataFrame";
+  post.is_valid_stop = true;
+}
+card pandas.Series.clip : auto {
+  pre.accepts = "Series"
+  pre.bounds = (-1.5, 2)
+  pre.empty = ()
+  pre.none = []
+  post.note = "say \"hi\"\\path é"
+  post.is_valid_stop = false
+  must post.returns = "Series";
+  by pandas.Series.where
+  in order to "limit values"
+}
+'''
+
+def test_parses_cards_values_and_links():
+    ir = parse_cards(DECK)
+    assert [c.qualname for c in ir.cards] == ["pandas.DataFrame.sort_values", "pandas.Series.clip"]
+    assert ir.index == {"pandas.DataFrame.sort_values": 0, "pandas.Series.clip": 1}
+    a, b = ir.cards
+    assert a.profile == "auto"
+    assert a.pre["args"] == [("by", "str|list[str]", True, None), ("ascending", "bool", False, "True")]
+    assert a.post == {"returns": "DataFrame", "is_valid_stop": True}
+    assert b.pre["bounds"] == (-1.5, 2) and isinstance(b.pre["bounds"][1], int)
+    assert b.pre["empty"] == () and b.pre["none"] == []
+    assert b.post["is_valid_stop"] is False
+    assert b.post["returns"] == "Series"  # modal facts are stored like plain ones
+    assert b.links == [("by", "pandas.Series.where"), ("in order to", '"limit values"')]
+
+def test_escaped_strings_round_trip_through_the_writer():
+    tricky = 'a "quoted" \\ back\tslash é ☃'
+    text = "ontology v0\n" + card_block("lib.mod.f", "auto", tricky, [("x", tricky, False, None)], "R", True, False)
+    c = parse_cards(text).cards[0]
+    assert c.pre["accepts"] == tricky
+    assert c.pre["args"] == [("x", tricky, False, None)]
+    assert c.post == {"returns": "R", "mutates_input": True, "is_valid_stop": False}
+
+def test_null_is_none():
+    c = parse_cards('card a.b : p { pre.x = null; post.y = [null, 1]; }').cards[0]
+    assert c.pre["x"] is None and c.post["y"] == [None, 1]
+
+def test_null_elements_are_kept_and_empty_containers_stay_empty():
+    c = parse_cards('card a.b : p { pre.l = [null]; pre.t = (null); pre.n = [null, null]; '
+                    'pre.e = []; pre.u = (); pre.nested = [[], (null), [null]]; }').cards[0]
+    assert c.pre["l"] == [None] and c.pre["t"] == (None,) and c.pre["n"] == [None, None]
+    assert c.pre["e"] == [] and c.pre["u"] == ()
+    assert c.pre["nested"] == [[], (None,), [None]]
+
+def test_syntax_error_is_reported():
+    with pytest.raises(Exception):
+        parse_cards('card a.b : p { pre.x = ; }')
+
+# ---------- IR cache ----------
+def test_ir_cache_skips_parsing_until_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "IR_CACHE_DIR", tmp_path / "ir")
+    deck = tmp_path / "cards.ctdsl"
+    deck.write_text(DECK, encoding="utf-8")
+    first = load_cards(deck)
+    assert len(list((tmp_path / "ir").glob("*.pkl"))) == 1
+
+    def no_parse(text):
+        raise AssertionError("parsed although cached")
+    monkeypatch.setattr(loader, "parse_cards", no_parse)
+    again = load_cards(deck)
+    assert [c.qualname for c in again.cards] == [c.qualname for c in first.cards]
+    assert again.cards[1].post == first.cards[1].post
+
+    deck.write_text(DECK.replace("pandas.Series.clip", "pandas.Series.abs"), encoding="utf-8")
+    with pytest.raises(AssertionError):
+        load_cards(deck)  # new content, new key: must parse
+
+def test_parser_code_is_part_of_the_cache_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "IR_CACHE_DIR", tmp_path / "ir")
+    deck = tmp_path / "cards.ctdsl"
+    deck.write_text(DECK, encoding="utf-8")
+    load_cards(deck)
+    monkeypatch.setattr(loader, "_code_stamp", lambda: b"edited parser")
+
+    def no_parse(text):
+        raise AssertionError("parsed")
+    monkeypatch.setattr(loader, "parse_cards", no_parse)
+    with pytest.raises(AssertionError):
+        load_cards(deck)  # same deck, different parser: the old pickle must not be served
+
+def test_corrupt_cache_entry_is_reparsed(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "IR_CACHE_DIR", tmp_path / "ir")
+    deck = tmp_path / "cards.ctdsl"
+    deck.write_text(DECK, encoding="utf-8")
+    load_cards(deck)
+    entry, = (tmp_path / "ir").glob("*.pkl")
+    entry.write_bytes(b"not a pickle")
+    assert len(load_cards(deck).cards) == 2
+    assert len(load_cards(deck, use_cache=False).cards) == 2
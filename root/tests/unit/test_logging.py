@@ -0,0 +1,85 @@
+from __future__ import annotations
+import json, os
+import pytest
+from codetutor.utils import logging as ctlog
+
+@pytest.fixture(autouse=True)
+def _no_tracer():
+    ctlog.stop_tracing()
+    yield
+    ctlog.stop_tracing()
+
+@ctlog.traced()
+def _leaf(x):
+    with ctlog.span("leaf.inner", x=x) as s:
+        s.set(doubled=2 * x)
+    return x
+
+@ctlog.traced("outer")
+def _outer():
+    ctlog.count("calls")
+    with ctlog.span("outer.body", n=2):
+        _leaf(1); _leaf(2)
+    ctlog.count("calls", 2)
+    with pytest.raises(KeyError), ctlog.span("outer.fails"):
+        raise KeyError("k")
+
+def _inside(inner: dict, outer: dict, ts="ts_us", dur="dur_us") -> bool:
+    return outer[ts] <= inner[ts] and inner[ts] + inner[dur] <= outer[ts] + outer[dur] + 0.2  # rounding
+
+def test_jsonl_trace_nests_spans_and_writes_counters_at_stop(tmp_path):
+    p = tmp_path / "t.jsonl"
+    tracer = ctlog.start_tracing(p)
+    assert ctlog.tracing()
+    _outer()
+    tracer.flush()
+    ev = [json.loads(line) for line in p.read_text(encoding="utf-8").splitlines()]
+    assert not any("counter" in e for e in ev)  # counters wait for stop_tracing
+    assert [e["name"] for e in ev] == ["leaf.inner", "_leaf", "leaf.inner", "_leaf",
+                                       "outer.body", "outer.fails", "outer"]
+    assert [e["args"] for e in ev if e["name"] == "leaf.inner"] == [{"x": 1, "doubled": 2}, {"x": 2, "doubled": 4}]
+    assert ev[4]["args"] == {"n": 2} and ev[5]["args"] == {"error": "KeyError"}
+    assert _inside(ev[0], ev[1]) and _inside(ev[1], ev[4]) and _inside(ev[4], ev[6]) and _inside(ev[5], ev[6])
+    ctlog.stop_tracing()
+    assert not ctlog.tracing()
+    tail = [json.loads(line) for line in p.read_text(encoding="utf-8").splitlines()][len(ev):]
+    assert tail == [{"counter": "calls", "value": 3}]
+
+def test_chrome_trace_is_written_at_stop(tmp_path):
+    p = tmp_path / "t.json"
+    ctlog.start_tracing(p)
+    _outer()
+    assert not p.exists()
+    ctlog.stop_tracing()
+    ev = json.loads(p.read_text(encoding="utf-8"))["traceEvents"]
+    spans = {e["name"]: e for e in ev if e["ph"] == "X"}
+    assert set(spans) == {"leaf.inner", "_leaf", "outer.body", "outer.fails", "outer"}
+    assert spans["outer.fails"]["args"] == {"error": "KeyError"}
+    assert _inside(spans["outer.body"], spans["outer"], "ts", "dur")
+    assert [(e["name"], e["args"]) for e in ev if e["ph"] == "C"] == [("calls", {"value": 3})]
+
+def test_disabled_span_is_the_shared_noop(tmp_path):
+    assert not ctlog.tracing()
+    assert ctlog.span("a", x=1) is ctlog.span("b") is ctlog._NO_SPAN
+    ctlog.count("ignored")
+    assert _leaf(5) == 5 and _outer() is None
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_writes_nothing(tmp_path):
+    p = tmp_path / "t.jsonl"
+    ctlog.start_tracing(p)
+    with ctlog.span("parent"):
+        pass
+    pid = os.fork()
+    if pid == 0:  # child: everything it traces, counts or closes must be dropped
+        try:
+            with ctlog.span("child"):
+                ctlog.count("child")
+            ctlog.stop_tracing()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    ctlog.count("parent")
+    ctlog.stop_tracing()
+    ev = [json.loads(line) for line in p.read_text(encoding="utf-8").splitlines()]
+    assert [e.get("name", e.get("counter")) for e in ev] == ["parent", "parent"]
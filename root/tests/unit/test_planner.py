@@ -0,0 +1,188 @@
+from __future__ import annotations
+import random
+from typing import List, Set, Tuple
+import pytest
+from codetutor.core.dsl.loader import IR, Card
+from codetutor.core.ir.card import CardTable
+from codetutor.core.planner.compat import CompatGraph, build_compat
+from codetutor.core.planner.sampler import PlanSampler
+
+TYPES = ["DataFrame", "Series", "Index", None, ""]
+AXES = [None, None, "rows", "cols"]
+DTYPES = [None, None, "num", "str"]
+
+def random_ir(n: int, seed: int) -> IR:
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n):
+        pre = {"accepts": rng.choice(TYPES), "accepts_axis": rng.choice(AXES), "accepts_dtype": rng.choice(DTYPES)}
+        post = {"returns": rng.choice(TYPES), "produces_axis": rng.choice(AXES), "produces_dtype": rng.choice(DTYPES)}
+        if rng.random() < 0.8:
+            post["is_valid_stop"] = rng.random() < 0.6
+        cards.append(Card(qualname=f"lib.m{i}", profile="auto",
+                          pre={k: v for k, v in pre.items() if v is not None},
+                          post={k: v for k, v in post.items() if v is not None}))
+    return IR(cards=cards, index={c.qualname: i for i, c in enumerate(cards)})
+
+def naive_compat(ir: IR) -> Tuple[Set[Tuple[int, int]], Set[int]]:
+    # the original all-pairs builder, kept here as the reference
+    pairs, stops = set(), set()
+    for i, ci in enumerate(ir.cards):
+        if ci.post.get("is_valid_stop"):
+            stops.add(i)
+        for j, cj in enumerate(ir.cards):
+            ret, acc = str(ci.post.get("returns") or ""), str(cj.pre.get("accepts") or "")
+            if not (ret and acc) or ret != acc:
+                continue
+            ok = True
+            for out, req in (("produces_axis", "accepts_axis"), ("produces_dtype", "accepts_dtype")):
+                o, r = ci.post.get(out), cj.pre.get(req)
+                if o is not None and r is not None and str(o) != str(r):
+                    ok = False
+            if ok:
+                pairs.add((i, j))
+    return pairs, stops
+
+def all_plans(g: CompatGraph, a1: int) -> Set[Tuple[int, ...]]:
+    """Every valid plan from a1, by brute force (the constraints of z3core.choose_plan)."""
+    out = set()
+    for x2 in g.succ[a1]:
+        if x2 == a1:
+            continue
+        if x2 in g.stops:
+            out.add((a1, x2))
+        for x3 in g.succ[x2]:
+            if x3 not in (a1, x2) and x3 in g.stops:
+                out.add((a1, x2, x3))
+    return out
+
+def valid(g: CompatGraph, plan: List[int]) -> bool:
+    return (len(set(plan)) == len(plan) and plan[-1] in g.stops
+            and all(g.has_edge(a, b) for a, b in zip(plan, plan[1:])))
+
+# ---------- compat ----------
+@pytest.mark.parametrize("seed", range(5))
+def test_bucketed_compat_matches_all_pairs_builder(seed):
+    ir = random_ir(60, seed)
+    g = build_compat(ir)
+    pairs, stops = naive_compat(ir)
+    assert set(g.pairs()) == pairs
+    assert g.stops == stops
+    assert g.n_edges() == len(pairs)
+    for i, j in list(pairs)[:50]:
+        assert g.has_edge(i, j)
+
+def test_compat_from_card_table_is_the_same_graph():
+    ir = random_ir(40, 7)
+    assert set(build_compat(CardTable.from_ir(ir)).pairs()) == set(build_compat(ir).pairs())
+
+def test_cards_with_one_output_signature_share_a_successor_array():
+    ir = random_ir(80, 3)
+    g = build_compat(ir)
+    t = g.table
+    seen = {}
+    for i in range(g.n):
+        key = (t.returns[i], t.produces_axis[i], t.produces_dtype[i])
+        if key in seen and len(g.succ[i]):
+            assert g.succ[i] is g.succ[seen[key]]
+        seen.setdefault(key, i)
+    for s in g.succ:
+        assert list(s) == sorted(s)
+
+# ---------- uniform sampler ----------
+def test_plan_count_is_exact():
+    g = build_compat(random_ir(50, 11))
+    sampler = PlanSampler(g)
+    for a1 in range(g.n):
+        assert sampler.count(a1) == len(all_plans(g, a1))
+
+def test_samples_are_valid_plans():
+    g = build_compat(random_ir(50, 12))
+    sampler, rng = PlanSampler(g), random.Random(0)
+    for a1 in range(g.n):
+        for _ in range(20):
+            plan = sampler.sample(a1, rng)
+            if plan is None:
+                assert not all_plans(g, a1)
+                break
+            assert valid(g, plan) and plan[0] == a1
+
+def test_samples_are_uniform_over_plans():
+    ir = random_ir(30, 4)
+    g = build_compat(ir)
+    sampler = PlanSampler(g)
+    a1 = max(range(g.n), key=lambda i: len(all_plans(g, i)) if len(all_plans(g, i)) <= 40 else 0)
+    plans = all_plans(g, a1)
+    assert len(plans) >= 5
+    rng, draws = random.Random(1), 400 * len(plans)
+    seen = {}
+    for _ in range(draws):
+        p = tuple(sampler.sample(a1, rng))
+        seen[p] = seen.get(p, 0) + 1
+    assert set(seen) == plans
+    # 400 expected hits per plan: +-25% is more than 5 standard deviations
+    assert all(300 <= n <= 500 for n in seen.values()), seen
+
+def test_length_weights():
+    g = build_compat(random_ir(40, 5))
+    a1 = max(range(g.n), key=lambda i: len(all_plans(g, i)))
+    rng = random.Random(2)
+    only3 = PlanSampler(g, w2=0.0)
+    assert all(len(only3.sample(a1, rng)) == 3 for _ in range(200))
+
+# ---------- z3 session ----------
+def _session(g: CompatGraph, **kw):
+    z3core = pytest.importorskip("codetutor.core.planner.z3core")
+    return z3core.PlannerSession(g, **kw)
+
+def test_session_enumerates_every_plan_once():
+    g = build_compat(random_ir(25, 9))
+    session = _session(g)
+    starts = sorted(range(g.n), key=lambda i: -len(all_plans(g, i)))[:4]
+    for a1 in starts:
+        emitted = []
+        while True:
+            plan = session.next_plan(a1)
+            if plan is None:
+                break
+            assert valid(g, plan) and plan[0] == a1
+            emitted.append(tuple(plan))
+        assert len(emitted) == len(set(emitted))
+        assert set(emitted) == all_plans(g, a1)
+        assert session.next_plan(a1) is None  # exhausted stays exhausted
+
+def test_session_rejected_plans_are_not_emitted():
+    g = build_compat(random_ir(25, 10))
+    a1 = max(range(g.n), key=lambda i: len(all_plans(g, i)))
+    plans = sorted(all_plans(g, a1))
+    session = _session(g)
+    for p in plans[::2]:
+        session.reject(list(p))
+    emitted = set()
+    while (plan := session.next_plan(a1)) is not None:
+        emitted.add(tuple(plan))
+    assert emitted == set(plans[1::2])
+
+def test_session_without_blocking_repeats_its_plan():
+    g = build_compat(random_ir(25, 9))
+    a1 = max(range(g.n), key=lambda i: len(all_plans(g, i)))
+    session = _session(g, block_emitted=False)
+    first = session.next_plan(a1)
+    assert first is not None and valid(g, first)
+    assert session.next_plan(a1) == first
+
+# ---------- learned state ----------
+def test_thompson_learns_in_memory_when_stats_are_off(monkeypatch):
+    from codetutor.core.cli import gen_question
+    from codetutor.core.learning.stats import BetaStats
+    from codetutor.core.planner.selector import ThompsonSelector
+    monkeypatch.setattr(gen_question, "open_bandit_stats", lambda language, library: None)  # CT_BANDIT_STATS=off
+    monkeypatch.setattr(gen_question, "open_failure_memo", lambda language, library: None)
+    assert gen_question._open_learned("python", "lib", "sample", False) == (None, None)
+    assert gen_question._open_learned("python", "lib", "sample", True) == (None, None)
+    memo, bandit = gen_question._open_learned("python", "lib", "thompson", False)
+    assert memo is None and isinstance(bandit, BetaStats) and bandit.path is None
+    # the counters _observe updates are the ones the selector draws from
+    selector = ThompsonSelector(build_compat(random_ir(20, 1)), bandit)
+    bandit.update(["lib.m0", "lib.m1"], True)
+    assert selector.stats is bandit and selector.stats.api("lib.m0")[0] == 1
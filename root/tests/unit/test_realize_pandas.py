@@ -0,0 +1,116 @@
+from __future__ import annotations
+import json, os
+from pathlib import Path
+from typing import Any, Dict, List
+import pytest
+from codetutor.adapters.python.realize import realizer
+from codetutor.adapters.python.realize.realizer import Realizer, realize_parts, step_at
+from codetutor.core.dsl.loader import IR, Card
+
+FIXTURES = {
+    "DataFrame": {"imports": ["import pandas as pd"],
+                  "setup": "curr = pd.DataFrame({'A':[1,2,3],'B':[10,20,30]})", "serializer": "csv"},
+    "Series": {"imports": ["import pandas as pd", "import numpy as np"],
+               "setup": "curr = pd.Series([3,1,2])\n", "serializer": "json"},
+    "Index": {"setup": "curr = None", "serializer": "repr"},
+}
+CARDS = [
+    ("pandas.DataFrame.sort_values", "DataFrame"),
+    ("pandas.Series.clip", "Series"),
+    ("pandas.Index.unique", "Index"),
+    ("pandas.core.groupby.DataFrameGroupBy.sum", "DataFrameGroupBy"),  # no fixture
+    ("pandas.DataFrame.head", "DataFrame"),
+]
+KWARGS = [
+    {},
+    {"by": "A", "ascending": False},
+    {"by": ["A", "B"], "na_position": "la\"st"},
+    {"lower": -1.5, "upper": None, "inplace": True},
+    {"mapping": {"A": [1, 2], "b": "é"}, "n": 3},
+]
+PLANS = [[0], [0, 4], [1, 2, 4], [2, 0], [3, 1, 0]]
+
+def _ir() -> IR:
+    cards = [Card(qualname=q, profile="auto", pre={"accepts": acc}, post={}) for q, acc in CARDS]
+    return IR(cards=cards, index={c.qualname: i for i, c in enumerate(cards)})
+
+def _write_fixtures(root: Path, fixtures: Dict[str, Any]) -> Path:
+    p = root / "python" / "pandas" / "fixtures.json"
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(fixtures), encoding="utf-8")
+    return p
+
+def reference_parts(fixture_path: Path, ir: IR, plan: List[int], kwarg_list: List[Dict[str, Any]]):
+    """The construction realize_parts used before Realizer, rebuilt from scratch on every call."""
+    fixture_map = realizer._load_fixture_map("python", "pandas", fixture_path)
+    imports, setup, hint = realizer._initial_setup("python", "pandas", str(ir.cards[plan[0]].pre["accepts"]),
+                                                   fixture_map)
+    if not setup:
+        setup = "curr = None  # TODO: provide a fixture in data/fixtures/python/pandas/fixtures.json\n"
+    if not setup.endswith("\n"):
+        setup += "\n"
+    body = []
+    for k, idx in enumerate(plan):
+        qual = ir.cards[idx].qualname
+        name, args_code = qual.split(".")[-1], ", ".join(f"{a}={realizer._value_code(v)}"
+                                                         for a, v in kwarg_list[k].items())
+        body.append(f"__m = getattr(curr, {json.dumps(name)}, None)\n"
+                    f"if callable(__m):\n"
+                    f"    __res = __m({args_code})\n"
+                    f"else:\n"
+                    f"    __f = __import__({json.dumps(qual.rsplit('.', 1)[0])}, fromlist=['*']).{name}\n"
+                    f"    __res = __f(curr, {args_code})\n"
+                    f"curr = curr if __res is None else __res\n")
+    return imports + setup + body[0], "".join(body[1:]) + realizer._build_serialize_snippet(hint)
+
+def _cases():
+    for plan in PLANS:
+        for shift in range(len(KWARGS)):
+            yield plan, [KWARGS[(shift + k) % len(KWARGS)] for k in range(len(plan))]
+
+def test_realizer_matches_reference_byte_for_byte(tmp_path):
+    path = _write_fixtures(tmp_path, FIXTURES)
+    ir, r = _ir(), Realizer("python", "pandas", fixture_dir=tmp_path)
+    for plan, kwarg_list in _cases():
+        assert r.parts(ir, plan, kwarg_list) == reference_parts(path, ir, plan, kwarg_list), plan
+        assert r.program(ir, plan, kwarg_list) == "".join(reference_parts(path, ir, plan, kwarg_list))
+
+def test_realize_parts_uses_the_shared_realizer(tmp_path, monkeypatch):
+    path = _write_fixtures(tmp_path, FIXTURES)
+    monkeypatch.setattr(realizer, "FIXTURE_DIR", tmp_path)
+    monkeypatch.setattr(realizer, "_REALIZERS", {})
+    ir = _ir()
+    for plan, kwarg_list in _cases():
+        assert realize_parts("python", "pandas", ir, plan, kwarg_list) == reference_parts(path, ir, plan, kwarg_list)
+    assert realizer.get_realizer("python", "pandas") is realizer.get_realizer("python", "pandas")
+
+def test_edited_fixtures_are_reloaded(tmp_path):
+    path = _write_fixtures(tmp_path, FIXTURES)
+    ir, r = _ir(), Realizer("python", "pandas", fixture_dir=tmp_path)
+    before = r.parts(ir, [0], [{}])
+    assert "'A':[1,2,3]" in before[0]
+
+    edited = dict(FIXTURES, DataFrame=dict(FIXTURES["DataFrame"], setup="curr = pd.DataFrame({'Z': [9]})"))
+    _write_fixtures(tmp_path, edited)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # coarse mtime clocks
+    assert r.parts(ir, [0], [{}]) == reference_parts(path, ir, [0], [{}]) != before
+
+    path.unlink()
+    assert r.parts(ir, [0], [{}])[0].startswith("curr = None  # TODO")
+
+def test_first_card_without_accepts_is_rejected(tmp_path):
+    ir = IR(cards=[Card(qualname="pandas.f", profile="auto", pre={}, post={})], index={"pandas.f": 0})
+    with pytest.raises(ValueError):
+        Realizer("python", "pandas", fixture_dir=tmp_path).parts(ir, [0], [{}])
+
+def test_step_at_maps_call_lines_to_plan_steps(tmp_path):
+    _write_fixtures(tmp_path, FIXTURES)
+    ir, r = _ir(), Realizer("python", "pandas", fixture_dir=tmp_path)
+    plan = [1, 2, 4]
+    prefix, suffix = r.parts(ir, plan, [{}, {"n": 1}, {}])
+    lines = (prefix + suffix).splitlines()
+    calls = [i + 1 for i, line in enumerate(lines) if line.startswith("    __res = __m(")]
+    assert [step_at(prefix, len(plan), n) for n in calls] == [0, 1, 2]
+    assert step_at(prefix, len(plan), 1) is None
+    assert step_at(prefix, len(plan), len(lines)) is None
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import os
+import pytest
+from codetutor.core.sandbox.runner import SandboxPool, run_code
+
+pytest.importorskip("pandas")
+warm_only = pytest.mark.skipif(not hasattr(os, "fork"), reason="warm workers need os.fork")
+
+PROGRAMS = [
+    "import pandas as pd\nprint(pd.Series([1, 2]).sum())",
+    "import json\nprint(json.dumps([1]))",
+    "import subprocess\nprint(1)",
+    "import socket\nprint(1)",
+    "import ctypes\nprint(1)",
+    "import importlib\nimportlib.import_module('subprocess')\nprint(1)",
+    "import tempfile\nprint(1)",
+]
+
+def _verdict(res):
+    last = res.stderr.strip().splitlines()[-1:] if not res.ok else []
+    return res.ok, last
+
+@pytest.fixture(scope="module")
+def pool():
+    with SandboxPool(["pandas"]) as p:
+        yield p
+
+@warm_only
+def test_cold_and_warm_reject_the_same_imports(pool):
+    for code in PROGRAMS:
+        assert _verdict(run_code(code, allowed_imports=["pandas"])) == _verdict(pool.run(code)), code
+
+@warm_only
+def test_process_and_network_modules_are_denied(pool):
+    for mod in ("subprocess", "socket", "ctypes"):
+        res = pool.run(f"import {mod}\nprint(1)")
+        assert not res.ok and f"Module {mod} not allowed" in res.stderr
+
+@warm_only
+def test_run_shared_matches_run(pool):
+    prefix = "import pandas as pd\ncurr = pd.DataFrame({'A': [1, 2, 3]})\n"
+    suffixes = [
+        "print(curr.to_csv(index=False))",
+        "print(curr['A'].sum())",
+        "curr = curr.nosuch()\n",
+        "raise SystemExit(3)",
+        "import subprocess\n",
+    ]
+    shared = pool.run_shared(prefix, suffixes)
+    single = [pool.run(prefix + s) for s in suffixes]
+    for s, a, b in zip(suffixes, shared, single):
+        assert (a.ok, a.returncode, a.stdout, a.stderr, a.timed_out) == \
+               (b.ok, b.returncode, b.stdout, b.stderr, b.timed_out), s
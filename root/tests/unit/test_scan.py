@@ -0,0 +1,300 @@
+from __future__ import annotations
+import importlib, inspect, json, sqlite3, sys, types
+from pathlib import Path
+from typing import Dict
+import pytest
+
+pytest.importorskip("griffe")
+pytest.importorskip("docstring_parser")
+pytest.importorskip("blake3")
+from codetutor.adapters.python.scan import scan
+from codetutor.adapters.python.scan.scan import scan_library
+
+@pytest.fixture
+def make_lib(tmp_path, monkeypatch):
+    """make_lib(name, {relative path: source}) -> package root; importable and freshly modelled."""
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+    made = []
+
+    def make(name: str, files: Dict[str, str]) -> Path:
+        root = tmp_path / "src" / name
+        for rel, src in files.items():
+            (root / rel).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel).write_text(src, encoding="utf-8")
+        made.append(name)
+        _fresh()
+        return root
+
+    yield make
+    for mod in [m for m in sys.modules if m.split(".")[0] in made]:
+        del sys.modules[mod]
+    _fresh()
+
+def _fresh():
+    # griffe model and module imports are memoized per process
+    scan._model.cache_clear()
+    scan._import_module.cache_clear()
+    importlib.invalidate_caches()
+
+def _scan(lib: str, db, **kw):
+    _fresh()
+    return scan_library(lib, str(db), **kw)
+
+def _dump(db) -> Dict[str, list]:
+    con = sqlite3.connect(str(db))
+    try:
+        tables = [t for t, in con.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+        # scanned_at is wall-clock time; everything else must match, ids included
+        return {t: con.execute(f"SELECT * FROM {t} ORDER BY rowid").fetchall() if t != "libraries" else
+                con.execute("SELECT id, name, version, hash FROM libraries ORDER BY id").fetchall()
+                for t in tables}
+    finally:
+        con.close()
+
+# ---------- incremental scans and the legacy migration ----------
+V1 = '''
+def keep(x: int) -> int:
+    """Unchanged."""
+    return x
+
+def edit(x: int) -> int:
+    """Old summary."""
+    return x
+
+def drop(x):
+    """Goes away."""
+'''
+
+V2 = '''
+def keep(x: int) -> int:
+    """Unchanged."""
+    return x
+
+def edit(x: int, y: int = 0) -> int:
+    """New summary."""
+    return x
+
+def fresh():
+    """Added later."""
+'''
+
+def _qualnames(db):
+    con = sqlite3.connect(str(db))
+    try:
+        return {q for q, in con.execute("SELECT qualname FROM symbols")}
+    finally:
+        con.close()
+
+def test_incremental_scan_reports_changed_and_removed(make_lib, tmp_path):
+    db = tmp_path / "api.db"
+    init = make_lib("ctscanlib", {"__init__.py": V1}) / "__init__.py"
+    first = _scan("ctscanlib", db, static=True, import_fallback=False, incremental=True)
+    assert first["added"] >= 3 and first["removed"] == 0
+    assert _scan("ctscanlib", db, static=True, import_fallback=False, incremental=True) == {
+        "added": 0, "changed": 0, "unchanged": sum(first.values()), "removed": 0}
+
+    init.write_text(V2, encoding="utf-8")
+    stats = _scan("ctscanlib", db, static=True, import_fallback=False, incremental=True)
+    assert stats["added"] == 1 and stats["changed"] == 1 and stats["removed"] == 1
+    names = _qualnames(db)
+    assert "ctscanlib.fresh" in names and "ctscanlib.edit" in names and "ctscanlib.drop" not in names
+
+def test_legacy_duplicates_are_removed_once(make_lib, tmp_path):
+    db = tmp_path / "api.db"
+    make_lib("ctscanlib", {"__init__.py": V1})
+    _scan("ctscanlib", db, static=True, import_fallback=False)
+    con = sqlite3.connect(str(db))
+    # a database from before the unique indexes: duplicate rows per symbol
+    con.executescript("DROP INDEX ux_signatures; DROP INDEX ux_docstrings;"
+                      "INSERT INTO signatures(symbol_id, signature) SELECT symbol_id, signature FROM signatures;")
+    con.commit()
+    con.close()
+    _scan("ctscanlib", db, static=True, import_fallback=False)
+    con = sqlite3.connect(str(db))
+    try:
+        indexes = {n for n, in con.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert {"ux_signatures", "ux_docstrings"} <= indexes
+        assert con.execute("SELECT COUNT(*) - COUNT(DISTINCT symbol_id) FROM signatures").fetchone() == (0,)
+    finally:
+        con.close()
+
+# ---------- parallel scan ----------
+MULTI = {
+    "__init__.py": '"""Root."""\nfrom .alpha import a1\n\ndef top(x, y=1):\n    """Top level."""\n',
+    "alpha.py": "".join(f'def a{i}(x: int, *, k: str = "v") -> int:\n    """Alpha {i}."""\n    return x\n\n'
+                        for i in range(6)),
+    "beta.py": "class B:\n    \"\"\"B.\"\"\"\n    def __init__(self, n=0):\n        self.n = n\n\n"
+               "    def go(self, *args, **kw):\n        \"\"\"Go.\"\"\"\n\n"
+               + "".join(f"def b{i}():\n    pass\n\n" for i in range(4)),
+    "gamma/__init__.py": '"""Gamma."""\n',
+    "gamma/inner.py": "".join(f'def g{i}(a, /, b):\n    """Inner {i}."""\n\n' for i in range(5)),
+    "_private.py": 'def hidden():\n    """Hidden."""\n',
+}
+
+@pytest.mark.parametrize("static", [False, True])
+def test_parallel_scan_writes_the_same_database_as_a_serial_one(make_lib, tmp_path, static):
+    make_lib("ctjobslib", MULTI)
+    serial = _scan("ctjobslib", tmp_path / "serial.db", jobs=1, static=static)
+    parallel = _scan("ctjobslib", tmp_path / "parallel.db", jobs=2, static=static)
+    assert serial == parallel
+    one, two = _dump(tmp_path / "serial.db"), _dump(tmp_path / "parallel.db")
+    assert len(one["symbols"]) > 15
+    assert one == two
+
+# ---------- batched writer ----------
+def _row(q: str, sig: bool = True, doc: bool = True):
+    return (q, "function", "lib", None, 1, f"dh-{q}" if doc else None, f"sh-{q}" if sig else None,
+            f"(x) -> {q}" if sig else None, "[]" if sig else None, None,
+            f"summary {q}" if doc else None, "[]" if doc else None, "{}" if doc else None, f"doc {q}" if doc else None)
+
+ROWS = [_row(f"lib.f{i}", sig=i % 3 != 0, doc=i % 4 != 1) for i in range(23)] + [_row("lib.f5", doc=False)]
+
+def _per_symbol(con, lib_id, rows):
+    # the writer _RowWriter replaced: one INSERT (and id lookup) per symbol
+    seen = set()
+    for (q, objtype, module, owner, is_public, doc_hash, sig_hash,
+         sig_txt, params_json, returns_text, summary, params_doc, returns_doc, raw) in rows:
+        if q in seen:
+            continue
+        seen.add(q)
+        sym_id = con.execute("INSERT INTO symbols(library_id,qualname,objtype,module,owner,is_public,doc_hash,sig_hash)"
+                             " VALUES(?,?,?,?,?,?,?,?)",
+                             (lib_id, q, objtype, module, owner, is_public, doc_hash, sig_hash)).lastrowid
+        if sig_txt or params_json or returns_text:
+            con.execute("INSERT INTO signatures(symbol_id,signature,params_json,returns_text) VALUES(?,?,?,?)",
+                        (sym_id, sig_txt, params_json, returns_text))
+        if raw:
+            con.execute("INSERT INTO docstrings(symbol_id,summary,params_json,returns_json,raw) VALUES(?,?,?,?,?)",
+                        (sym_id, summary, params_doc, returns_doc, raw))
+
+def _db_with_library(path):
+    con = scan._connect(str(path))
+    scan._ensure_schema(con)
+    lib_id = scan._get_or_insert_library(con, "lib", "1.0")
+    return con, lib_id
+
+def _contents(con):
+    # signature/docstring row ids are not referenced anywhere: compare by symbol
+    return (con.execute("SELECT * FROM symbols ORDER BY id").fetchall(),
+            con.execute("SELECT symbol_id, signature, params_json, returns_text FROM signatures"
+                        " ORDER BY symbol_id").fetchall(),
+            con.execute("SELECT symbol_id, summary, params_json, returns_json, raw FROM docstrings"
+                        " ORDER BY symbol_id").fetchall())
+
+@pytest.mark.parametrize("chunk", [1, 4, 7, 5000])
+def test_row_writer_matches_per_symbol_inserts(tmp_path, chunk):
+    ref, lib_id = _db_with_library(tmp_path / "ref.db")
+    _per_symbol(ref, lib_id, ROWS)
+    con, lib_id = _db_with_library(tmp_path / "batched.db")
+    w = scan._RowWriter(con, lib_id, chunk=chunk)
+    flushes = []
+    flush = w.flush
+    w.flush = lambda: (flushes.append(w._pending()), flush())
+    scan._write_rows(w, ROWS)
+    assert w.finish()["added"] == 23
+    assert _contents(con) == _contents(ref)
+    assert con.execute("PRAGMA foreign_key_check").fetchall() == []
+    assert con.execute("SELECT COUNT(*) FROM signatures s LEFT JOIN symbols y ON y.id = s.symbol_id"
+                       " WHERE y.id IS NULL").fetchone() == (0,)
+    if chunk < 23:
+        # flushed as soon as a chunk is pending; one symbol adds at most 3 rows
+        assert len(flushes) > 2 and all(chunk <= n < chunk + 3 for n in flushes[:-1])
+
+def test_row_writer_rewrites_symbols_in_place(tmp_path):
+    con, lib_id = _db_with_library(tmp_path / "api.db")
+    w = scan._RowWriter(con, lib_id, chunk=3)
+    scan._write_rows(w, ROWS)
+    w.finish()
+    before = con.execute("SELECT id, qualname FROM symbols ORDER BY id").fetchall()
+    w = scan._RowWriter(con, lib_id, chunk=3)
+    scan._write_rows(w, [_row(r[0], sig=False) if r[0] == "lib.f2" else r for r in ROWS])
+    assert w.finish() == {"added": 0, "changed": 1, "unchanged": 22, "removed": 0}
+    assert con.execute("SELECT id, qualname FROM symbols ORDER BY id").fetchall() == before
+    f2 = con.execute("SELECT id FROM symbols WHERE qualname='lib.f2'").fetchone()[0]
+    assert con.execute("SELECT COUNT(*) FROM signatures WHERE symbol_id=?", (f2,)).fetchone() == (0,)
+    assert con.execute("SELECT COUNT(*) - COUNT(DISTINCT symbol_id) FROM docstrings").fetchone() == (0,)
+
+# ---------- static (griffe-only) mode ----------
+SIGS = '''
+class Point:
+    """A point."""
+    def __init__(self, x: int, y: int = 0, *, label: str = "p") -> None:
+        self.x = x
+
+class NoInit:
+    """No __init__ of its own."""
+
+def posonly(a, b: int, /, c, *, d=1, **kw) -> str:
+    """Positional-only."""
+
+def star(*args: int, flag: bool = False, **kwargs):
+    """Star args."""
+
+def onlypos(a, b=2, /):
+    """Only positional."""
+
+def plain(x, y=2):
+    """Plain."""
+
+def nodoc(x):
+    return x
+'''
+
+def _signatures(db) -> Dict[str, tuple]:
+    con = sqlite3.connect(str(db))
+    try:
+        return {q: (sig, params) for q, sig, params in con.execute(
+            "SELECT s.qualname, g.signature, g.params_json FROM symbols s JOIN signatures g ON g.symbol_id = s.id")}
+    finally:
+        con.close()
+
+def test_static_signatures_render_like_inspect(make_lib, tmp_path):
+    make_lib("ctsiglib", {"__init__.py": SIGS})
+    _scan("ctsiglib", tmp_path / "static.db", static=True, import_fallback=False)
+    static = _signatures(tmp_path / "static.db")
+    assert static["ctsiglib.Point"][0] == "(x: int, y: int = 0, *, label: str = 'p') -> None"  # self dropped
+    assert static["ctsiglib.posonly"][0] == "(a, b: int, /, c, *, d=1, **kw) -> str"
+    assert static["ctsiglib.star"][0] == "(*args: int, flag: bool = False, **kwargs)"
+    assert static["ctsiglib.onlypos"][0] == "(a, b=2, /)"
+    assert static["ctsiglib.plain"][0] == "(x, y=2)"
+    assert "ctsiglib.NoInit" not in static  # no model data and no fallback
+
+    lib = importlib.import_module("ctsiglib")
+    for q, (sig, _) in static.items():
+        assert sig == str(inspect.signature(getattr(lib, q.split(".")[-1]))), q
+    # params_json agrees with a runtime scan on names and kinds
+    _scan("ctsiglib", tmp_path / "runtime.db")
+    runtime = _signatures(tmp_path / "runtime.db")
+    for q, (_, params) in static.items():
+        kinds = lambda js: [(p["name"], p["kind"]) for p in json.loads(js)]
+        assert kinds(params) == kinds(runtime[q][1]), q
+
+def test_import_fallback_only_for_missing_static_data(make_lib, tmp_path, monkeypatch):
+    make_lib("ctsiglib", {"__init__.py": SIGS})
+    imported = []
+    real = scan._import_qualname
+    monkeypatch.setattr(scan, "_import_qualname", lambda qn, module=None: imported.append(qn) or real(qn, module))
+    _scan("ctsiglib", tmp_path / "api.db", static=True, import_fallback=True)
+    # nodoc lacks a docstring, NoInit a signature; everything else comes from the model
+    assert sorted(imported) == ["ctsiglib.NoInit", "ctsiglib.nodoc"]
+    assert _signatures(tmp_path / "api.db")["ctsiglib.NoInit"][0] == "()"
+
+    imported.clear()
+    for mod in [m for m in sys.modules if m.startswith("ctsiglib")]:
+        del sys.modules[mod]
+    _scan("ctsiglib", tmp_path / "strict.db", static=True, import_fallback=False)
+    assert imported == [] and "ctsiglib" not in sys.modules
+
+def test_runtime_scan_imports_each_module_once(make_lib, tmp_path, monkeypatch):
+    make_lib("ctjobslib", MULTI)
+    calls = []
+
+    def import_module(name):
+        calls.append(name)
+        return importlib.import_module(name)
+    monkeypatch.setattr(scan, "importlib", types.SimpleNamespace(import_module=import_module))
+    _scan("ctjobslib", tmp_path / "api.db")
+    assert calls and len(calls) == len(set(calls)), sorted(calls)
+    assert scan._import_module("ctjobslib.nosuchmodule") is None
+    assert scan._import_module("ctjobslib.nosuchmodule") is None
+    assert calls.count("ctjobslib.nosuchmodule") == 1  # failures are memoized too
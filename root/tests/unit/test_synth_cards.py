@@ -0,0 +1,121 @@
+from __future__ import annotations
+import importlib, sqlite3, sys
+import pytest
+
+pytest.importorskip("griffe")
+pytest.importorskip("docstring_parser")
+pytest.importorskip("blake3")
+pytest.importorskip("lark")
+from codetutor.adapters.python.scan import scan
+from codetutor.adapters.python.scan.scan import scan_library
+from codetutor.adapters.python.synth import synth_cards as synth
+from codetutor.core.dsl.loader import load_cards, load_cards_db
+from codetutor.core.planner.compat import build_compat
+
+LIB = "ctsynthlib"
+# synth_cards takes a function's accepted type from its owner's last name, so the modules
+# are named after the type labels; enough functions for several pool chunks (imap chunksize 256)
+RETURNS = ["Frame", "Series", "Grouped", "str", None]
+
+def _module(name: str, n: int) -> str:
+    out = []
+    for i in range(n):
+        ret = RETURNS[(i + len(name)) % len(RETURNS)]
+        out.append(f'def f{i}(x, k: int = {i}, inplace: bool = False)' + (f' -> "{ret}"' if ret else "")
+                   + f':\n    """{name} {i}."""\n\n')
+    return "".join(out)
+
+MODULES = {name: _module(name, n) for name, n in (("Frame", 300), ("Series", 250), ("Grouped", 120))}
+MODULES["__init__"] = '"""Root."""\n\ndef read(path: str) -> "Frame":\n    """Read."""\n\ndef _private():\n    pass\n'
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    root = tmp_path_factory.mktemp("synth")
+    (root / "src" / LIB).mkdir(parents=True)
+    for name, src in MODULES.items():
+        (root / "src" / LIB / f"{name}.py").write_text(src, encoding="utf-8")
+    sys.path.insert(0, str(root / "src"))
+    scan._model.cache_clear()
+    importlib.invalidate_caches()
+    try:
+        scan_library(LIB, str(root / "api.db"), static=True, import_fallback=False)
+    finally:
+        sys.path.remove(str(root / "src"))
+        scan._model.cache_clear()
+    return root / "api.db"
+
+def _public_symbols(db):
+    con = sqlite3.connect(str(db))
+    try:
+        return [q for q, in con.execute("SELECT qualname FROM symbols WHERE is_public=1 ORDER BY qualname")]
+    finally:
+        con.close()
+
+def _qualnames(text: str):
+    return [line.split()[1] for line in text.splitlines() if line.startswith("card ")]
+
+def test_parallel_synthesis_writes_the_same_file(db, tmp_path):
+    one = synth.synth_cards(str(db), LIB, str(tmp_path / "one"), jobs=1).read_bytes()
+    two = synth.synth_cards(str(db), LIB, str(tmp_path / "two"), jobs=2).read_bytes()
+    assert one == two
+    assert len(_qualnames(one.decode("utf-8"))) > 600  # several imap chunks
+
+def test_every_public_symbol_gets_a_card(db, tmp_path):
+    text = synth.synth_cards(str(db), LIB, str(tmp_path)).read_text(encoding="utf-8")
+    assert _qualnames(text) == _public_symbols(db)
+    assert not any("._" in q for q in _qualnames(text))
+    limited = synth.synth_cards(str(db), LIB, str(tmp_path / "lim"), limit=10).read_text(encoding="utf-8")
+    assert _qualnames(limited) == _public_symbols(db)[:10]
+
+def test_db_cards_plan_like_the_file(db, tmp_path, monkeypatch):
+    monkeypatch.setenv("CT_IR_CACHE", str(tmp_path / "ir"))
+    path = synth.synth_cards(str(db), LIB, str(tmp_path), to_db=True)
+    from_file = load_cards(path, use_cache=False)
+    from_db = load_cards_db(db, LIB)
+    g_file, g_db = build_compat(from_file), build_compat(from_db)
+    names_file = [c.qualname for c in from_file.cards]
+    names_db = [q for q, _ in from_db.heads]
+    assert sorted(names_db) == sorted(names_file)
+    succ = lambda g, names: {names[i]: {names[j] for j in g.succ[i]} for i in range(g.n)}
+    assert succ(g_db, names_db) == succ(g_file, names_file)
+    assert {names_db[i] for i in g_db.stops} == {names_file[i] for i in g_file.stops}
+    assert g_file.n_edges() > 0
+    # stored bodies decode to the parsed cards
+    for i in (0, len(names_db) // 2, len(names_db) - 1):
+        assert from_db.cards[i].pre == from_file.cards[from_file.index[names_db[i]]].pre
+
+def test_rerun_replaces_stored_cards(db, tmp_path):
+    synth.synth_cards(str(db), LIB, str(tmp_path), to_db=True)
+    synth.synth_cards(str(db), LIB, str(tmp_path), to_db=True)
+    con = sqlite3.connect(str(db))
+    try:
+        assert con.execute("SELECT COUNT(*) FROM cards").fetchone()[0] == len(_public_symbols(db))
+    finally:
+        con.close()
+
+def test_failed_synthesis_leaves_no_tmp_file_and_no_cards(db, tmp_path, monkeypatch):
+    con = sqlite3.connect(str(db))
+    before = con.execute("SELECT COUNT(*) FROM cards").fetchone()[0] if \
+        con.execute("SELECT 1 FROM sqlite_master WHERE name='cards'").fetchone() else 0
+    con.close()
+    real, seen = synth.card_for_row, []
+
+    def flaky(row):
+        seen.append(row)
+        if len(seen) == 50:
+            raise RuntimeError("boom")
+        return real(row)
+    monkeypatch.setattr(synth, "card_for_row", flaky)
+    with pytest.raises(RuntimeError):
+        synth.synth_cards(str(db), LIB, str(tmp_path), to_db=True)
+    assert list(tmp_path.iterdir()) == []
+    con = sqlite3.connect(str(db))
+    try:
+        assert con.execute("SELECT COUNT(*) FROM cards").fetchone()[0] == before
+    finally:
+        con.close()
+
+def test_unscanned_library_exits_with_a_message(db, tmp_path):
+    with pytest.raises(SystemExit, match="No public symbols"):
+        synth.synth_cards(str(db), "nosuchlib", str(tmp_path), to_db=True)
+    assert list(tmp_path.iterdir()) == []